@@ -0,0 +1,134 @@
+"""
+Дерево объектов (Parser.parse_program) против AstArena (Parser.parse_arena):
+время разбора и память, паузы сборщика мусора во время семантического анализа
+(SemanticAnalyzer обходит арену через представления) и передача в другой
+процесс через pickle. Программа — SCALE процедур, которые проходят
+семантический анализ. Запуск из корня репозитория:
+
+    python -m benchmarks.ast_arena_benchmark [SCALE]
+"""
+import contextlib
+import gc
+import io
+import pickle
+import sys
+import time
+import tracemalloc
+
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from semantic.semantic_analyzer import SemanticAnalyzer
+
+PROCEDURE = """
+var
+  a{n}, b{n}: integer;
+  row{n}: array [1..8] of integer;
+procedure step{n}(k: integer);
+var t: integer;
+begin
+  t := a{n} * k + {n};
+  if t > 10 then
+  begin
+    b{n} := t div 2
+  end
+  else
+  begin
+    b{n} := (t - 1) mod 3
+  end;
+  while t > 0 do
+  begin
+    t := t - 1
+  end;
+  row{n}[1] := t
+end;
+"""
+
+
+def make_program(scale):
+    parts = ["program Bench;"]
+    parts.extend(PROCEDURE.replace("{n}", str(n)) for n in range(scale))
+    parts.append("begin\n  a0 := 1\nend.")
+    return "\n".join(parts)
+
+
+class GcPauses:
+    """Суммарное время и самая длинная пауза сборок мусора (через gc.callbacks)."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.longest = 0.0
+        self.count = 0
+        self._started = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            pause = time.perf_counter() - self._started
+            self.total += pause
+            self.longest = max(self.longest, pause)
+            self.count += 1
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self)
+
+
+def analyze(tree):
+    with GcPauses() as pauses, contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        SemanticAnalyzer().visit_program(tree)
+        elapsed = time.perf_counter() - started
+    return elapsed, pauses
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    text = make_program(scale)
+    tokens = Lexer(text=text).tokenize()
+    print(f"Программа: {text.count(chr(10)) + 1:,} строк, {len(tokens):,} токенов (scale={scale})")
+
+    for name, build, view in (("objects", Parser.parse_program, lambda tree: tree),
+                              ("arena", Parser.parse_arena, lambda arena: arena.tree())):
+        started = time.perf_counter()
+        build(Parser(tokens))
+        parse_time = time.perf_counter() - started
+
+        # Токены в замеры памяти и сборки мусора не входят
+        tokens = None
+        gc.collect()
+        tracked = len(gc.get_objects())
+        tracemalloc.start()
+        result = build(Parser(Lexer(text=text).tokenize()))
+        gc.collect()
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        tracked = len(gc.get_objects()) - tracked
+
+        started = time.perf_counter()
+        gc.collect()
+        full_collection = time.perf_counter() - started
+        analysis_time, pauses = analyze(view(result))
+
+        started = time.perf_counter()
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        dump_time = time.perf_counter() - started
+        started = time.perf_counter()
+        pickle.loads(data)
+        load_time = time.perf_counter() - started
+
+        print(f"{name}:")
+        print(f"  разбор {parse_time:6.2f} с, {memory / 1e6:6.1f} МБ, объектов под надзором gc: {tracked:,}")
+        print(f"  полная сборка мусора: {full_collection * 1e3:7.1f} мс")
+        print(f"  анализ {analysis_time:6.2f} с; сборок: {pauses.count}, всего {pauses.total * 1e3:7.1f} мс, "
+              f"самая длинная {pauses.longest * 1e3:6.1f} мс")
+        print(f"  pickle: {len(data) / 1e6:6.1f} МБ, dumps {dump_time:5.2f} с, loads {load_time:5.2f} с")
+        del result, data
+        tokens = Lexer(text=text).tokenize()
+
+
+if __name__ == '__main__':
+    main()
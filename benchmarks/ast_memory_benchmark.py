@@ -0,0 +1,60 @@
+"""
+Память под AST: всё дерево (tracemalloc во время parse_program, токены
+в замер не входят) и собственный размер узла каждого класса (sys.getsizeof).
+Затем то же с общими листьями (Parser(share_leaves=True)): узлы считаются
+без повторов, один общий лист — один узел.
+Программа — make_program из parser_benchmark, SCALE повторов шаблона
+(по умолчанию около 100 тысяч строк). Запуск из корня репозитория:
+
+    python -m benchmarks.ast_memory_benchmark [SCALE]
+"""
+import sys
+import tracemalloc
+from collections import Counter
+
+from benchmarks.parser_benchmark import make_program
+from lexer.lexer import Lexer
+from parser.parser import Parser
+
+
+def measure(tokens, share_leaves):
+    tracemalloc.start()
+    tree = Parser(tokens, share_leaves=share_leaves).parse_program()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    counts = Counter()
+    sizes = Counter()
+    seen = set()
+    for node in tree.walk():
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        counts[type(node).__name__] += 1
+        sizes[type(node).__name__] += sys.getsizeof(node)
+    return current, peak, counts, sizes
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    text = make_program(scale)
+    tokens = Lexer(text=text).tokenize()
+    print(f"Программа: {text.count(chr(10)) + 1:,} строк, {len(tokens):,} токенов (scale={scale})")
+
+    current, peak, counts, sizes = measure(tokens, share_leaves=False)
+    total = sum(counts.values())
+    print(f"Узлов: {total:,}")
+    print(f"Дерево: {current / 1e6:8.1f} МБ  (пик {peak / 1e6:8.1f} МБ)  {current / total:6.1f} байт/узел")
+    for name, count in counts.most_common():
+        print(f"{name:>35}: {count:>9,}  {sizes[name] / count:6.1f} байт/узел")
+
+    shared_current, _, shared_counts, _ = measure(tokens, share_leaves=True)
+    shared_total = sum(shared_counts.values())
+    leaves = shared_counts["SharedFactorNode"] + shared_counts["FactorNode"]
+    print(f"Общие листья: узлов {shared_total:,} (-{1 - shared_total / total:.0%}), "
+          f"листьев FactorNode {leaves:,} вместо {counts['FactorNode']:,}, "
+          f"дерево {shared_current / 1e6:.1f} МБ (-{1 - shared_current / current:.0%})")
+
+
+if __name__ == '__main__':
+    main()
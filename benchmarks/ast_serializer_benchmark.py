@@ -0,0 +1,76 @@
+"""
+Двоичный формат AST (parser/serializer.py) против pickle и JSON: размер,
+время записи и чтения дерева объектов. Для JSON узел превращается в список
+[имя класса, span, поля...] и обратно, это входит в замер. Программа —
+make_program из parser_benchmark, SCALE повторов шаблона. Запуск из корня репозитория:
+
+    python -m benchmarks.ast_serializer_benchmark [SCALE]
+"""
+import json
+import pickle
+import sys
+import time
+
+from benchmarks.parser_benchmark import make_program
+from lexer.lexer import Lexer
+from parser import serializer
+from parser.ast_node import AstNode
+from parser.parser import Parser
+from parser.serializer import SERIAL_CLASSES
+
+CLASSES_BY_NAME = {node_class.__name__: node_class for node_class in SERIAL_CLASSES}
+
+
+def to_json(value):
+    if isinstance(value, AstNode):
+        return [type(value).__name__, value.span] + [to_json(getattr(value, name)) for name in value.field_names[1:]]
+    if isinstance(value, tuple):
+        return {"tuple": [to_json(item) for item in value]}
+    if isinstance(value, list):
+        return [to_json(item) for item in value]
+    return value
+
+
+def from_json(value):
+    if isinstance(value, dict):
+        return tuple(from_json(item) for item in value["tuple"])
+    if isinstance(value, list):
+        if value and isinstance(value[0], str) and value[0] in CLASSES_BY_NAME:
+            node_class = CLASSES_BY_NAME[value[0]]
+            node = node_class.__new__(node_class)
+            object.__setattr__(node, 'span', tuple(value[1]) if value[1] else None)
+            for name, item in zip(node_class.field_names[1:], value[2:]):
+                object.__setattr__(node, name, from_json(item))
+            return node
+        return [from_json(item) for item in value]
+    return value
+
+
+FORMATS = (
+    ("pickle", lambda tree: pickle.dumps(tree, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+    ("json", lambda tree: json.dumps(to_json(tree)).encode(), lambda data: from_json(json.loads(data))),
+    ("binary", serializer.dumps, serializer.loads),
+)
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    text = make_program(scale)
+    tokens = Lexer(text=text).tokenize()
+    print(f"Программа: {text.count(chr(10)) + 1:,} строк, {len(tokens):,} токенов (scale={scale})")
+
+    for share_leaves in (False, True):
+        tree = Parser(tokens, share_leaves=share_leaves).parse_program()
+        print(f"share_leaves={share_leaves}:")
+        for name, dumps, loads in FORMATS:
+            started = time.perf_counter()
+            data = dumps(tree)
+            dump_time = time.perf_counter() - started
+            started = time.perf_counter()
+            loads(data)
+            load_time = time.perf_counter() - started
+            print(f"  {name:>7}: {len(data) / 1e6:6.1f} МБ, запись {dump_time:5.2f} с, чтение {load_time:5.2f} с")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Сравнение пропускной способности движков лексера (токенов/с и МБ/с).
+
+Корпус — все .pas файлы из tests/lexer_tests, склеенные и размноженные
+SCALE раз. Запуск из корня репозитория:
+
+    python -m benchmarks.lexer_benchmark [SCALE]
+"""
+import glob
+import os
+import sys
+import time
+
+from lexer.lexer import Lexer, ENGINES
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'lexer_tests')
+
+
+def load_corpus(scale):
+    parts = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.pas'))):
+        with open(path, encoding='utf-8') as f:
+            parts.append(f.read())
+    return "\n".join(parts * scale)
+
+
+def measure(text, engine, repeat=3):
+    best = None
+    tokens = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        tokens = Lexer(text=text, engine=engine).tokenize()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return tokens, best
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    text = load_corpus(scale)
+    size_mb = len(text.encode('utf-8')) / 1e6
+    print(f"Корпус: {size_mb:.2f} МБ, {text.count(chr(10)) + 1} строк (scale={scale})")
+
+    reference = None
+    for engine in ENGINES:
+        tokens, elapsed = measure(text, engine)
+        if reference is None:
+            reference = tokens
+        elif tokens != reference:
+            raise SystemExit(f"Движок '{engine}' выдал поток токенов, отличный от эталонного")
+        print(f"{engine:>6}: {elapsed:7.3f} с  {len(tokens) / elapsed:12,.0f} токенов/с  "
+              f"{size_mb / elapsed:7.2f} МБ/с")
+
+
+if __name__ == '__main__':
+    main()
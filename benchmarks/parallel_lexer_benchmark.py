@@ -0,0 +1,53 @@
+"""
+Масштабирование параллельного лексера (lexer.parallel.tokenize_parallel)
+по числу процессов: 1, 2, 4 и 8. Пул запускается заранее, его старт
+в замер не входит. Результат каждого прогона сверяется с последовательным
+Lexer(text=...).tokenize(). Запуск из корня репозитория:
+
+    python -m benchmarks.parallel_lexer_benchmark [SCALE]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.lexer_benchmark import load_corpus
+from lexer.lexer import Lexer
+from lexer.parallel import tokenize_parallel
+
+WORKERS = (1, 2, 4, 8)
+
+
+def best_time(function, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    text = load_corpus(scale)
+    size_mb = len(text.encode('utf-8')) / 1e6
+    print(f"Корпус: {size_mb:.2f} МБ (scale={scale}), процессоров: {os.cpu_count()}")
+
+    reference, serial = best_time(lambda: Lexer(text=text, engine="regex").tokenize())
+    print(f"{'serial':>8}: {serial:7.3f} с  {size_mb / serial:6.2f} МБ/с")
+
+    for workers in WORKERS:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Прогрев: процессы пула запускаются до замера
+            list(pool.map(abs, range(workers)))
+            tokens, elapsed = best_time(lambda: tokenize_parallel(text, workers=workers, executor=pool))
+        if tokens != reference:
+            raise SystemExit(f"workers={workers}: поток токенов отличается от последовательного")
+        print(f"{workers:>8}: {elapsed:7.3f} с  {size_mb / elapsed:6.2f} МБ/с  "
+              f"ускорение {serial / elapsed:4.2f}x")
+
+
+if __name__ == '__main__':
+    main()
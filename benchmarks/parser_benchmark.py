@@ -0,0 +1,72 @@
+"""
+Пропускная способность парсера (токенов/с) на программе, состоящей в основном
+из объявлений: секции type/const/var и процедуры с короткими телами, повторённые
+SCALE раз. Лексер в замер не входит. Для сравнения замеряется и StackParser
+(разбор операторов и выражений на явном стеке). Запуск из корня репозитория:
+
+    python -m benchmarks.parser_benchmark [SCALE]
+"""
+import sys
+import time
+
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from parser.stack_parser import StackParser
+
+DECLARATIONS = """
+type
+  TPoint{n} = record
+    x, y: integer;
+  end;
+  TRow{n} = array [1..8] of integer;
+const
+  limit{n}: integer = {n};
+  name{n}: string = "item";
+  origin{n}: TPoint{n} = (x: 0; y: {n});
+  row{n}: TRow{n} = (1, 2, 3, 4, 5, 6, 7, 8);
+var
+  a{n}, b{n}, c{n}: integer;
+  flag{n}: boolean;
+  grid{n}: array [1..4, 1..4] of integer;
+procedure step{n}(var p: TPoint{n}; k: integer);
+var t: integer;
+begin
+  t := p.x * k + {n};
+  if t > limit{n} then
+    p.y := t div 2
+  else
+    p.x := (t - 1) mod 3;
+  while t > 0 do
+    t := t - 1;
+end;
+function area{n}(p: TPoint{n}): integer;
+begin
+  area{n} := p.x * p.y;
+end;
+"""
+
+
+def make_program(scale):
+    parts = ["program Bench;"]
+    parts.extend(DECLARATIONS.replace("{n}", str(n)) for n in range(scale))
+    parts.append("begin\n  a0 := 1;\nend.")
+    return "\n".join(parts)
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    tokens = Lexer(text=make_program(scale)).tokenize()
+    print(f"Программа: {len(tokens):,} токенов (scale={scale})")
+
+    for parser_class in (Parser, StackParser):
+        best = None
+        for _ in range(5):
+            started = time.perf_counter()
+            parser_class(tokens).parse_program()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{parser_class.__name__:>11}: {best:7.3f} с  {len(tokens) / best:12,.0f} токенов/с")
+
+
+if __name__ == '__main__':
+    main()
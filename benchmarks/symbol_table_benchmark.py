@@ -0,0 +1,67 @@
+"""
+Поиск в SymbolTable на глубине вложенности 1, 8 и 32: общий индекс открытых
+областей (bindings) против обхода цепочки parent. Обход цепочки — это то, как
+lookup работал раньше и как он работает сейчас в закрытой таблице, поэтому для
+сравнения те же области закрываются exit_scope().
+Ищутся глобальное имя (самый дорогой случай для цепочки), локальное и
+необъявленное. Запуск из корня репозитория:
+
+    python -m benchmarks.symbol_table_benchmark [LOOKUPS]
+"""
+import sys
+import time
+
+from lexer.interner import Interner
+from semantic.symbol_table import SymbolTable
+
+DEPTHS = (1, 8, 32)
+NAMES_PER_SCOPE = 20
+
+
+def build(depth, interner):
+    """Корень и depth вложенных областей по NAMES_PER_SCOPE имён; возвращает корень и самую внутреннюю."""
+    root = table = SymbolTable(interner=interner)
+    for level in range(depth + 1):
+        if level:
+            table = table.enter_scope()
+        for number in range(NAMES_PER_SCOPE):
+            table.declare(interner.intern(f"v{level}_{number}"), {"type": "var", "level": level})
+    return root, table
+
+
+def measure(table, names, lookups, repeat=3):
+    best = None
+    rounds = lookups // len(names)
+    lookup = table.lookup
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for name in names:
+                lookup(name)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / (rounds * len(names))
+
+
+def main():
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    print(f"{'глубина':>7} {'имя':>10} {'индекс, нс':>11} {'цепочка, нс':>12} {'ускорение':>10}")
+    for depth in DEPTHS:
+        interner = Interner()
+        root, inner = build(depth, interner)
+        cases = {
+            "глобальное": [interner.intern(f"v0_{number}") for number in range(NAMES_PER_SCOPE)],
+            "локальное": [interner.intern(f"v{depth}_{number}") for number in range(NAMES_PER_SCOPE)],
+            "нет": [interner.intern(f"missing{number}") for number in range(NAMES_PER_SCOPE)],
+        }
+        flat = {case: measure(inner, names, lookups) for case, names in cases.items()}
+        table = inner
+        while table is not root:
+            table = table.exit_scope()
+        for case, names in cases.items():
+            chain = measure(inner, names, lookups)
+            print(f"{depth:>7} {case:>10} {flat[case] * 1e9:>11.0f} {chain * 1e9:>12.0f} {chain / flat[case]:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
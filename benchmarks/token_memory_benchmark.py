@@ -0,0 +1,49 @@
+"""
+Память под токены: список объектов Token против компактного TokenBuffer.
+
+Корпус тот же, что в lexer_benchmark. Память меряется через tracemalloc
+(текст корпуса в замер не входит). Запуск из корня репозитория:
+
+    python -m benchmarks.token_memory_benchmark [SCALE]
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmarks.lexer_benchmark import load_corpus
+from lexer.lexer import Lexer
+
+
+def measure(text, build):
+    lexer = Lexer(text=text, engine="regex")
+    tracemalloc.start()
+    started = time.perf_counter()
+    tokens = build(lexer)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tokens, current, peak, elapsed
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    text = load_corpus(scale)
+    print(f"Корпус: {len(text.encode('utf-8')) / 1e6:.2f} МБ (scale={scale})")
+
+    tokens, list_current, list_peak, list_time = measure(text, Lexer.tokenize)
+    count = len(tokens)
+    del tokens
+    buffer, buffer_current, buffer_peak, buffer_time = measure(text, Lexer.tokenize_buffer)
+    if len(buffer) != count:
+        raise SystemExit("TokenBuffer содержит другое число токенов")
+
+    print(f"Токенов: {count:,}")
+    for name, current, peak, elapsed in (("list[Token]", list_current, list_peak, list_time),
+                                         ("TokenBuffer", buffer_current, buffer_peak, buffer_time)):
+        print(f"{name:>12}: {current / 1e6:8.1f} МБ  (пик {peak / 1e6:8.1f} МБ)  "
+              f"{current / count:6.1f} байт/токен  {elapsed:6.2f} с")
+    print(f"Экономия: в {list_current / buffer_current:.1f} раза")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,39 +1,31 @@
 from parser.ast_node import *
+from parser.visitor import NodeVisitor
+
+
+class CodeGenerator(NodeVisitor):
+    visit_methods = {
+        CompoundStatementNode: 'generate_compound_statement',
+        AssignStatementNode: 'generate_assign_statement',
+        ForStatementNode: 'generate_for_statement',
+        WhileStatementNode: 'generate_while_statement',
+        ExpressionNode: 'generate_expression',
+        SimpleExpressionNode: 'generate_simple_expression',
+        TermNode: 'generate_term',
+        FactorNode: 'generate_factor',
+        ArrayAccessNode: 'generate_array_access',
+        RecordFieldAccessNode: 'generate_record_field_access',
+        IfStatementNode: 'generate_if_statement',
+        ProcedureOrFunctionDeclarationNode: 'generate_proc_or_func_decl',
+        ProcedureCallNode: 'generate_proc_call',
+        FunctionCallNode: 'generate_func_call',
+    }
 
-
-class CodeGenerator:
     def __init__(self):
         self.result = []
 
     def generate(self, node):
-        """Основная функция генерации кода. Определяет тип узла и вызывает соответствующий генератор."""
-        if isinstance(node, CompoundStatementNode):
-            return self.generate_compound_statement(node)
-        elif isinstance(node, AssignStatementNode):
-            return self.generate_assign_statement(node)
-        elif isinstance(node, ForStatementNode):
-            return self.generate_for_statement(node)
-        elif isinstance(node, WhileStatementNode):
-            return self.generate_while_statement(node)
-        elif isinstance(node, ExpressionNode):
-            return self.generate_expression(node)
-        elif isinstance(node, SimpleExpressionNode):
-            return self.generate_simple_expression(node)
-        elif isinstance(node, FactorNode):
-            return self.generate_factor(node)
-        elif isinstance(node, ArrayAccessNode):
-            return self.generate_array_access(node)
-        elif isinstance(node, RecordFieldAccessNode):
-            return self.generate_record_field_access(node)
-        elif isinstance(node, IfStatementNode):
-            return self.generate_if_statement(node)
-        elif isinstance(node, ProcedureOrFunctionDeclarationNode):
-            return self.generate_proc_or_func_decl(node)
-        elif isinstance(node, ProcedureCallNode):
-            return self.generate_proc_call(node)
-        elif isinstance(node, FunctionCallNode):
-            return self.generate_func_call(node)
-        return None
+        """Основная функция генерации кода. Вызывает генератор для класса узла (см. visit_methods); для прочих — None."""
+        return self.visit(node)
 
     def generate_compound_statement(self, node: CompoundStatementNode):
         """Генерирует блок операторов."""
@@ -75,13 +67,24 @@ class CodeGenerator:
 
     def generate_simple_expression(self, node: SimpleExpressionNode):
         """Генерирует сложное (инфиксное) выражение, например: a + b + c."""
-        if len(node.terms) == 1:
-            return self.generate(node.terms[0])
+        return self.generate_operator_chain(node.terms)
+
+    def generate_term(self, node: TermNode):
+        """Генерирует терм, например: a * b div c."""
+        return self.generate_operator_chain(node.factors)
+
+    def generate_operator_chain(self, items):
+        """
+        Генерирует n-арную цепочку [операнд, оператор, операнд, ...] одного
+        приоритета как левоассоциативные бинарные операции.
+        """
+        if len(items) == 1:
+            return self.generate(items[0])
 
-        left = self.generate(node.terms[0])
-        for i in range(1, len(node.terms), 2):
-            operator = node.terms[i]
-            right = self.generate(node.terms[i + 1])
+        left = self.generate(items[0])
+        for i in range(1, len(items), 2):
+            operator = items[i]
+            right = self.generate(items[i + 1])
             left = {
                 "type": "BinaryOperation",
                 "operator": operator,
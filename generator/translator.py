@@ -1,10 +1,25 @@
 import ast
 import re
+from operator import methodcaller
 
+from parser.visitor import NodeVisitor
 from semantic.symbol_table import SymbolTable
+from semantic.types import Type, PrimitiveType, ArrayType, RecordType
+
+
+class Translator(NodeVisitor):
+    # Операторы — словари CodeGenerator, диспетчеризация по их полю "type"
+    dispatch_key = methodcaller("get", "type")
+    visit_methods = {
+        "Assignment": "_translate_assignment",
+        "ProcedureCall": "_translate_procedure_call",
+        "For": "translate_for",
+        "While": "translate_while",
+        "If": "translate_if",
+        "Block": "translate_block",
+        "block": "translate_block",
+    }
 
-
-class Translator:
     def __init__(self, glob_sym_table, semantic_json, statements):
         """
         :param glob_sym_table: глобальная таблица символов с методом lookup(name)
@@ -108,10 +123,39 @@ class Translator:
                 print(f"Ошибка при повторном парсинге: {info_str_fixed}\n{e2}")
                 return {}
 
-    def translate_record(self, name, info):
+    def _type_of(self, name, info, sym_table=None):
+        """
+        Канонический тип символа name; None, если его нет. В строковом semantic_json
+        от типа осталось только имя — тогда объект берётся из записи символа
+        в таблице символов, так что одноимённые типы разных областей не путаются.
+        """
+        type_object = info.get("type_object")
+        if isinstance(type_object, str):
+            symbol = self._lookup_symbol(name, sym_table)
+            type_object = symbol.get("type_object") if isinstance(symbol, dict) else None
+        return type_object if isinstance(type_object, Type) else None
+
+    def _field_type_code(self, field_type):
+        """Размер поля структуры: 1 для integer и boolean, иначе имя типа ('array' для массивов)."""
+        if isinstance(field_type, PrimitiveType) and field_type.name in ("integer", "boolean"):
+            return 1
+        if isinstance(field_type, ArrayType):
+            return "array"
+        return field_type
+
+    def translate_record(self, name, info, sym_table=None):
         """
         Перевод описания record’а в конструкцию
         """
+        record = self._type_of(name, info, sym_table)
+        # Поле неизвестного реестру типа — по старым fields_info
+        if isinstance(record, RecordType) and None not in record.field_types.values():
+            fields_code = " ".join(
+                f"\n ({name}_{field_name} {self._field_type_code(field_type)})"
+                for field_name, field_type in record.fields
+            )
+            return f"(struct {name} {fields_code}\n)"
+
         fields = info.get("fields_info", [])
 
         def map_type_val(field):
@@ -167,11 +211,16 @@ class Translator:
                 inits.append(f"({prefix}_{key} {value_repr})")
         return inits
 
-    def translate_variable(self, name, info):
+    def translate_variable(self, name, info, sym_table=None):
         """
         Перевод объявления переменной.
         Выбирается обработчик для простых переменных, массивов или записей.
         """
+        var_type = self._type_of(name, info, sym_table)
+        if isinstance(var_type, ArrayType):
+            return self._translate_array_var(name, var_type.element, var_type.dimensions[0])
+        if isinstance(var_type, RecordType):
+            return f"({name} {var_type})"
         var_info = info.get("info", {})
         vtype = var_info.get("type")
         if vtype == "array":
@@ -205,9 +254,11 @@ class Translator:
         Для integer не используется умножение на размер.
         """
         var_info = info.get("info", {})
-        element_type = var_info.get("element_type")
-        dims = var_info.get("dimensions")[0]
+        return self._translate_array_var(name, var_info.get("element_type"), var_info.get("dimensions")[0])
+
+    def _translate_array_var(self, name, element_type, dims):
         low, high = dims[0], dims[1]
+        element_type = str(element_type)
         if element_type in ['integer', 'char']:
             return f'({name} (({high} "-" {low}) "+" 1))'
         elif element_type != 'string':
@@ -230,19 +281,20 @@ class Translator:
         # Если local_sym_table не является объектом SymbolTable, оборачиваем его в SymbolTable
         if not hasattr(local_sym_table, "lookup"):
             tmp = SymbolTable()
-            tmp.symbols = local_sym_table
+            for symbol, details in local_sym_table.items():
+                tmp.declare(symbol, details)
             local_sym_table = tmp
 
         local_decls = []
-        for symbol, details in local_sym_table.symbols.items():
+        for symbol, details in local_sym_table.items():
             if details.get("kind") == "parameter":
                 continue
             if details.get("type") == "const":
                 local_decls.append(self.translate_constant(symbol, details))
             elif details.get("type") == "record":
-                local_decls.append(self.translate_record(symbol, details))
+                local_decls.append(self.translate_record(symbol, details, local_sym_table))
             elif details.get("type") == "var":
-                local_decls.append(self.translate_variable(symbol, details))
+                local_decls.append(self.translate_variable(symbol, details, local_sym_table))
             elif "kind" in details:
                 local_decls.append(self.translate_function(symbol, details))
 
@@ -277,21 +329,11 @@ class Translator:
     # Перевод операторов
     # ========================================================
     def translate_statement(self, stmt, sym_table=None):
-        stype = stmt.get("type")
-        if stype == "Assignment":
-            return self._translate_assignment(stmt, sym_table)
-        elif stype == "ProcedureCall":
-            return self._translate_procedure_call(stmt, sym_table)
-        elif stype == "For":
-            return self.translate_for(stmt, sym_table)
-        elif stype == "While":
-            return self.translate_while(stmt, sym_table)
-        elif stype == "If":
-            return self.translate_if(stmt, sym_table)
-        elif stype in ("Block", "block"):
-            return self.translate_block(stmt, sym_table)
-        else:
-            return f";;; Неизвестный оператор: {stype}"
+        # sym_table передаётся по имени: у translate_block второй параметр — indent
+        return self.visit(stmt, sym_table=sym_table)
+
+    def generic_visit(self, stmt, sym_table=None):
+        return f";;; Неизвестный оператор: {stmt.get('type')}"
 
     def _translate_assignment(self, stmt, sym_table):
         # Получаем левую и правую части с учетом lvalue/rvalue.
@@ -320,7 +362,7 @@ class Translator:
                 return f'({self._call_memcpy(target_code, value_code, vinfo.get("element_type"))}))'
         return f"({target_code} \"=\" {value_code})"
 
-    def _translate_procedure_call(self, stmt):
+    def _translate_procedure_call(self, stmt, sym_table=None):
         name = stmt.get("name")
         args = stmt.get("arguments", [])
         args_code = " ".join(self.translate_expr(arg) for arg in args)
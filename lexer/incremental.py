@@ -0,0 +1,235 @@
+from bisect import bisect_left, bisect_right
+
+from lexer.lexer import Lexer, token_appender
+from lexer.token import Token
+from lexer.token_type import TokenType
+
+# Число токенов в блоке TokenStream
+BLOCK_SIZE = 512
+
+# Сколько символов за правкой relex читает сначала; окно удваивается, пока не найдена синхронизация
+WINDOW_SIZE = 4096
+
+
+class _Synchronized(Exception):
+    """Новый токен совпал с прежним: дальше поток не меняется."""
+
+
+class TokenStream:
+    """
+    Поток токенов текста для повторного разбора (relex) — последовательность Token,
+    которую принимает Parser (len, индексация, итерация).
+
+    Токены лежат блоками по BLOCK_SIZE, рядом с каждым хранится смещение его начала
+    в тексте. Правка сдвигает смещения всех последующих токенов, а если меняет число
+    строк — и их номера строк. Эти сдвиги откладываются: правка прибавляет их
+    к счётчикам последующих блоков, а токены блока получают накопленный сдвиг при
+    первом обращении к блоку. Поэтому правка стоит O(число блоков), а не O(число токенов).
+    """
+
+    def __init__(self, text, interner=None):
+        lexer = Lexer(text=text, interner=interner)
+        self.interner = lexer.interner
+        tokens = []
+        starts = []
+        append_token = token_appender(tokens)
+
+        def emit(type_, value, start, end, line, column):
+            append_token(type_, value, start, end, line, column)
+            starts.append(start)
+
+        end = lexer._scan(text, 0, True, emit)
+        tokens.append(Token(TokenType.EOF, "EOF", *lexer.position(end)))
+        starts.append(end)
+
+        self.blocks = []
+        self.starts = []
+        # Номер первого токена блока в потоке
+        self.firsts = []
+        # Отложенные сдвиги строк и смещений токенов блока
+        self.line_shifts = []
+        self.offset_shifts = []
+        self._insert_blocks(0, 0, tokens, starts)
+        self.length = len(tokens)
+
+    def _insert_blocks(self, block, first, tokens, starts):
+        """Вставляет tokens блоками почти равного размера перед блоком block; first — номер первого токена."""
+        count = -(-len(tokens) // BLOCK_SIZE)
+        size = -(-len(tokens) // count)
+        for begin in range(0, len(tokens), size):
+            self.blocks.insert(block, tokens[begin:begin + size])
+            self.starts.insert(block, starts[begin:begin + size])
+            self.firsts.insert(block, first + begin)
+            self.line_shifts.insert(block, 0)
+            self.offset_shifts.insert(block, 0)
+            block += 1
+        return block
+
+    def _flush(self, block):
+        """Применяет к токенам блока отложенные сдвиги."""
+        line_shift = self.line_shifts[block]
+        if line_shift:
+            for token in self.blocks[block]:
+                token.line += line_shift
+            self.line_shifts[block] = 0
+        offset_shift = self.offset_shifts[block]
+        if offset_shift:
+            self.starts[block] = [start + offset_shift for start in self.starts[block]]
+            self.offset_shifts[block] = 0
+
+    def _locate(self, index):
+        """(блок, номер в блоке) токена index; отложенные сдвиги блока применяются."""
+        block = bisect_right(self.firsts, index) - 1
+        self._flush(block)
+        return block, index - self.firsts[block]
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("TokenStream index out of range")
+        block, position = self._locate(index)
+        return self.blocks[block][position]
+
+    def __iter__(self):
+        for block in range(len(self.blocks)):
+            self._flush(block)
+            yield from self.blocks[block]
+
+    def start(self, index):
+        """Смещение начала токена index в тексте."""
+        block, position = self._locate(index)
+        return self.starts[block][position]
+
+    def bisect(self, offset, lo=0):
+        """Номер первого токена (не раньше lo), который начинается не раньше offset."""
+        block = bisect_right(range(len(self.blocks)), offset,
+                             key=lambda block: self.starts[block][0] + self.offset_shifts[block]) - 1
+        if block < 0:
+            return lo
+        self._flush(block)
+        index = self.firsts[block] + bisect_left(self.starts[block], offset)
+        return max(index, lo)
+
+    def replace(self, start, stop, tokens, starts, offset_shift, line_shift):
+        """
+        Заменяет токены [start, stop) на tokens (с началами starts); у токенов
+        с номера stop смещения сдвигаются на offset_shift, строки — на line_shift.
+        """
+        first_block, first_position = self._locate(start)
+        last_block, last_position = self._locate(stop)
+
+        tail = self.blocks[last_block][last_position:]
+        tail_starts = self.starts[last_block][last_position:]
+        if line_shift:
+            for token in tail:
+                token.line += line_shift
+        merged = self.blocks[first_block][:first_position] + tokens + tail
+        merged_starts = (self.starts[first_block][:first_position] + starts
+                         + [old_start + offset_shift for old_start in tail_starts])
+
+        first = self.firsts[first_block]
+        del self.blocks[first_block:last_block + 1], self.starts[first_block:last_block + 1]
+        del self.firsts[first_block:last_block + 1]
+        del self.line_shifts[first_block:last_block + 1], self.offset_shifts[first_block:last_block + 1]
+        after = self._insert_blocks(first_block, first, merged, merged_starts)
+
+        count_shift = len(tokens) - (stop - start)
+        self.length += count_shift
+        firsts, line_shifts, offset_shifts = self.firsts, self.line_shifts, self.offset_shifts
+        for block in range(after, len(self.blocks)):
+            firsts[block] += count_shift
+            line_shifts[block] += line_shift
+            offset_shifts[block] += offset_shift
+
+
+def relex(text, tokens, offset, removed, inserted):
+    """
+    Повторный лексический разбор после правки текста.
+
+    text — прежний текст, tokens — его TokenStream. Правка заменяет removed символов
+    начиная с offset на строку inserted. Разбирается заново только область от токена
+    перед правкой до точки синхронизации — первого начала токена за правкой, которое
+    совпадает (со сдвигом) с началом прежнего токена: дальше текст тот же, а лексер
+    между токенами состояния не имеет, поэтому и токены те же.
+
+    Новый текст целиком не собирается: лексер читает окно из прежнего текста до правки,
+    inserted и прежнего текста за правкой, удваивая его, пока не найдёт синхронизацию.
+    Строка и столбец правки берутся от ближайшего токена перед ней, а не отсчитываются
+    от начала текста.
+
+    tokens изменяется на месте: повреждённый участок заменяется новыми токенами.
+    У токенов той же строки сразу за правкой сдвигаются столбцы, у всех последующих —
+    смещения и (если правка добавила или убрала переводы строк) строки; последние
+    два сдвига TokenStream применяет лениво, поблочно.
+
+    Возвращает (start, old_stop, new_stop): токены tokens[start:old_stop] прежнего
+    потока заменены на tokens[start:new_stop].
+    """
+    # Разбор начинаем с последнего токена, который начинается до правки:
+    # он мог продолжиться вставленным текстом
+    start = tokens.bisect(offset) - 1
+    if start < 0:
+        # Правка до первого токена: перед ним только пробелы
+        start, start_offset, start_line, start_column = 0, 0, 1, 1
+    else:
+        token = tokens[start]
+        start_offset, start_line, start_column = tokens.start(start), token.line, token.column
+
+    offset_shift = len(inserted) - removed
+    edit_end = offset + len(inserted)
+    head = text[start_offset:offset] + inserted
+    new_tokens = []
+    new_starts = []
+    append_token = token_appender(new_tokens)
+    stop = start
+
+    def emit(type_, value, begin, end, line, column):
+        nonlocal stop
+        new_start = start_offset + begin
+        if new_start >= edit_end:
+            # Ищем прежний токен, начинавшийся в том же месте текста
+            old_start = new_start - offset_shift
+            stop = tokens.bisect(old_start, stop)
+            if stop < len(tokens) - 1 and tokens.start(stop) == old_start:
+                raise _Synchronized(line, column)
+        append_token(type_, value, begin, end, line, column)
+        new_starts.append(new_start)
+
+    lexer = Lexer(text=head, interner=tokens.interner)
+    pos = 0
+    size = WINDOW_SIZE
+    while True:
+        tail_end = offset + removed + size
+        final = tail_end >= len(text)
+        window = head + text[offset + removed:tail_end]
+        if pos:
+            line, column = lexer.position(pos)
+            lexer._anchor(window, pos, line, pos - column + 1)
+        else:
+            lexer._anchor(window, 0, start_line, 1 - start_column)
+        try:
+            pos = lexer._scan(window, pos, final, emit)
+        except _Synchronized as synchronized:
+            new_line, new_column = synchronized.args
+            break
+        if final:
+            # Конец текста: синхронизация с прежним EOF
+            stop = len(tokens) - 1
+            new_line, new_column = lexer.position(len(window))
+            break
+        size *= 2
+
+    # Токены прежней строки за точкой синхронизации сдвигаются по столбцу, остальные — по строке
+    old_token = tokens[stop]
+    old_line, column_shift = old_token.line, new_column - old_token.column
+    if column_shift:
+        index = stop
+        while index < len(tokens) and tokens[index].line == old_line:
+            tokens[index].column += column_shift
+            index += 1
+    tokens.replace(start, stop, new_tokens, new_starts, offset_shift, new_line - old_line)
+    return start, stop, start + len(new_tokens)
@@ -0,0 +1,46 @@
+class Symbol(str):
+    """
+    Интернированное имя идентификатора. Это обычная строка (с исходным написанием),
+    у которой есть id — номер имени без учёта регистра в таблице Interner.
+    Одинаковые идентификаторы программы — один и тот же объект Symbol.
+    """
+
+
+class Interner:
+    """
+    Таблица интернирования идентификаторов. Паскаль не различает регистр,
+    поэтому ключ имени — его запись в нижнем регистре; она вычисляется один раз
+    для каждого написания. Номера стабильны: выдаются по порядку и не меняются.
+    """
+
+    def __init__(self):
+        self.ids = {}        # ключ в нижнем регистре -> id
+        self.keys = []       # id -> ключ в нижнем регистре
+        self.spellings = {}  # написание -> Symbol
+
+    def __len__(self):
+        return len(self.keys)
+
+    def intern(self, name):
+        """Возвращает Symbol для написания name, при необходимости заводя новый id."""
+        symbol = self.spellings.get(name)
+        if symbol is None:
+            key = name.lower()
+            id_ = self.ids.get(key)
+            if id_ is None:
+                id_ = self.ids[key] = len(self.keys)
+                self.keys.append(key)
+            symbol = Symbol(name)
+            symbol.id = id_
+            self.spellings[name] = symbol
+        return symbol
+
+    def lookup(self, name):
+        """Возвращает id имени или None, если такое имя ещё не встречалось."""
+        symbol = self.spellings.get(name)
+        if symbol is not None:
+            return symbol.id
+        return self.ids.get(name.lower())
+
+    def key(self, id_):
+        return self.keys[id_]
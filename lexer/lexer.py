@@ -1,106 +1,257 @@
+import io
+import re
+
 from custom_exceptions.lexer_error import LexerError
 from lexer.token_type import TokenType
-from lexer.token import Token
+from lexer.token import Token, number_literal
+from lexer.token_buffer import TokenBuffer
+from lexer.line_index import LineIndex
+from lexer.interner import Interner
+from lexer.mapped_source import (
+    MappedSource, MappedToken, BYTES_TOKEN_PATTERN, NON_ASCII_PATTERN,
+)
+
+
+# Движки лексера: посимвольный (исходный) и на одном общем регулярном выражении
+ENGINE_CHAR = "char"
+ENGINE_REGEX = "regex"
+ENGINES = (ENGINE_CHAR, ENGINE_REGEX)
+
+# Размер куска (в символах) для потокового чтения в Lexer.iter_tokens
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Слова, которые совпадают с именами TokenType, но остаются идентификаторами
+PLAIN_WORDS = ('number', 'string', 'char')
+
+OPERATORS = {
+    '+': TokenType.PLUS,
+    '-': TokenType.MINUS,
+    '*': TokenType.ASTERISK,
+    '/': TokenType.SLASH,
+    ';': TokenType.SEMICOLON,
+    '(': TokenType.LPAREN,
+    ')': TokenType.RPAREN,
+    '[': TokenType.LBRACKET,
+    ']': TokenType.RBRACKET,
+    ',': TokenType.COMMA,
+    '.': TokenType.DOT,
+    '..': TokenType.TWODOTS,
+    ':': TokenType.COLON,
+    ':=': TokenType.ASSIGN,
+    '=': TokenType.EQ,
+    '<': TokenType.LT,
+    '<>': TokenType.NEQ,
+    '>': TokenType.GT,
+}
+
+# Комментарии: { ... }, (* ... *) (не вкладываются) и // до конца строки.
+# Закрывающая последовательность для каждого открывающего символа
+COMMENT_CLOSINGS = {'{': '}', '(*': '*)', '//': '\n'}
+
+# Общий шаблон для движка ENGINE_REGEX. Порядок альтернатив важен:
+# пробелы, комментарии, числа, слова, строки, символы и в конце операторы
+# (длинные раньше коротких, '(*' и '//' — раньше '(' и '/'). Незакрытый '(*'
+# шаблон не покрывает: ошибку о нём выдаёт посимвольный движок.
+TOKEN_PATTERN = re.compile(r"""
+      (?P<SPACE>\s+)
+    | (?P<COMMENT>\{[^}]*\}|\(\*.*?\*\)|//[^\n]*)
+    | (?P<NUMBER>\d+)
+    | (?P<WORD>[^\W\d_][^\W_]*)
+    | "(?P<STRING>(?:[^"\\]|\\.)*)(?:"|\Z)
+    | '(?P<CHAR>.)'
+    | (?P<OPERATOR>:=|<>|\.\.|\((?!\*)|[-+*/;)\[\],.:=<>])
+""", re.VERBOSE | re.DOTALL)
+
+ESCAPE_PATTERN = re.compile(r"\\(.)", re.DOTALL)
+DIGITS_PATTERN = re.compile(r"\d+")
+
+
+def keyword_type(value):
+    """Определяет тип слова: булев литерал, ключевое слово или идентификатор."""
+    lowered = value.lower()
+    if lowered == 'true':
+        return TokenType.TRUE
+    elif lowered == 'false':
+        return TokenType.FALSE
+    if lowered in PLAIN_WORDS:
+        return TokenType.IDENTIFIER
+    return TokenType.__members__.get(value.upper(), TokenType.IDENTIFIER)
+
+
+def token_appender(tokens):
+    """Возвращает emit для Lexer._scan, который складывает объекты Token в список tokens."""
+    append = tokens.append
+
+    def emit(type_, value, start, end, line, column):
+        token = Token(type_, value, line, column)
+        if type_ is TokenType.NUMBER:
+            token.literal = number_literal(value)
+        append(token)
+    return emit
 
 
 class Lexer:
-    def __init__(self, filename=None, text=None):
-        if filename:
+    def __init__(self, filename=None, text=None, engine=ENGINE_CHAR, stream=None, use_mmap=False,
+                 interner=None):
+        self.stream = None
+        self.source = None
+        if filename and use_mmap:
+            # Файл не читается целиком: tokenize разбирает его байты через mmap
+            self.source = MappedSource(filename)
+            self.text = None
+        elif filename:
             with open(filename) as f:
                 self.text = f.read( )
-        elif text:
+        elif text is not None:
             self.text = text
+        elif stream is not None:
+            # Текстовый файловый объект: читается кусками в iter_tokens
+            self.stream = stream
+            self.text = ""
         else:
-            raise ValueError("Either 'filename' or 'text' must be provided.")
+            raise ValueError("Either 'filename', 'text' or 'stream' must be provided.")
+
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown lexer engine '{engine}', expected one of {ENGINES}.")
+        self.engine = engine
 
         self.current_pos = 0
-        self.line = 1
-        self.column = 1
+        # Строка и столбец не отслеживаются посимвольно: они вычисляются
+        # по смещению через индекс начал строк (см. position)
+        self._index = None
+        # Идентификаторы интернируются: одинаковые имена — один объект Symbol с общим id.
+        # Таблицу можно разделить между несколькими лексерами.
+        self.interner = interner if interner is not None else Interner()
+        # Кэш уже встреченных слов: написание -> (тип токена, значение)
+        self._words = {}
+
+    @property
+    def line(self):
+        return self.position()[0]
+
+    @property
+    def column(self):
+        return self.position()[1]
+
+    def position(self, offset=None):
+        """Возвращает (строка, столбец) смещения offset, по умолчанию — текущей позиции."""
+        if offset is None:
+            offset = self.current_pos
+        if self._index is None:
+            self._index = LineIndex(self.text)
+        return self._index.position(offset)
+
+    def _anchor(self, text, pos, line, line_start):
+        """
+        Переносит лексер на смещение pos текста text, где идёт строка line,
+        начавшаяся со смещения line_start. Нужно, когда text — кусок источника.
+        """
+        self.text = text
+        self.current_pos = pos
+        self._index = LineIndex(text, pos, line, line_start)
 
     def raise_error(self, message):
         raise LexerError(message, self.line , self.column)
 
+    def classify_word(self, word):
+        """
+        Возвращает (тип токена, значение) для слова. Тип вычисляется один раз
+        на каждое написание; значение идентификатора — Symbol из self.interner.
+        """
+        entry = self._words.get(word)
+        if entry is None:
+            type_ = keyword_type(word)
+            value = self.interner.intern(word) if type_ == TokenType.IDENTIFIER else word
+            entry = self._words[word] = (type_, value)
+        return entry
+
     def next_char(self):
         """Возвращает текущий символ и смещает указатель."""
         if self.current_pos < len(self.text):
             char = self.text[self.current_pos]
             self.current_pos += 1
-            if char == '\n':
-                self.line += 1
-                self.column = 1
-            else:
-                self.column += 1
             return char
         return None
 
     def read_space(self):
-        """Пропускает пробелы и символы новой строки."""
-        while self.current_pos < len(self.text) and self.text[self.current_pos].isspace():
-            self.next_char()
+        """Пропускает пробелы, символы новой строки и комментарии."""
+        text = self.text
+        while self.current_pos < len(text):
+            if text[self.current_pos].isspace():
+                self.current_pos += 1
+            elif not self.skip_comment():
+                break
+
+    def skip_comment(self):
+        """
+        Если с текущей позиции начинается комментарий, переходит за его конец
+        (конец ищется через str.find) и возвращает True.
+        """
+        text = self.text
+        pos = self.current_pos
+        opening = text[pos]
+        if opening == '(' or opening == '/':
+            opening = text[pos:pos + 2]
+        closing = COMMENT_CLOSINGS.get(opening)
+        if closing is None:
+            return False
+
+        end = text.find(closing, pos + len(opening))
+        if end != -1:
+            self.current_pos = end + len(closing)
+        elif opening == '//':
+            # Однострочный комментарий в последней строке
+            self.current_pos = len(text)
+        else:
+            self.raise_error(f"Не завершён комментарий на строке {self.line}, столбце {self.column}")
+        return True
 
     def read_identifier_or_keyword(self):
         """Считывает идентификатор или ключевое слово."""
         start_pos = self.current_pos
-        start_column = self.column
 
         while self.current_pos < len(self.text) and self.text[self.current_pos].isalnum():
-            self.next_char()
-
-        value = self.text[start_pos:self.current_pos]
-
-        # Добавляем обработку булевых литералов
-        if value.lower() == 'true':
-            return Token(TokenType.TRUE, value, self.line, start_column)
-        elif value.lower() == 'false':
-            return Token(TokenType.FALSE, value, self.line, start_column)
+            self.current_pos += 1
 
-        # Обработка других ключевых слов или идентификаторов
-        if value.lower() in ['number', 'string', 'char']:
-            type_ = TokenType.IDENTIFIER
-        else:
-            type_ = TokenType[value.upper()] if value.upper() in TokenType.__members__ else TokenType.IDENTIFIER
+        type_, value = self.classify_word(self.text[start_pos:self.current_pos])
 
-        return Token(type_, value, self.line, start_column)
+        return Token(type_, value, *self.position(start_pos))
 
     def read_string(self):
         """Читает строку, заключенную в кавычки."""
-        start_pos = self.current_pos
-        start_column = self.column
-        string_value = ""
-
-        # Пропускаем начальную кавычку
-        self.next_char()
-
-        while self.current_pos < len(self.text):
-            char = self.next_char()
-
-            if char == '"':
+        start_line, start_column = self.position()
+        text = self.text
+        begin = self.current_pos + 1
+
+        # Ищем закрывающую кавычку: экранирована та, перед которой нечётное число '\\'
+        end = text.find('"', begin)
+        while end != -1:
+            backslash = end
+            while backslash > begin and text[backslash - 1] == "\\":
+                backslash -= 1
+            if (end - backslash) % 2 == 0:
                 break
+            end = text.find('"', end + 1)
+
+        if end == -1:
+            # Незавершённая строка продолжается до конца текста
+            raw = text[begin:]
+            self.current_pos = len(text)
+            if (len(raw) - len(raw.rstrip("\\"))) % 2:
+                self.raise_error(f"Неверная escape-последовательность в строке {self.line}, столбец {self.column}")
+                #raise ValueError(f"Invalid escape sequence at line {self.line}, column {self.column}")
+        else:
+            raw = text[begin:end]
+            self.current_pos = end + 1
 
-            elif char == "\\":
-                if self.current_pos < len(self.text):
-                    next_char = self.text[self.current_pos]
-                    string_value += next_char
-                    self.next_char()
-                else:
-                    self.raise_error(f"Неверная escape-последовательность в строке {self.line}, столбец {self.column}")
-                    #raise ValueError(f"Invalid escape sequence at line {self.line}, column {self.column}")
-
-            else:
-                string_value += char
-
-        """
-        if self.text[self.current_pos] != '"':
-            raise ValueError(f"Unterminated string literal at line {self.line}, column {self.column}")
-        """
-
+        # Escape-последовательности раскрываются разом для всей строки
+        string_value = ESCAPE_PATTERN.sub(r'\1', raw) if "\\" in raw else raw
 
-        return Token(TokenType.STRING, string_value, self.line, start_column)
+        return Token(TokenType.STRING, string_value, start_line, start_column)
 
     def read_char(self):
         """Читает символьный литерал, заключенный в одинарные кавычки."""
-        start_pos = self.current_pos
-        start_column = self.column
+        start_line, start_column = self.position()
 
         # Пропускаем начальную кавычку
         self.next_char()
@@ -121,120 +272,407 @@ class Lexer:
         # Пропускаем закрывающую кавычку
         self.next_char()
 
-        return Token(TokenType.CHAR, char, self.line, start_column)
+        return Token(TokenType.CHAR, char, start_line, start_column)
 
     def read_number(self):
         """Читает число."""
         start_pos = self.current_pos
-        start_column = self.column
-        number_value = ""
+        text = self.text
 
-        while self.current_pos < len(self.text) and self.text[self.current_pos].isdigit():
-            number_value += self.next_char()
+        # Десятичные цифры берём регулярным выражением, прочие (например, '²') — посимвольно
+        match = DIGITS_PATTERN.match(text, start_pos)
+        pos = match.end() if match else start_pos
+        while pos < len(text) and text[pos].isdigit():
+            pos += 1
+        self.current_pos = pos
 
-        return Token(TokenType.NUMBER, number_value, self.line, start_column)
+        value = text[start_pos:pos]
+        token = Token(TokenType.NUMBER, value, *self.position(start_pos))
+        token.literal = number_literal(value)
+        return token
 
     def read_operator_or_punctuation(self):
         """Читает операторы и знаки препинания."""
         char = self.text[self.current_pos]
+        line, start_column = self.position()
         if char == '+':
             self.next_char()
-            return Token(TokenType.PLUS, '+', self.line, self.column)
+            return Token(TokenType.PLUS, '+', line, start_column)
         elif char == '-':
             self.next_char()
-            return Token(TokenType.MINUS, '-', self.line, self.column)
+            return Token(TokenType.MINUS, '-', line, start_column)
         elif char == '*':
             self.next_char()
-            return Token(TokenType.ASTERISK, '*', self.line, self.column)
+            return Token(TokenType.ASTERISK, '*', line, start_column)
         elif char == '/':
             self.next_char()
-            return Token(TokenType.SLASH, '/', self.line, self.column)
+            return Token(TokenType.SLASH, '/', line, start_column)
         elif char == ';':
             self.next_char()
-            return Token(TokenType.SEMICOLON, ';', self.line, self.column)
+            return Token(TokenType.SEMICOLON, ';', line, start_column)
         elif char == '(':
             self.next_char()
-            return Token(TokenType.LPAREN, '(', self.line, self.column)
+            return Token(TokenType.LPAREN, '(', line, start_column)
         elif char == ')':
             self.next_char()
-            return Token(TokenType.RPAREN, ')', self.line, self.column)
+            return Token(TokenType.RPAREN, ')', line, start_column)
         elif char == '[':
             self.next_char()
-            return Token(TokenType.LBRACKET, '[', self.line, self.column)
+            return Token(TokenType.LBRACKET, '[', line, start_column)
         elif char == ']':
             self.next_char()
-            return Token(TokenType.RBRACKET, ']', self.line, self.column)
+            return Token(TokenType.RBRACKET, ']', line, start_column)
         elif char == ',':
             self.next_char()
-            return Token(TokenType.COMMA, ',', self.line, self.column)
+            return Token(TokenType.COMMA, ',', line, start_column)
         elif char == '.':
-            start_column = self.column  # Сохраняем начальный столбец
             self.next_char()  # Пропускаем текущую точку
             if self.current_pos < len(self.text) and self.text[self.current_pos] == '.':
                 self.next_char()  # Пропускаем вторую точку
-                return Token(TokenType.TWODOTS, '..', self.line, start_column)
+                return Token(TokenType.TWODOTS, '..', line, start_column)
             else:
-                return Token(TokenType.DOT, '.', self.line, start_column)
+                return Token(TokenType.DOT, '.', line, start_column)
         elif char == ':':
             self.next_char()
-            if self.text[self.current_pos] == '=':
+            if self.current_pos < len(self.text) and self.text[self.current_pos] == '=':
                 self.next_char()
-                return Token(TokenType.ASSIGN, ':=', self.line, self.column)
-            return Token(TokenType.COLON, ':', self.line, self.column)
+                return Token(TokenType.ASSIGN, ':=', line, start_column)
+            return Token(TokenType.COLON, ':', line, start_column)
         elif char == '=':
             self.next_char()
-            return Token(TokenType.EQ, '=', self.line, self.column)
+            return Token(TokenType.EQ, '=', line, start_column)
         elif char == '<':
             self.next_char()
-            if self.text[self.current_pos] == '>':
+            if self.current_pos < len(self.text) and self.text[self.current_pos] == '>':
                 self.next_char()
-                return Token(TokenType.NEQ, '<>', self.line, self.column)
-            return Token(TokenType.LT, '<', self.line, self.column)
+                return Token(TokenType.NEQ, '<>', line, start_column)
+            return Token(TokenType.LT, '<', line, start_column)
         elif char == '>':
             self.next_char()
-            return Token(TokenType.GT, '>', self.line, self.column)
+            return Token(TokenType.GT, '>', line, start_column)
 
         return None
 
-    def tokenize(self):
-        tokens = []
-
+    def read_token(self):
+        """Считывает один токен посимвольно. Возвращает None, если текст закончился."""
         while self.current_pos < len(self.text):
             char = self.text[self.current_pos]
 
-            # Пропускаем пробелы
-            if char.isspace():
+            # Пропускаем пробелы и комментарии
+            if char.isspace() or self.skip_comment():
                 self.read_space()
                 continue
 
             # Если строка
             if char == '"':
-                tokens.append(self.read_string())
-                continue
+                return self.read_string()
 
             if char == "'":
-                tokens.append(self.read_char())
-                continue
+                return self.read_char()
 
             # Если число
             if char.isdigit():
-                tokens.append(self.read_number())
-                continue
+                return self.read_number()
 
             # Если идентификатор или ключевое слово
             if char.isalpha():
-                tokens.append(self.read_identifier_or_keyword())
-                continue
+                return self.read_identifier_or_keyword()
 
             # Если оператор или знак препинания
             operator_token = self.read_operator_or_punctuation()
             if operator_token:
-                tokens.append(operator_token)
-                continue
+                return operator_token
 
             #raise ValueError(f"Unexpected character '{char}' at line {self.line}, column {self.column}")
             self.raise_error( f"Неожиданный символ '{char}' на строке {self.line}, столбце {self.column}")
 
-        tokens.append(Token(TokenType.EOF, "EOF", self.line, self.column))
+        return None
+
+    def tokenize(self):
+        if self.source is not None:
+            return self.tokenize_mmap()
+        if self.stream is not None:
+            return list(self.iter_tokens())
+        if self.engine == ENGINE_REGEX:
+            return self.tokenize_regex()
+
+        tokens = []
+
+        while True:
+            token = self.read_token()
+            if token is None:
+                break
+            tokens.append(token)
+
+        tokens.append(Token(TokenType.EOF, "EOF", *self.position()))
+        return tokens
+
+    def tokenize_regex(self):
+        """
+        Разбивает текст одним проходом по общему шаблону TOKEN_PATTERN.
+        Позиции считаются по смещениям совпадений, а не посимвольно.
+        Там, где шаблон не срабатывает (ошибка или экзотический Unicode),
+        ровно один токен читается посимвольным движком — поэтому поток токенов
+        и сообщения об ошибках совпадают с ENGINE_CHAR.
+        """
+        tokens = []
+        self._scan(self.text, self.current_pos, True, token_appender(tokens))
+        tokens.append(Token(TokenType.EOF, "EOF", *self.position()))
+        return tokens
+
+    def tokenize_buffer(self):
+        """
+        Как tokenize_regex, но складывает токены в компактный TokenBuffer
+        вместо списка объектов Token. Parser принимает его напрямую.
+        """
+        if self.text is None or self.stream is not None:
+            raise ValueError("TokenBuffer can only be built from 'filename' or 'text' without mmap.")
+        buffer = TokenBuffer(self.text, self.interner)
+        self._scan(self.text, self.current_pos, True, buffer.append)
+        buffer.append(TokenType.EOF, "EOF", self.current_pos, self.current_pos, *self.position())
+        return buffer
+
+    def tokenize_mmap(self):
+        """
+        Разбирает отображённый в память файл (UTF-8) по байтовому шаблону
+        BYTES_TOKEN_PATTERN, не декодируя текст целиком.
+        Числа, строки и символы — MappedToken: значение вырезается из файла
+        только при обращении к token.value. Слова декодируются сразу (нужно
+        определить ключевое слово), но каждое различное слово — один раз.
+        Слова с не-ASCII байтами и ошибки разбираются посимвольным движком,
+        поэтому поток токенов совпадает с ENGINE_CHAR. Столбцы считаются в символах.
+        """
+        source = self.source
+        data = source.data
+        length = len(data)
+        operators = {value.encode(): (type_, value) for value, type_ in OPERATORS.items()}
+        words = {}
+        tokens = []
+        append = tokens.append
+        pos = 0
+        line = 1
+        # Начало строки с поправкой на многобайтные символы: столбец = pos - line_start + 1
+        line_start = 0
+
+        while pos < length:
+            for match in BYTES_TOKEN_PATTERN.finditer(data, pos):
+                start, end = match.span()
+                if start != pos:
+                    break
+                kind = match.lastgroup
+
+                if kind == 'SPACE':
+                    newline = data.find(b'\n', start, end)
+                    while newline != -1:
+                        line += 1
+                        line_start = newline + 1
+                        newline = data.find(b'\n', newline + 1, end)
+                    pos = end
+                    continue
+                if kind == 'COMMENT':
+                    newline = data.find(b'\n', start, end)
+                    while newline != -1:
+                        line += 1
+                        line_start = newline + 1
+                        newline = data.find(b'\n', newline + 1, end)
+                    tail = max(line_start, start)
+                    if NON_ASCII_PATTERN.search(data, tail, end):
+                        line_start += source.continuation_bytes(tail, end)
+                    pos = end
+                    continue
+
+                column = start - line_start + 1
+                if kind == 'WORD':
+                    value = match.group()
+                    entry = words.get(value)
+                    if entry is None:
+                        if not value.isascii():
+                            break
+                        entry = words[value] = self.classify_word(value.decode('ascii'))
+                    append(Token(entry[0], entry[1], line, column))
+                elif kind == 'OPERATOR':
+                    type_, value = operators[match.group()]
+                    append(Token(type_, value, line, column))
+                elif kind == 'NUMBER':
+                    # За ASCII-цифрами может идти цифра другой письменности
+                    if end < length and data[end] > 0x7f:
+                        break
+                    append(MappedToken(TokenType.NUMBER, source, start, end, line, column))
+                elif kind == 'STRING':
+                    value_start, value_end = match.span('STRING')
+                    append(MappedToken(TokenType.STRING, source, value_start, value_end, line, column))
+                    newline = data.find(b'\n', start, end)
+                    while newline != -1:
+                        line += 1
+                        line_start = newline + 1
+                        newline = data.find(b'\n', newline + 1, end)
+                    tail = max(line_start, start)
+                    if NON_ASCII_PATTERN.search(data, tail, end):
+                        line_start += source.continuation_bytes(tail, end)
+                else:
+                    value_start, value_end = match.span('CHAR')
+                    append(MappedToken(TokenType.CHAR, source, value_start, value_end, line, column))
+                    if data[value_start] == 0x0a:
+                        line += 1
+                        line_start = value_start + 1
+                    else:
+                        line_start += value_end - value_start - 1
+                pos = end
+
+            if pos >= length:
+                break
+            # Шаблон не покрыл текущую позицию: один токен читаем посимвольно
+            token, pos, line, column = self._read_mapped_token(pos, line, pos - line_start + 1)
+            if token is not None:
+                append(token)
+            line_start = pos - column + 1
+
+        self._anchor(None, pos, line, line_start)
+        tokens.append(Token(TokenType.EOF, "EOF", line, pos - line_start + 1))
         return tokens
 
+    def _read_mapped_token(self, pos, line, column):
+        """
+        Читает посимвольным движком один токен отображённого файла с байта pos.
+        Декодируется только остаток строки (для строкового литерала — остаток файла).
+        Возвращает токен (или None), новую позицию в байтах, строку и столбец.
+        """
+        data = self.source.data
+        if data[pos] == 0x22:
+            window_end = len(data)
+        else:
+            newline = data.find(b'\n', pos)
+            window_end = len(data) if newline == -1 else newline + 1
+        window = data[pos:window_end].decode('utf-8')
+
+        reader = Lexer(text=window)
+        reader._anchor(window, 0, line, 1 - column)
+        token = reader.read_token()
+        consumed = len(window[:reader.current_pos].encode('utf-8'))
+        return (token, pos + consumed) + reader.position()
+
+    def iter_tokens(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Генератор токенов: читает источник кусками по chunk_size символов
+        и отдаёт токены по мере разбора, последним — EOF.
+        Токен, который может продолжиться в следующем куске (упирается в конец
+        буфера), откладывается до следующего чтения, поэтому границы кусков
+        не влияют на результат. Память зависит от размера куска и самого
+        длинного токена, но не от размера файла.
+        """
+        stream = self.stream if self.stream is not None else io.StringIO(self.text)
+        buffer = ""
+        pos = 0
+        line, column = self.position()
+        line_start = 1 - column
+
+        while True:
+            chunk = stream.read(chunk_size)
+            final = not chunk
+            # Отбрасываем уже разобранную часть буфера
+            buffer = buffer[pos:] + chunk
+            self._anchor(buffer, 0, line, line_start - pos)
+
+            tokens = []
+            pos = self._scan(buffer, 0, final, token_appender(tokens))
+            yield from tokens
+
+            line, column = self.position(pos)
+            line_start = pos - column + 1
+            if final:
+                break
+
+        yield Token(TokenType.EOF, "EOF", line, column)
+
+    def _scan(self, text, pos, final, emit):
+        """
+        Разбирает text начиная с pos по шаблону TOKEN_PATTERN и для каждого токена
+        вызывает emit(type_, value, start, end, line, column), где start и end —
+        границы лексемы в text.
+        text должен быть self.text: строка и столбец pos берутся из self.position.
+        Если final ложно, text — лишь очередной кусок источника: токены, упирающиеся
+        в конец text, не выдаются. Возвращает позицию, на которой разбор остановился.
+        """
+        length = len(text)
+        limit = length if final else length - 1
+        operators = OPERATORS
+        words = self._words
+        line, column = self.position(pos)
+        line_start = pos - column + 1
+
+        while pos < length:
+            deferred = False
+            for match in TOKEN_PATTERN.finditer(text, pos):
+                start, end = match.span()
+                if start != pos:
+                    break
+                if end > limit:
+                    deferred = True
+                    break
+                kind = match.lastgroup
+
+                if kind == 'SPACE' or kind == 'COMMENT':
+                    if '\n' in match.group():
+                        line += text.count('\n', start, end)
+                        line_start = text.rfind('\n', start, end) + 1
+                    pos = end
+                    continue
+
+                column = start - line_start + 1
+                if kind == 'WORD':
+                    entry = words.get(match.group())
+                    if entry is None:
+                        value = match.group()
+                        if not value[0].isalpha():
+                            break
+                        entry = self.classify_word(value)
+                    emit(entry[0], entry[1], start, end, line, column)
+                elif kind == 'OPERATOR':
+                    value = match.group()
+                    emit(operators[value], value, start, end, line, column)
+                elif kind == 'NUMBER':
+                    if end < length and text[end] > '\x7f' and text[end].isdigit():
+                        break
+                    emit(TokenType.NUMBER, match.group(), start, end, line, column)
+                elif kind == 'STRING':
+                    value = match.group('STRING')
+                    if '\\' in value:
+                        value = ESCAPE_PATTERN.sub(r'\1', value)
+                    emit(TokenType.STRING, value, start, end, line, column)
+                    newlines = text.count('\n', start, end)
+                    if newlines:
+                        line += newlines
+                        line_start = text.rfind('\n', start, end) + 1
+                else:
+                    value = match.group('CHAR')
+                    emit(TokenType.CHAR, value, start, end, line, column)
+                    if value == '\n':
+                        line += 1
+                        line_start = start + 2
+                pos = end
+
+            if pos >= length or deferred:
+                break
+            if not final:
+                # Литерал или комментарий мог оборваться на границе куска: ждём продолжения
+                char = text[pos]
+                if char == '"' or char == '{' or (char == "'" and length - pos < 3) \
+                        or text.startswith('(*', pos):
+                    break
+
+            # Шаблон не покрыл текущую позицию: один токен читаем посимвольно
+            self.current_pos = pos
+            self.read_space()
+            start = self.current_pos
+            token = self.read_token()
+            if not final and self.current_pos >= length:
+                # Токен может продолжиться в следующем куске
+                break
+            if token is not None:
+                emit(token.type_, token.value, start, self.current_pos, token.line, token.column)
+            pos = self.current_pos
+            line, column = self.position()
+            line_start = pos - column + 1
+
+        self.current_pos = pos
+        return pos
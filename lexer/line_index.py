@@ -0,0 +1,43 @@
+from array import array
+from bisect import bisect_right
+
+
+class LineIndex:
+    """
+    Индекс начал строк текста: переводит смещение в (строка, столбец)
+    двоичным поиском. Индекс строится лениво — переводы строк ищутся
+    через str.find только до самого дальнего запрошенного смещения,
+    так что каждый участок текста просматривается один раз.
+
+    Индекс может начинаться не с начала текста: start — смещение, с которого
+    ищутся переводы строк, line и line_start — номер строки и смещение её начала
+    в этой точке (line_start может быть отрицательным, если строка началась
+    в уже отброшенной части текста).
+    """
+
+    def __init__(self, text, start=0, line=1, line_start=0):
+        self.text = text
+        self.first_line = line
+        self.line_starts = array('q', (line_start,))
+        self._scanned = start
+
+    def _extend(self, offset):
+        text = self.text
+        line_starts = self.line_starts
+        newline = text.find('\n', self._scanned, offset)
+        while newline != -1:
+            line_starts.append(newline + 1)
+            newline = text.find('\n', newline + 1, offset)
+        self._scanned = offset
+
+    def position(self, offset):
+        """Возвращает (строка, столбец) символа со смещением offset."""
+        if offset > self._scanned:
+            self._extend(offset)
+        line_starts = self.line_starts
+        last = line_starts[-1]
+        if offset >= last:
+            # Частый случай: лексер идёт по тексту вперёд, смещение на последней строке
+            return self.first_line + len(line_starts) - 1, offset - last + 1
+        index = bisect_right(line_starts, offset) - 1
+        return self.first_line + index, offset - line_starts[index] + 1
@@ -0,0 +1,83 @@
+import mmap
+import os
+import re
+
+from lexer.token import Token, number_literal
+from lexer.token_type import TokenType
+
+
+# Шаблон для разбора байтов отображённого файла (UTF-8).
+# ASCII разбирается напрямую; байты >= 0x80 допускаются в словах и литералах,
+# а их корректность проверяется отдельно (см. Lexer.tokenize_mmap).
+BYTES_TOKEN_PATTERN = re.compile(rb"""
+      (?P<SPACE>[ \t\n\r\x0b\x0c\x1c-\x1f]+)
+    | (?P<COMMENT>\{[^}]*\}|\(\*.*?\*\)|//[^\n]*)
+    | (?P<NUMBER>[0-9]+)
+    | (?P<WORD>[A-Za-z\x80-\xff][A-Za-z0-9\x80-\xff]*)
+    | "(?P<STRING>(?:[^"\\]|\\.)*)(?:"|\Z)
+    | '(?P<CHAR>[\x00-\x7f]|[\xc0-\xff][\x80-\xbf]*)'
+    | (?P<OPERATOR>:=|<>|\.\.|\((?!\*)|[-+*/;)\[\],.:=<>])
+""", re.VERBOSE | re.DOTALL)
+
+# Байты продолжения UTF-8: по ним столбец в символах отличается от смещения в байтах
+CONTINUATION_PATTERN = re.compile(rb"[\x80-\xbf]+")
+NON_ASCII_PATTERN = re.compile(rb"[\x80-\xff]")
+ESCAPE_PATTERN = re.compile(r"\\(.)", re.DOTALL)
+
+
+class MappedSource:
+    """Исходный файл, отображённый в память только для чтения."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            # Пустой файл отобразить нельзя
+            if os.fstat(f.fileno()).st_size:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = b""
+
+    def __len__(self):
+        return len(self.data)
+
+    def decode(self, start, end):
+        return self.data[start:end].decode('utf-8')
+
+    def continuation_bytes(self, start, end):
+        """Сколько байтов в [start, end) не начинают новый символ."""
+        return sum(map(len, CONTINUATION_PATTERN.findall(self.data, start, end)))
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+class MappedToken(Token):
+    """
+    Токен, значение которого вырезается из MappedSource при первом обращении.
+    start и end — границы значения в байтах (для строки и символа без кавычек).
+    """
+
+    def __init__(self, type_, source, start, end, line, column):
+        self.type_ = type_
+        self.source = source
+        self.start = start
+        self.end = end
+        self.line = line
+        self.column = column
+        self._value = None
+
+    @property
+    def value(self):
+        if self._value is None:
+            value = self.source.decode(self.start, self.end)
+            if self.type_ == TokenType.STRING and '\\' in value:
+                value = ESCAPE_PATTERN.sub(r'\1', value)
+            self._value = value
+        return self._value
+
+    @property
+    def literal(self):
+        if self.type_ == TokenType.NUMBER:
+            return number_literal(self.value)
+        return None
@@ -0,0 +1,138 @@
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from custom_exceptions.lexer_error import LexerError
+from lexer.interner import Interner
+from lexer.lexer import Lexer, ENGINE_REGEX
+from lexer.token import Token, number_literal
+from lexer.token_buffer import TOKEN_TYPES
+from lexer.token_type import TokenType
+
+
+# Литералы и комментарии, внутри которых может оказаться перевод строки: по ним
+# текст резать нельзя. Строка или комментарий без закрывающей пары (в том числе
+# строка с '\' в самом конце) тянется до конца текста.
+LITERAL_PATTERN = re.compile(r"""
+      "(?:[^"\\]|\\.)*(?:"|\\?\Z)
+    | '.'
+    | \{[^}]*(?:\}|\Z)
+    | \(\*.*?(?:\*\)|\Z)
+    | //[^\n]*
+""", re.VERBOSE | re.DOTALL)
+
+
+def split_points(text, parts):
+    """
+    Делит text примерно на parts равных кусков и возвращает смещения границ
+    (без 0 и len(text)). Граница ставится сразу после перевода строки, который
+    не входит в литерал, — там всегда начинается новый токен.
+    """
+    literals = LITERAL_PATTERN.finditer(text)
+    literal = next(literals, None)
+    points = []
+    target = 0
+    for part in range(1, parts):
+        target = max(target, len(text) * part // parts)
+        while True:
+            newline = text.find('\n', target)
+            if newline == -1 or newline == len(text) - 1:
+                return points
+            while literal is not None and literal.end() <= newline:
+                literal = next(literals, None)
+            if literal is not None and literal.start() <= newline:
+                # Перевод строки внутри литерала: ищем после него
+                target = literal.end()
+                continue
+            target = newline + 1
+            points.append(target)
+            break
+    return points
+
+
+def lex_chunk(chunk, line):
+    """
+    Разбирает кусок текста, начинающийся со строки line, и возвращает токены
+    в компактном виде: (типы, значения, строки, столбцы, позиция конца, ошибка).
+    Выполняется в процессе-исполнителе; ошибка возвращается кортежем
+    (сообщение, строка, столбец), а не исключением.
+    """
+    kinds = array('B')
+    values = []
+    lines = array('I')
+    columns = array('I')
+
+    def emit(type_, value, start, end, token_line, column):
+        kinds.append(type_.value)
+        values.append(str(value))
+        lines.append(token_line)
+        columns.append(column)
+
+    lexer = Lexer(text=chunk, engine=ENGINE_REGEX)
+    lexer._anchor(chunk, 0, line, 0)
+    error = None
+    try:
+        lexer._scan(chunk, 0, True, emit)
+    except LexerError as e:
+        error = (e.message, e.line, e.column)
+    return kinds.tobytes(), values, lines.tobytes(), columns.tobytes(), lexer.position(), error
+
+
+def tokenize_parallel(text, workers=None, executor=None, interner=None):
+    """
+    Разбивает text на куски по безопасным переводам строк и разбирает их
+    параллельно в пуле процессов. Результат совпадает с Lexer(text=text).tokenize():
+    те же токены с теми же позициями, а при ошибке — тот же LexerError,
+    что выдал бы последовательный разбор (первый по тексту).
+
+    executor — уже запущенный ProcessPoolExecutor (чтобы не платить за запуск пула
+    при каждом вызове); без него пул на workers процессов создаётся на время вызова.
+    При workers=1 куски разбираются в текущем процессе.
+    """
+    if not text:
+        raise ValueError("Either 'filename', 'text' or 'stream' must be provided.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    interner = interner if interner is not None else Interner()
+
+    bounds = [0] + split_points(text, workers) + [len(text)]
+    chunks = []
+    line = 1
+    for start, end in zip(bounds, bounds[1:]):
+        chunks.append((text[start:end], line))
+        line += text.count('\n', start, end)
+
+    if workers == 1:
+        results = [lex_chunk(chunk, chunk_line) for chunk, chunk_line in chunks]
+    elif executor is not None:
+        results = list(executor.map(lex_chunk, *zip(*chunks)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lex_chunk, *zip(*chunks)))
+
+    tokens = []
+    append = tokens.append
+    token_types = TOKEN_TYPES
+    identifier = TokenType.IDENTIFIER.value
+    number = TokenType.NUMBER.value
+    intern = interner.intern
+    for kinds_bytes, values, lines_bytes, columns_bytes, end_position, error in results:
+        kinds = array('B')
+        kinds.frombytes(kinds_bytes)
+        lines = array('I')
+        lines.frombytes(lines_bytes)
+        columns = array('I')
+        columns.frombytes(columns_bytes)
+        for kind, value, token_line, column in zip(kinds, values, lines, columns):
+            if kind == identifier:
+                value = intern(value)
+            token = Token(token_types[kind], value, token_line, column)
+            if kind == number:
+                token.literal = number_literal(value)
+            append(token)
+        if error is not None:
+            raise LexerError(*error)
+
+    tokens.append(Token(TokenType.EOF, "EOF", *end_position))
+    return tokens
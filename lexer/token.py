@@ -1,4 +1,20 @@
+def number_literal(value):
+    """
+    Целое значение числового литерала или None, если его нельзя вычислить сразу:
+    цифры не десятичные (например, '²') или число длиннее предела int().
+    """
+    if not value.isdecimal():
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
 class Token:
+    # Целое значение числового литерала; выставляется лексером только у NUMBER
+    literal = None
+
     def __init__(self, type_, value, line, column):
         """
         type_ : str
@@ -16,4 +32,14 @@ class Token:
         self.column = column
 
     def __repr__(self):
-        return f"Token(type={self.type_}, value={self.value!r}, line={self.line}, column={self.column})"
\ No newline at end of file
+        return f"Token(type={self.type_}, value={self.value!r}, line={self.line}, column={self.column})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Token):
+            return NotImplemented
+        return (self.type_, self.value, self.line, self.column) == \
+            (other.type_, other.value, other.line, other.column)
+
+    # Токены сравниваются по значению, но нехешируемы: relex (lexer/incremental.py)
+    # сдвигает line и column на месте, и хеш от этих полей устаревал бы
+    __hash__ = None
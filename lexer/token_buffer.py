@@ -0,0 +1,113 @@
+from array import array
+
+from lexer.line_index import LineIndex
+from lexer.token import Token, number_literal
+from lexer.token_type import TokenType
+
+
+# Тип токена хранится в array('B') как TokenType.value (все значения < 256)
+TOKEN_TYPES = {token_type.value: token_type for token_type in TokenType}
+
+# Сколько последних материализованных токенов держит TokenView
+VIEW_CACHE_SIZE = 16
+
+
+class TokenBuffer:
+    """
+    Компактное хранилище токенов в виде параллельных массивов (struct-of-arrays):
+    kinds — тип токена, starts/ends — границы лексемы в тексте.
+    Значение токена не хранится, а вырезается из text при обращении;
+    строка и столбец вычисляются по starts через LineIndex.
+    Если задан interner, значения идентификаторов материализуются как его Symbol.
+    Исключения (строки с escape-последовательностями, незавершённые строки, EOF)
+    лежат в разреженном словаре values.
+    """
+
+    def __init__(self, text, interner=None):
+        self.text = text
+        self.interner = interner
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.values = {}
+        self.line_index = LineIndex(text)
+
+    def append(self, type_, value, start, end, line, column):
+        """
+        Добавляет токен; start и end — границы всей лексемы (для строки — с кавычками).
+        line и column не сохраняются: сигнатура совпадает с emit из Lexer._scan.
+        """
+        if type_ is TokenType.STRING:
+            if self.text[start + 1:end - 1] != value:
+                self.values[len(self.kinds)] = value
+        elif type_ is TokenType.EOF:
+            self.values[len(self.kinds)] = value
+        self.kinds.append(type_.value)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def type_at(self, index):
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def value_at(self, index):
+        value = self.values.get(index)
+        if value is not None:
+            return value
+        type_ = TOKEN_TYPES[self.kinds[index]]
+        if type_ is TokenType.STRING or type_ is TokenType.CHAR:
+            # Без кавычек
+            return self.text[self.starts[index] + 1:self.ends[index] - 1]
+        value = self.text[self.starts[index]:self.ends[index]]
+        if type_ is TokenType.IDENTIFIER and self.interner is not None:
+            return self.interner.intern(value)
+        return value
+
+    def position_at(self, index):
+        return self.line_index.position(self.starts[index])
+
+    def token(self, index):
+        """Материализует токен с номером index в объект Token."""
+        token = Token(TOKEN_TYPES[self.kinds[index]], self.value_at(index), *self.position_at(index))
+        if token.type_ is TokenType.NUMBER:
+            token.literal = number_literal(token.value)
+        return token
+
+    def view(self):
+        return TokenView(self)
+
+
+class TokenView:
+    """
+    Последовательность токенов поверх TokenBuffer, индексируемая как список Token.
+    Токены создаются при обращении; несколько последних кэшируются, так как
+    Parser многократно смотрит на текущий и следующий токен.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.buffer)))]
+        if index < 0:
+            index += len(self.buffer)
+        token = self._cache.get(index)
+        if token is None:
+            if not 0 <= index < len(self.buffer):
+                raise IndexError("TokenView index out of range")
+            if len(self._cache) >= VIEW_CACHE_SIZE:
+                self._cache.clear()
+            token = self._cache[index] = self.buffer.token(index)
+        return token
+
+    def __iter__(self):
+        token = self.buffer.token
+        for index in range(len(self.buffer)):
+            yield token(index)
@@ -0,0 +1,293 @@
+from array import array
+from itertools import repeat
+from operator import attrgetter
+
+from .ast_node import *
+
+
+# Вид записи арены хранится в array('B'): классы узлов — их номер в NODE_CLASSES,
+# списки, кортежи и прочие значения полей (строки, числа, None) — служебные виды
+NODE_CLASSES = (
+    ProgramNode, BlockNode, DeclarationNode, ConstDeclarationNode, VarDeclarationNode, TypeNode,
+    ParameterNode, ArrayTypeNode, ArrayAccessNode, ProcedureOrFunctionDeclarationNode,
+    CompoundStatementNode, AssignStatementNode, IfStatementNode, WhileStatementNode, ForStatementNode,
+    ProcedureCallNode, FunctionCallNode, ExpressionNode, SimpleExpressionNode, TermNode, FactorNode,
+    RelationalOperatorNode, TypeDeclarationNode, RecordTypeNode, RecordInitializerNode, RecordFieldAccessNode,
+)
+NODE_KINDS = {node_class: kind for kind, node_class in enumerate(NODE_CLASSES)}
+LIST_KIND = 253
+TUPLE_KIND = 254
+VALUE_KIND = 255
+
+# Нет записи (нет первого потомка, следующего соседа, span или литерала)
+NO_ENTRY = -1
+
+# Поля узла, которые становятся потомками записи (span хранится в отдельных столбцах)
+NODE_FIELDS = {node_class: tuple(name for name in node_class.field_names if name != 'span')
+               for node_class in NODE_CLASSES}
+
+
+class AstArena:
+    """
+    AST в виде таблицы записей из параллельных массивов (struct-of-arrays),
+    как TokenBuffer для токенов. Запись — узел, список или кортеж из поля узла
+    либо значение поля:
+      kinds          — вид записи (номер класса узла, LIST_KIND, TUPLE_KIND, VALUE_KIND);
+      first_children — первый потомок: первое поле узла, первый элемент списка;
+      next_siblings  — следующий потомок того же родителя;
+      starts, stops  — span узла (номера токенов, как AstNode.span);
+      literal_slots  — номер значения в literals для записей VALUE_KIND.
+    Равные значения полей (имена, числа, операторы, None) хранятся в literals один раз.
+    Записи полей узла идут подряд, поэтому поле номер k узла index — это запись
+    first_children[index] + k, и чтение поля не обходит цепочку next_siblings.
+
+    Объектов узлов в арене нет, поэтому сборщик мусора её не обходит, а pickle
+    сохраняет её как несколько массивов байтов и список литералов.
+    Обход — через представления (view): это объекты подклассов узлов
+    parser/ast_node.py, поля которых читаются из арены при обращении,
+    так что SemanticAnalyzer и CodeGenerator работают с ними как с узлами.
+    Представления только для чтения: результаты анализа хранятся в отдельных
+    таблицах (semantic/), а не в узлах, так что менять арену после разбора незачем.
+    """
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.first_children = array('i')
+        self.next_siblings = array('i')
+        self.starts = array('i')
+        self.stops = array('i')
+        self.literal_slots = array('i')
+        self.literals = []
+        self._slots = {}
+        # Запись ProgramNode (заполняет Parser.parse_arena)
+        self.root = NO_ENTRY
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_slots']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._slots = {}
+        for slot, value in enumerate(self.literals):
+            try:
+                self._slots.setdefault(self._literal_key(value), slot)
+            except TypeError:
+                pass
+
+    # Построение
+
+    @staticmethod
+    def _literal_key(value):
+        # Тип в ключе: True == 1 и Symbol('x') == 'x', но это разные литералы
+        return type(value), value
+
+    def _literal(self, value):
+        try:
+            key = self._literal_key(value)
+            slot = self._slots.get(key)
+        except TypeError:
+            # Нехешируемое значение (например, словарь) хранится без объединения
+            key = slot = None
+        if slot is None:
+            slot = len(self.literals)
+            self.literals.append(value)
+            if key is not None:
+                self._slots[key] = slot
+        return slot
+
+    def _append(self, kind, span=None, literal=NO_ENTRY):
+        index = len(self.kinds)
+        self.kinds.append(kind)
+        self.first_children.append(NO_ENTRY)
+        self.next_siblings.append(NO_ENTRY)
+        start, stop = span if span is not None else (NO_ENTRY, NO_ENTRY)
+        self.starts.append(start)
+        self.stops.append(stop)
+        self.literal_slots.append(literal)
+        return index
+
+    def _describe(self, value):
+        """(вид, span, номер литерала) записи для значения поля."""
+        kind = NODE_KINDS.get(type(value))
+        if kind is not None:
+            return kind, value.span, NO_ENTRY
+        if isinstance(value, list):
+            return LIST_KIND, None, NO_ENTRY
+        if isinstance(value, tuple):
+            return TUPLE_KIND, None, NO_ENTRY
+        return VALUE_KIND, None, self._literal(value)
+
+    def _entry(self, value):
+        return self._append(*self._describe(value))
+
+    def _set(self, index, kind, span=None, literal=NO_ENTRY):
+        self.kinds[index] = kind
+        self.starts[index], self.stops[index] = span if span is not None else (NO_ENTRY, NO_ENTRY)
+        self.literal_slots[index] = literal
+
+    def _link(self, index, children):
+        previous = NO_ENTRY
+        for child in children:
+            if previous == NO_ENTRY:
+                self.first_children[index] = child
+            else:
+                self.next_siblings[previous] = child
+            previous = child
+
+    def reserve(self, count):
+        """
+        Резервирует count записей подряд и возвращает номер первой. Их заполняют
+        add(value, index), set_node и set_list, когда значения уже разобраны.
+        """
+        index = len(self.kinds)
+        for _ in range(count):
+            self._append(VALUE_KIND)
+        return index
+
+    def add(self, value, index=None):
+        """
+        Переносит в арену значение поля — узел вместе со всем поддеревом, список,
+        кортеж или литерал — и возвращает номер его записи (index, если запись
+        зарезервирована заранее). Обход без рекурсии.
+        """
+        if index is None:
+            index = self._entry(value)
+        else:
+            self._set(index, *self._describe(value))
+        root = index
+        stack = [(root, value)]
+        describe = self._describe
+        kinds, starts, stops, literal_slots = self.kinds, self.starts, self.stops, self.literal_slots
+        first_children, next_siblings = self.first_children, self.next_siblings
+        while stack:
+            index, value = stack.pop()
+            getter = NODE_GETTERS.get(type(value))
+            if getter is not None:
+                items = getter(value)
+            elif isinstance(value, (list, tuple)):
+                items = value
+            else:
+                continue
+            if not items:
+                continue
+            # Потомки добавляются подряд: поле k узла — запись first_children + k
+            first = len(kinds)
+            for item in items:
+                kind, span, literal = describe(item)
+                kinds.append(kind)
+                start, stop = span if span is not None else (NO_ENTRY, NO_ENTRY)
+                starts.append(start)
+                stops.append(stop)
+                literal_slots.append(literal)
+            end = len(kinds)
+            first_children.extend(repeat(NO_ENTRY, end - first))
+            next_siblings.extend(range(first + 1, end))
+            next_siblings.append(NO_ENTRY)
+            first_children[index] = first
+            stack.extend(zip(range(first, end), items))
+        return root
+
+    def set_node(self, index, node_class, span, children):
+        """
+        Заполняет зарезервированную запись index узлом node_class из уже
+        добавленных записей его полей. children — в порядке полей и подряд.
+        """
+        if list(children) != list(range(children[0], children[0] + len(children))):
+            raise ValueError("Записи полей узла должны идти подряд")
+        self._set(index, NODE_KINDS[node_class], span)
+        self._link(index, children)
+
+    def set_list(self, index, children):
+        """Заполняет зарезервированную запись index списком из уже добавленных записей."""
+        self._set(index, LIST_KIND)
+        self._link(index, children)
+
+    # Чтение
+
+    def children(self, index):
+        """Номера записей-потомков по порядку."""
+        child = self.first_children[index]
+        next_siblings = self.next_siblings
+        while child != NO_ENTRY:
+            yield child
+            child = next_siblings[child]
+
+    def value(self, index):
+        """Значение записи: представление узла, список, кортеж или литерал."""
+        kind = self.kinds[index]
+        if kind == VALUE_KIND:
+            return self.literals[self.literal_slots[index]]
+        if kind == LIST_KIND:
+            return [self.value(child) for child in self.children(index)]
+        if kind == TUPLE_KIND:
+            return tuple(self.value(child) for child in self.children(index))
+        view = VIEW_CLASSES[kind].__new__(VIEW_CLASSES[kind])
+        view.arena = self
+        view.index = index
+        return view
+
+    def tree(self):
+        """Представление корневого ProgramNode."""
+        return self.value(self.root)
+
+
+def _field(position):
+    def get(self):
+        arena = self.arena
+        return arena.value(arena.first_children[self.index] + position)
+    return property(get)
+
+
+def _span(self):
+    start = self.arena.starts[self.index]
+    if start == NO_ENTRY:
+        return None
+    return start, self.arena.stops[self.index]
+
+
+def _view_eq(self, other):
+    return type(other) is type(self) and other.arena is self.arena and other.index == self.index
+
+
+def _view_hash(self):
+    return hash((id(self.arena), self.index))
+
+
+def _view_class(node_class):
+    """
+    Подкласс node_class, поля которого — свойства, читающие запись арены.
+    Представления одной записи равны между собой (и годятся как ключи словаря),
+    хотя при каждом обращении к полю создаются заново.
+    """
+    namespace = {name: _field(position) for position, name in enumerate(NODE_FIELDS[node_class])}
+    namespace.update(__slots__=('arena', 'index'), __module__=__name__, span=property(_span),
+                     __eq__=_view_eq, __hash__=_view_hash)
+    view_class = type(node_class.__name__, (node_class,), namespace)
+    # Поля представления — поля узла, а не arena и index
+    view_class.field_names = node_class.field_names
+    return view_class
+
+
+VIEW_CLASSES = {kind: _view_class(node_class) for kind, node_class in enumerate(NODE_CLASSES)}
+# Представление переносится в другую арену (add) как обычный узел
+NODE_KINDS.update({view_class: kind for kind, view_class in VIEW_CLASSES.items()})
+NODE_FIELDS.update({view_class: NODE_FIELDS[NODE_CLASSES[kind]] for kind, view_class in VIEW_CLASSES.items()})
+# Общий лист хранится как обычный FactorNode (в арене каждое вхождение — своя запись)
+NODE_KINDS[SharedFactorNode] = NODE_KINDS[FactorNode]
+NODE_FIELDS[SharedFactorNode] = NODE_FIELDS[FactorNode]
+
+
+def _getter(names):
+    """Функция, возвращающая кортеж значений полей names узла."""
+    get = attrgetter(*names)
+    if len(names) == 1:
+        return lambda node: (get(node),)
+    return get
+
+
+NODE_GETTERS = {node_class: _getter(names) for node_class, names in NODE_FIELDS.items()}
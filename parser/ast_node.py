@@ -1,45 +1,101 @@
+def _nodes_in(value):
+    """Узлы в значении поля: сам узел или узлы внутри (вложенных) списков и кортежей."""
+    if isinstance(value, AstNode):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _nodes_in(item)
+
+
 class AstNode:
-    def __init__(self):
-        self.children = []
+    # Узлы хранят поля в __slots__, без __dict__ и без отдельного списка children:
+    # потомки берутся из полей (iter_children, children, walk). Каждый подкласс
+    # объявляет свои __slots__, иначе у него снова появится __dict__.
+    #
+    # span — токены узла, полуинтервал (start, stop) номеров токенов, заполняется парсером.
+    # Номера отсчитываются от начала ближайшего якоря выше узла. Якоря — процедуры
+    # и составные операторы блоков (тела программы и процедур); выше всех узлов —
+    # начало потока. Поэтому правка внутри процедуры меняет span только у узлов на
+    # пути к ней и у следующих за ними соседей (см. parser/incremental.py).
+    __slots__ = ('span',)
 
-    def add_child(self, child):
-        self.children.append(child)
+    def __init__(self):
+        self.span = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Все поля узла по порядку: сначала поля базовых классов
+        cls.field_names = tuple(name for klass in reversed(cls.__mro__)
+                                for name in klass.__dict__.get('__slots__', ()))
+
+    def iter_children(self):
+        """Непосредственные потомки-узлы в порядке полей; списки и кортежи в полях раскрываются."""
+        for name in self.field_names:
+            yield from _nodes_in(getattr(self, name))
+
+    @property
+    def children(self):
+        return list(self.iter_children())
+
+    def walk(self):
+        """Все узлы поддерева в прямом порядке, начиная с самого узла; без рекурсии Python."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            children = list(node.iter_children())
+            children.reverse()
+            stack.extend(children)
 
     def __repr__(self):
-        return f"{self.__class__.__name__}({', '.join(map(str, self.children))})"
+        return f"{self.__class__.__name__}()"
+
+
+AstNode.field_names = AstNode.__slots__
 
 
 class ProgramNode(AstNode):
+    __slots__ = ('program_name', 'block')
+
     def __init__(self, program_name, block):
         super().__init__()
         self.program_name = program_name
-        self.add_child(block)
+        self.block = block
+
+    def __repr__(self):
+        return f"ProgramNode({self.block})"
 
 
 class BlockNode(AstNode):
+    __slots__ = ('declarations', 'compound_statement')
+
     def __init__(self, declarations, compound_statement):
         super().__init__()
         self.declarations = declarations # список или None ?
         self.compound_statement = compound_statement
 
-        if declarations:
-            self.add_child(declarations)
-
-        self.add_child(compound_statement)
+    def __repr__(self):
+        if self.declarations:
+            return f"BlockNode({self.declarations}, {self.compound_statement})"
+        return f"BlockNode({self.compound_statement})"
 
 
 # DECLARATIONS BLOCK
 class DeclarationNode(AstNode):
+    __slots__ = ('declarations',)
+
     def __init__(self, declarations):
         super().__init__()
         self.declarations = declarations
 
-        for declaration in declarations:
-            self.add_child(declarations)
+    def __repr__(self):
+        return f"DeclarationNode({self.declarations})"
 
 
 # CONST
 class ConstDeclarationNode(AstNode):
+    __slots__ = ('identifier', 'value')
+
     def __init__(self, identifier, value):
         super().__init__()
         self.identifier = identifier
@@ -48,6 +104,8 @@ class ConstDeclarationNode(AstNode):
 
 # VAR
 class VarDeclarationNode(AstNode):
+    __slots__ = ('identifier', 'var_type', 'init_value')
+
     def __init__(self, identifier, var_type, init_value):
         super().__init__()
         self.identifier = identifier
@@ -57,6 +115,7 @@ class VarDeclarationNode(AstNode):
 
 # TYPE
 class TypeNode(AstNode):
+    __slots__ = ('identifier_type', 'array_range')
 
     def __init__(self, identifier_type, array_range=None):
         # array ?
@@ -71,6 +130,8 @@ class TypeNode(AstNode):
 
 
 class ParameterNode(AstNode):
+    __slots__ = ('identifier', 'type_node', 'pass_mode')
+
     def __init__(self, identifier, type_node, pass_mode=None):
         super().__init__()
         self.identifier = identifier      # Имя параметра
@@ -84,7 +145,9 @@ class ParameterNode(AstNode):
             return f"{self.identifier}: {self.type_node}"
 
 
-class ArrayTypeNode:
+class ArrayTypeNode(AstNode):
+    __slots__ = ('dimensions', 'element_type', 'initial_values')
+
     def __init__(self, dimensions, element_type, initial_values=None):
         """
         Узел AST для массива.
@@ -93,6 +156,7 @@ class ArrayTypeNode:
         :param element_type: Тип элементов массива (например, integer, string).
         :param initial_values: Список значений для инициализации массива (опционально).
         """
+        super().__init__()
         self.dimensions = dimensions
         self.element_type = element_type
         self.initial_values = initial_values
@@ -106,6 +170,8 @@ class ArrayTypeNode:
 
 
 class ArrayAccessNode(AstNode):
+    __slots__ = ('array_name', 'index_expr')
+
     def __init__(self, array_name, index_expr):
         super().__init__()
         self.array_name = array_name     # str (имя массива)
@@ -116,6 +182,8 @@ class ArrayAccessNode(AstNode):
 
 
 class ProcedureOrFunctionDeclarationNode(AstNode):
+    __slots__ = ('kind', 'identifier', 'parameters', 'block', 'return_type')
+
     def __init__(self, kind, identifier, parameters=None, block=None, return_type=None):
         super().__init__()
         self.kind = kind
@@ -131,6 +199,8 @@ class ProcedureOrFunctionDeclarationNode(AstNode):
 
 # OPERATORS
 class CompoundStatementNode(AstNode):
+    __slots__ = ('statements',)
+
     def __init__(self, statements):
         super().__init__()
         self.statements = statements  # Список операторов (список узлов StatementNode)
@@ -140,6 +210,8 @@ class CompoundStatementNode(AstNode):
 
 
 class StatementNode(AstNode):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -148,6 +220,8 @@ class StatementNode(AstNode):
 
 
 class AssignStatementNode(StatementNode):
+    __slots__ = ('identifier', 'expression')
+
     def __init__(self, identifier, expression):
         super().__init__()
         self.identifier = identifier  # Идентификатор (переменная)
@@ -158,6 +232,8 @@ class AssignStatementNode(StatementNode):
 
 
 class IfStatementNode(StatementNode):
+    __slots__ = ('condition', 'then_statement', 'else_statement')
+
     def __init__(self, condition, then_statement, else_statement=None):
         super().__init__()
         self.condition = condition  # Условие (выражение)
@@ -170,6 +246,8 @@ class IfStatementNode(StatementNode):
 
 
 class WhileStatementNode(StatementNode):
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition, body):
         super().__init__()
         self.condition = condition  # Условие цикла (выражение)
@@ -180,6 +258,8 @@ class WhileStatementNode(StatementNode):
 
 
 class ForStatementNode(StatementNode):
+    __slots__ = ('identifier', 'start_expr', 'direction', 'end_expr', 'body')
+
     def __init__(self, identifier, start_expr, direction, end_expr, body):
         super().__init__()
         self.identifier = identifier  # Идентификатор переменной цикла
@@ -193,6 +273,8 @@ class ForStatementNode(StatementNode):
 
 
 class ProcedureCallNode(AstNode):
+    __slots__ = ('identifier', 'arguments')
+
     def __init__(self, identifier, arguments=None):
         super().__init__()
         self.identifier = identifier  # Имя процедуры или функции
@@ -204,6 +286,8 @@ class ProcedureCallNode(AstNode):
 
 
 class FunctionCallNode(AstNode):
+    __slots__ = ('identifier', 'arguments')
+
     def __init__(self, func_name, arguments=None):
         super().__init__()
         self.identifier = func_name        # строка, имя функции
@@ -215,6 +299,8 @@ class FunctionCallNode(AstNode):
 
 
 class ExpressionNode(AstNode):
+    __slots__ = ('left', 'relational_operator', 'right')
+
     def __init__(self, left, relational_operator=None, right=None):
         super().__init__()
         self.left = left  # SimpleExpression (левая часть)
@@ -256,6 +342,8 @@ class ExpressionNode(AstNode):
 
 
 class SimpleExpressionNode(AstNode):
+    __slots__ = ('terms', 'additive_operator')
+
     def __init__(self, terms, additive_operator=None):
         super().__init__()
         self.terms = terms  # Список Terms (фактически это операция, связанная с термами)
@@ -288,6 +376,8 @@ class SimpleExpressionNode(AstNode):
 
 
 class TermNode(AstNode):
+    __slots__ = ('factors', 'multiplicative_operator')
+
     def __init__(self, factors, multiplicative_operator=None):
         super().__init__()
         self.factors = factors  # Список факторов (Factor)
@@ -331,6 +421,8 @@ class TermNode(AstNode):
         return result
 
 class FactorNode(AstNode):
+    __slots__ = ('value', 'identifier', 'sub_expression', 'is_not')
+
     def __init__(self, value=None, identifier=None, sub_expression=None, is_not=False):
         super().__init__()
         self.value = value  # Число или строка
@@ -362,7 +454,38 @@ class FactorNode(AstNode):
         return {"node": "FactorNode"}
 
 
+class SharedFactorNode(FactorNode):
+    """
+    Лист FactorNode (число, строка, логическое значение или идентификатор),
+    общий для всех равных вхождений в дереве (Parser(share_leaves=True)).
+    Контракт: после разбора листья не изменяются ни одним проходом — изменение
+    одного вхождения изменило бы их все, поэтому присваивание полю — AttributeError.
+    Сведения о конкретном вхождении хранятся вне листа.
+    """
+    __slots__ = ()
+
+    def __init__(self, value=None, identifier=None):
+        # Поля заполняются в обход __setattr__
+        object.__setattr__(self, 'span', None)
+        object.__setattr__(self, 'value', value)
+        object.__setattr__(self, 'identifier', identifier)
+        object.__setattr__(self, 'sub_expression', None)
+        object.__setattr__(self, 'is_not', False)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Общий лист FactorNode неизменяем (поле '{name}')")
+
+    def __reduce__(self):
+        # pickle восстанавливает поля через setattr, поэтому лист пересоздаётся конструктором
+        return SharedFactorNode, (self.value, self.identifier)
+
+    def __repr__(self):
+        return "FactorNode()"
+
+
 class RelationalOperatorNode(AstNode):
+    __slots__ = ('operator',)
+
     def __init__(self, operator):
         super().__init__()
         self.operator = operator  # Операторы сравнения (например, "=", "<>")
@@ -373,6 +496,8 @@ class RelationalOperatorNode(AstNode):
 
 
 class TypeDeclarationNode(AstNode):
+    __slots__ = ('name', 'type_node')
+
     def __init__(self, name, type_node):
         super().__init__()
         self.name = name
@@ -383,6 +508,8 @@ class TypeDeclarationNode(AstNode):
 
 
 class RecordTypeNode(AstNode):
+    __slots__ = ('fields',)
+
     def __init__(self, fields=None):
         super().__init__()
         # fields — это список пар (имя_поля, тип_поля)
@@ -395,6 +522,8 @@ class RecordTypeNode(AstNode):
 
 
 class RecordInitializerNode(AstNode):
+    __slots__ = ('fields',)
+
     def __init__(self, fields):
         super().__init__()
         # fields — список (field_name_token, value_node)
@@ -406,6 +535,8 @@ class RecordInitializerNode(AstNode):
 
 
 class RecordFieldAccessNode(AstNode):
+    __slots__ = ('record_obj', 'field_name')
+
     def __init__(self, record_obj, field_name):
         super().__init__()
         self.record_obj = record_obj    # Может быть IDENTIFIER, ArrayAccessNode, или вложенный RecordFieldAccessNode
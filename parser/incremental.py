@@ -0,0 +1,107 @@
+from bisect import bisect_left
+
+from custom_exceptions.parse_error import ParseError
+from .ast_node import ProcedureOrFunctionDeclarationNode
+from .parser import Parser
+
+
+def _span_start(node):
+    return node.span[0]
+
+
+def _shift(node, delta):
+    start, stop = node.span
+    node.span = (start + delta, stop + delta)
+
+
+def _extend(node, delta):
+    start, stop = node.span
+    node.span = (start, stop + delta)
+
+
+def _encloses(node, base, start, stop):
+    """Строго ли содержит узел (span от base) заменённые токены [start, stop): края узла целы."""
+    return base + node.span[0] < start and stop < base + node.span[1]
+
+
+def _enclosing_procedure(block, base, start, stop):
+    """Номер процедуры среди объявлений блока, строго содержащей правку, или None."""
+    declarations = block.declarations
+    index = bisect_left(declarations, start - base, key=_span_start) - 1
+    if index >= 0:
+        node = declarations[index]
+        if isinstance(node, ProcedureOrFunctionDeclarationNode) and _encloses(node, base, start, stop):
+            return index
+    return None
+
+
+def reparse(tree, tokens, start, old_stop, new_stop, parser_class=Parser):
+    """
+    Повторный синтаксический разбор после правки.
+
+    tree — ProgramNode, построенный по прежнему потоку токенов, tokens — новый поток.
+    Правка описывается так же, как её возвращает lexer.incremental.relex: токены
+    [start, old_stop) прежнего потока заменены на tokens[start:new_stop].
+
+    Заново разбирается только самый глубокий якорь, строго содержащий правку:
+    процедура или составной оператор блока (тело процедуры или программы).
+    Дерево изменяется на месте: новый узел встаёт вместо старого, у узлов на пути
+    к нему и у следующих за ними соседей сдвигаются span (см. AstNode.span),
+    остальные узлы — в том числе все прочие ProcedureOrFunctionDeclarationNode —
+    остаются теми же объектами. Поэтому время разбора зависит от размера
+    изменённой процедуры, а не файла.
+
+    Если правка задевает объявления программы или меняет границы якоря
+    (например, добавляет 'end'), программа разбирается целиком.
+
+    Возвращает (дерево, новый узел); при полном разборе — (новое дерево, None).
+    """
+    delta = new_stop - old_stop
+
+    # Спускаемся к самому глубокому якорю; path — уровни (владелец блока,
+    # его начало в потоке, блок, номер процедуры в блоке или None для тела блока)
+    path = []
+    owner, base = tree, 0
+    while True:
+        block = owner.block
+        index = _enclosing_procedure(block, base, start, old_stop)
+        if index is not None:
+            path.append((owner, base, block, index))
+            owner = block.declarations[index]
+            base += owner.span[0]
+            continue
+        if _encloses(block.compound_statement, base, start, old_stop):
+            path.append((owner, base, block, None))
+        break
+    if not path:
+        return parser_class(tokens).parse_program(), None
+
+    owner, base, block, index = path[-1]
+    old_node = block.compound_statement if index is None else block.declarations[index]
+    parser = parser_class(tokens, start=base + old_node.span[0])
+    parser.anchor = base
+    try:
+        if index is None:
+            node = parser.parse_block_body()
+        else:
+            node = parser.parse_procedure_or_function_declaration()
+    except ParseError:
+        node = None
+    if node is None or parser.pos != base + old_node.span[1] + delta:
+        return parser_class(tokens).parse_program(), None
+
+    if index is None:
+        block.compound_statement = node
+    else:
+        block.declarations[index] = node
+
+    # Сдвигаем span: соседи после пути смещаются целиком, узлы на пути удлиняются
+    for owner, base, block, index in reversed(path):
+        if index is not None:
+            for declaration in block.declarations[index + 1:]:
+                _shift(declaration, delta)
+            _shift(block.compound_statement, delta)
+        _extend(block, delta)
+        _extend(owner, delta)
+
+    return tree, node
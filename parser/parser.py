@@ -1,46 +1,192 @@
 from lexer.token_type import TokenType
 from lexer.token import Token
+from lexer.token_buffer import TokenBuffer
 from custom_exceptions.parse_error import ParseError
 from .ast_node import *
+from .arena import AstArena
+
+
+# Уровни приоритета бинарных операторов Паскаля: чем больше, тем сильнее связывает.
+# Сравнения (самый низкий уровень) не ассоциативны и разбираются в parse_expression.
+ADDITIVE_LEVEL = 1
+MULTIPLICATIVE_LEVEL = 2
+
+BINARY_OPERATORS = {
+    TokenType.PLUS: ADDITIVE_LEVEL,
+    TokenType.MINUS: ADDITIVE_LEVEL,
+    TokenType.OR: ADDITIVE_LEVEL,
+    TokenType.ASTERISK: MULTIPLICATIVE_LEVEL,
+    TokenType.SLASH: MULTIPLICATIVE_LEVEL,
+    TokenType.DIV: MULTIPLICATIVE_LEVEL,
+    TokenType.MOD: MULTIPLICATIVE_LEVEL,
+    TokenType.AND: MULTIPLICATIVE_LEVEL,
+}
+
+# Узел, в который собирается цепочка операторов одного уровня: (операнды и операторы, первый оператор)
+OPERATOR_NODES = {
+    ADDITIVE_LEVEL: SimpleExpressionNode,
+    MULTIPLICATIVE_LEVEL: TermNode,
+}
+
+RELATIONAL_OPERATORS = frozenset({
+    TokenType.EQ, TokenType.NEQ, TokenType.LT, TokenType.GT, TokenType.LTE, TokenType.GTE,
+})
+
+# Токены после идентификатора, с которых начинается присваивание (x :=, arr[i] :=, p.x :=)
+ASSIGNMENT_FOLLOW = frozenset({TokenType.ASSIGN, TokenType.LBRACKET, TokenType.DOT})
+
+# FIRST-множество константного значения
+CONST_VALUE_FIRST = frozenset({TokenType.NUMBER, TokenType.STRING, TokenType.CHAR, TokenType.LPAREN})
+
+# Наибольший просмотр вперёд, который нужен грамматике (см. parser/readme.md):
+# '(' IDENTIFIER ':' в константном значении — инициализатор записи.
+MAX_LOOKAHEAD = 2
+# Кольцевой буфер токенов: текущий и MAX_LOOKAHEAD следующих (размер — степень двойки)
+RING_SIZE = 4
+RING_MASK = RING_SIZE - 1
+
+# Синхронизирующие токены режима восстановления (см. Parser.recover): после ошибки
+# токены пропускаются до ближайшего из множества, и разбор продолжается с него
+DECLARATION_SYNC = frozenset({
+    TokenType.CONST, TokenType.VAR, TokenType.TYPE, TokenType.PROCEDURE, TokenType.FUNCTION,
+    TokenType.BEGIN, TokenType.EOF,
+})
+# Строка объявления const/var или type
+LINE_SYNC = DECLARATION_SYNC | {TokenType.SEMICOLON}
+# Оператор внутри begin ... end
+STATEMENT_SYNC = DECLARATION_SYNC | {TokenType.SEMICOLON, TokenType.END}
 
 
 class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
-        self.pos = 0
-
-    def raise_error(self, message):
+    def __init__(self, tokens, start=0, recover=False, share_leaves=False):
+        """
+        tokens — любой источник токенов: список Token, TokenBuffer или итератор
+        (например, Lexer.iter_tokens(), тогда лексер и парсер работают вперемешку).
+        Парсер читает токены по одному и держит только текущий и MAX_LOOKAHEAD
+        следующих в кольцевом буфере, поэтому весь поток в памяти не нужен.
+        start — номер токена, с которого начинается разбор (tokens тогда должен
+        поддерживать индексацию); нужен для повторного разбора части программы.
+        recover — режим восстановления: вместо ParseError на первой ошибке парсер
+        записывает её в self.errors, пропускает токены до синхронизирующего и
+        продолжает разбор; parse_program() тогда возвращает частичное дерево.
+        share_leaves — равные листья выражений (одинаковые идентификаторы и литералы)
+        становятся одним неизменяемым SharedFactorNode на всё дерево (см. leaf).
+        """
+        if isinstance(tokens, TokenBuffer):
+            tokens = tokens.view()
+        if start:
+            tokens = map(tokens.__getitem__, range(start, len(tokens)))
+        self.stream = iter(tokens)
+        # Токен за концом потока
+        self.end_token = Token(TokenType.EOF, None, -1, -1)
+        # Номер текущего токена в потоке; токен с номером i лежит в ring[i & RING_MASK]
+        self.pos = start
+        self.ring = [None] * RING_SIZE
+        for index in range(start, start + MAX_LOOKAHEAD + 1):
+            self.ring[index & RING_MASK] = next(self.stream, self.end_token)
+        # Начало текущего якоря — узла, от которого отсчитываются span вложенных узлов
+        self.anchor = 0
+        self.recovering = recover
+        self.errors = []
+        # Номер токена последней записанной ошибки: повторные ошибки на нём же не записываются
+        self.error_pos = -1
+        # Общие листья: (тип значения, значение, идентификатор) -> SharedFactorNode
+        self.leaves = {} if share_leaves else None
+
+        # Таблицы разбора по FIRST-множествам: тип первого токена -> метод разбора
+        # (секции объявлений — генераторы, отдающие узлы по одному)
+        self.declaration_parsers = {
+            TokenType.TYPE: self.iter_type_section,
+            TokenType.CONST: lambda: self.iter_const_declaration(is_const=True),
+            TokenType.VAR: lambda: self.iter_const_declaration(is_const=False),
+            TokenType.FUNCTION: lambda: [self.parse_procedure_or_function_declaration()],
+            TokenType.PROCEDURE: lambda: [self.parse_procedure_or_function_declaration()],
+        }
+        self.statement_parsers = {
+            TokenType.IF: self.parse_if_statement,
+            TokenType.WHILE: self.parse_while_statement,
+            TokenType.FOR: self.parse_for_statement,
+            TokenType.BEGIN: self.parse_compound_statement,
+            TokenType.IDENTIFIER: self.parse_identifier_statement,
+        }
+        self.factor_parsers = {
+            TokenType.NUMBER: self.parse_number_factor,
+            TokenType.STRING: self.parse_text_factor,
+            TokenType.CHAR: self.parse_text_factor,
+            TokenType.IDENTIFIER: self.parse_identifier_factor,
+            TokenType.TRUE: self.parse_boolean_factor,
+            TokenType.FALSE: self.parse_boolean_factor,
+            TokenType.LPAREN: self.parse_parenthesized_factor,
+            TokenType.NOT: self.parse_not_factor,
+        }
+
+    def make_error(self, message):
         token = self.current_token()
-        raise ParseError(message, token.line, token.column)
+        return ParseError(message, token.line, token.column)
 
-    def save_position(self):
-        return self.pos
+    def raise_error(self, message):
+        raise self.make_error(message)
 
-    def restore_position(self, saved_pos):
-        self.pos = saved_pos
+    def record_error(self, error):
+        """
+        Записывает ошибку в self.errors (вне режима восстановления — выбрасывает её).
+        Ошибка на том же токене, что и предыдущая, — обычно её следствие и не записывается.
+        """
+        if not self.recovering:
+            raise error
+        if self.pos != self.error_pos:
+            self.errors.append(error)
+            self.error_pos = self.pos
+
+    def recover(self, error, sync):
+        """Записывает ошибку и пропускает токены до ближайшего из множества sync (в нём всегда есть EOF)."""
+        self.record_error(error)
+        while self.current_token().type_ not in sync:
+            self.advance()
+
+    def expect(self, expected_type):
+        """Как consume, но в режиме восстановления недостающий токен считается вставленным."""
+        try:
+            return self.consume(expected_type)
+        except ParseError as error:
+            self.record_error(error)
 
     def lookahead(self, offset):
-        """Посмотреть токен на offset позиций вперёд от текущего."""
-        index = self.pos + offset
-        if index < len(self.tokens):
-            return self.tokens[index]
-        return Token(TokenType.EOF, None, -1, -1)
+        """Посмотреть токен на offset (не больше MAX_LOOKAHEAD) позиций вперёд от текущего."""
+        if offset > MAX_LOOKAHEAD:
+            raise ValueError(f"Просмотр вперёд ограничен {MAX_LOOKAHEAD} токенами")
+        return self.ring[(self.pos + offset) & RING_MASK]
 
     def current_token(self):
         """Получить текущий токен."""
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return Token(TokenType.EOF, None, -1, -1)
+        return self.ring[self.pos & RING_MASK]
+
+    def advance(self):
+        """Переходит к следующему токену и дочитывает из потока освободившееся место буфера."""
+        self.pos += 1
+        self.ring[(self.pos + MAX_LOOKAHEAD) & RING_MASK] = next(self.stream, self.end_token)
+
+    def mark(self, node, start):
+        """
+        Записывает в node.span токены узла: полуинтервал [start, self.pos)
+        относительно начала текущего якоря (см. AstNode.span).
+        """
+        anchor = self.anchor
+        node.span = (start - anchor, self.pos - anchor)
+        return node
 
     def consume(self, expected_type):
         """Потребляет текущий токен, если тип совпадает, и двигается дальше."""
         token = self.current_token()
         if token.type_ != expected_type:
             self.raise_error(f"Ожидался токен {expected_type}, но получен {token.type_}")
-        self.pos += 1
+        self.advance()
         value = token.value
 
         if expected_type == TokenType.NUMBER:
+            # Значение числа уже вычислено лексером
+            if token.literal is not None:
+                return token.literal
             if not value.isnumeric():
                 self.raise_error(f"Ожидалось числовое значение, но получено '{value}'")
             return int(value)
@@ -55,37 +201,97 @@ class Parser:
 
     def parse_program(self):
         """Program -> 'program' IDENTIFIER ';' Block '.'"""
-        self.consume(TokenType.IDENTIFIER)
-        program_name = self.consume(TokenType.IDENTIFIER)
-        self.consume(TokenType.SEMICOLON)
+        start = self.pos
+        self.expect(TokenType.IDENTIFIER)
+        program_name = self.expect(TokenType.IDENTIFIER)
+        self.expect(TokenType.SEMICOLON)
         block = self.parse_block()
-        self.consume(TokenType.DOT)
-        return ProgramNode(program_name=program_name, block=block)
+        self.expect(TokenType.DOT)
+        return self.mark(ProgramNode(program_name=program_name, block=block), start)
+
+    def parse_arena(self):
+        """
+        Как parse_program, но строит AstArena (parser/arena.py) вместо дерева объектов.
+        Каждое объявление верхнего уровня переносится в арену сразу после разбора,
+        поэтому объекты узлов существуют только для одного объявления за раз.
+        Представление корня — arena.tree().
+        """
+        arena = AstArena()
+        start = self.pos
+        self.expect(TokenType.IDENTIFIER)
+        program_name = self.expect(TokenType.IDENTIFIER)
+        self.expect(TokenType.SEMICOLON)
+        block_start = self.pos
+        # Записи полей узла идут подряд, поэтому ProgramNode, его поля program_name
+        # и block и поля блока declarations и compound_statement резервируются заранее
+        program = arena.reserve(5)
+        block, declarations, compound_statement = program + 2, program + 3, program + 4
+        arena.add(program_name, program + 1)
+        arena.set_list(declarations, [arena.add(node) for node in self.iter_block_declarations()])
+        arena.add(self.parse_block_body(), compound_statement)
+        arena.set_node(block, BlockNode, (block_start - self.anchor, self.pos - self.anchor),
+                       [declarations, compound_statement])
+        self.expect(TokenType.DOT)
+        arena.set_node(program, ProgramNode, (start - self.anchor, self.pos - self.anchor),
+                       [program + 1, block])
+        arena.root = program
+        return arena
+
+    def iter_declarations(self):
+        """
+        Потоковый разбор программы: генератор отдаёт каждое объявление верхнего
+        уровня (ConstDeclarationNode, VarDeclarationNode, TypeDeclarationNode,
+        ProcedureOrFunctionDeclarationNode) сразу после его разбора, а последним —
+        главный CompoundStatementNode. Пока потребитель обрабатывает процедуру N,
+        процедура N+1 ещё не разобрана. Имя программы сохраняется в self.program_name.
+        """
+        self.expect(TokenType.IDENTIFIER)
+        self.program_name = self.expect(TokenType.IDENTIFIER)
+        self.expect(TokenType.SEMICOLON)
+        yield from self.iter_block_declarations()
+        compound_statement = self.parse_block_body()
+        self.expect(TokenType.DOT)
+        yield compound_statement
 
     def parse_block(self):
         """Block -> [Declarations] CompoundStatement"""
+        start = self.pos
         declarations = self.parse_declarations()
+        compound_statement = self.parse_block_body()
+        return self.mark(BlockNode(declarations=declarations, compound_statement=compound_statement), start)
+
+    def parse_block_body(self):
+        """Составной оператор блока. Он — якорь: span его операторов отсчитываются от его начала."""
+        start = self.pos
+        outer_anchor = self.anchor
+        self.anchor = start
         compound_statement = self.parse_compound_statement()
-        return BlockNode(declarations=declarations, compound_statement=compound_statement)
+        self.anchor = outer_anchor
+        return self.mark(compound_statement, start)
 
     def parse_declarations(self):
         """Declarations -> { ConstDeclaration | VarDeclaration | ProcedureOrFunctionDeclaration }"""
-        declarations = []
-
-        # Проверяем типы токенов, которые могут указывать на начало деклараций
-        while self.match(TokenType.CONST) or self.match(TokenType.VAR) or \
-                self.match(TokenType.FUNCTION) or self.match(TokenType.PROCEDURE) \
-                or self.match(TokenType.TYPE):
-            if self.match(TokenType.TYPE):
-                declarations.extend(self.parse_type_section())
-            elif self.match(TokenType.CONST):
-                declarations.extend(self.parse_const_declaration(is_const=True))
-            elif self.match(TokenType.VAR):
-                declarations.extend(self.parse_const_declaration(is_const=False))
-            elif self.match(TokenType.FUNCTION) or self.match(TokenType.PROCEDURE):
-                declarations.append(self.parse_procedure_or_function_declaration())
-
-        return declarations
+        return list(self.iter_block_declarations())
+
+    def iter_block_declarations(self):
+        """Объявления блока по одному, в порядке разбора."""
+        parsers = self.declaration_parsers
+
+        # Секции объявлений идут, пока текущий токен входит в их FIRST-множество
+        while True:
+            token_type = self.current_token().type_
+            parse = parsers.get(token_type)
+            if parse is None:
+                if token_type in DECLARATION_SYNC or not self.recovering:
+                    return
+                # После объявлений блока может идти только BEGIN
+                self.recover(self.make_error(f"Ожидалось объявление или BEGIN, но получен {token_type}"),
+                             DECLARATION_SYNC)
+                continue
+            try:
+                yield from parse()
+            except ParseError as error:
+                self.recover(error, DECLARATION_SYNC)
 
     def parse_array_declaration(self, allow_initialization=True):
         self.consume(TokenType.ARRAY)
@@ -143,8 +349,10 @@ class Parser:
             s, t: string = "Hello";
             arr1, arr2: array [1..3] of integer = (1,2,3);
         """
-        declarations = []
+        return list(self.iter_const_declaration(is_const))
 
+    def iter_const_declaration(self, is_const: bool):
+        """Секция const или var: узлы отдаются после разбора каждой строки объявления."""
         if is_const:
             self.consume(TokenType.CONST)
         else:
@@ -152,52 +360,62 @@ class Parser:
 
         # Пока следующий токен - IDENTIFIER, значит есть ещё объявления
         while self.match(TokenType.IDENTIFIER):
-            # Сначала считываем список идентификаторов: (x, y, z)
-            identifiers = [self.consume(TokenType.IDENTIFIER)]
-            while self.match(TokenType.COMMA):
-                self.consume(TokenType.COMMA)
-                identifiers.append(self.consume(TokenType.IDENTIFIER))
+            try:
+                nodes = self.parse_declaration_line(is_const)
+            except ParseError as error:
+                # Строка с ошибкой пропускается целиком, разбор идёт со следующей
+                self.recover(error, LINE_SYNC)
+                if self.match(TokenType.SEMICOLON):
+                    self.consume(TokenType.SEMICOLON)
+                continue
+            yield from nodes
 
-            declared_type = None
-            const_value = None
+    def parse_declaration_line(self, is_const: bool):
+        """Строка секции const или var: x, y: integer [= значение]; — узел на каждый идентификатор."""
+        start = self.pos
+        # Сначала считываем список идентификаторов: (x, y, z)
+        identifiers = [self.consume(TokenType.IDENTIFIER)]
+        while self.match(TokenType.COMMA):
+            self.consume(TokenType.COMMA)
+            identifiers.append(self.consume(TokenType.IDENTIFIER))
 
-            if self.match(TokenType.COLON):
-                self.consume(TokenType.COLON)
+        declared_type = None
+        const_value = None
 
-                # Парсим тип (простой или массив)
-                if self.match(TokenType.ARRAY):
-                    declared_type = self.parse_array_declaration(allow_initialization=True)
-                else:
-
-                    if self.match(TokenType.IDENTIFIER):
-                        declared_type = self.consume(TokenType.IDENTIFIER)
-                    elif self.match(TokenType.STRING):
-                        declared_type = self.consume(TokenType.STRING)
-                    else:
-                        self.raise_error(f"Ожидался тип (IDENTIFIER или STRING) после ':' (строка {self.current_token().line}, позиция {self.current_token().column})")
-                    if is_const:
-                        if not self.match(TokenType.EQ):
-                            self.raise_error( f"Ожидался знак '=' после идентификатора(ов) {identifiers} (строка {self.current_token().line}, позиция {self.current_token().column})")
-
-                # Может быть инициализация через '='
-                if self.match(TokenType.EQ):
-                    self.consume(TokenType.EQ)
-                    const_value = self.parse_const_value()
+        if self.match(TokenType.COLON):
+            self.consume(TokenType.COLON)
 
+            # Парсим тип (простой или массив)
+            if self.match(TokenType.ARRAY):
+                declared_type = self.parse_array_declaration(allow_initialization=True)
             else:
-                self.raise_error(f"Ожидался символ ':' или '=' после идентификатора(ов) {identifiers} (строка {self.current_token().line}, позиция {self.current_token().column})")
 
-            self.consume(TokenType.SEMICOLON)
-
-            for ident in identifiers:
-                if is_const:
-                    declarations.append(
-                        ConstDeclarationNode(identifier=ident, value=(declared_type, const_value))
-                    )
+                if self.match(TokenType.IDENTIFIER):
+                    declared_type = self.consume(TokenType.IDENTIFIER)
+                elif self.match(TokenType.STRING):
+                    declared_type = self.consume(TokenType.STRING)
                 else:
-                    declarations.append(VarDeclarationNode(identifier=ident, var_type=declared_type, init_value=const_value))
+                    self.raise_error(f"Ожидался тип (IDENTIFIER или STRING) после ':' (строка {self.current_token().line}, позиция {self.current_token().column})")
+                if is_const:
+                    if not self.match(TokenType.EQ):
+                        self.raise_error( f"Ожидался знак '=' после идентификатора(ов) {identifiers} (строка {self.current_token().line}, позиция {self.current_token().column})")
 
-        return declarations
+            # Может быть инициализация через '='
+            if self.match(TokenType.EQ):
+                self.consume(TokenType.EQ)
+                const_value = self.parse_const_value()
+
+        else:
+            self.raise_error(f"Ожидался символ ':' или '=' после идентификатора(ов) {identifiers} (строка {self.current_token().line}, позиция {self.current_token().column})")
+
+        self.consume(TokenType.SEMICOLON)
+
+        # У всех переменных строки объявления общий span
+        if is_const:
+            return [self.mark(ConstDeclarationNode(identifier=ident, value=(declared_type, const_value)), start)
+                    for ident in identifiers]
+        return [self.mark(VarDeclarationNode(identifier=ident, var_type=declared_type, init_value=const_value), start)
+                for ident in identifiers]
 
     def parse_record_initializer(self):
         """
@@ -249,57 +467,31 @@ class Parser:
           - STRING
           - '(' ... ')' (это может быть массив ИЛИ record)
         """
-        if self.match(TokenType.NUMBER):
+        token_type = self.current_token().type_
+        if token_type == TokenType.NUMBER:
             return self.consume(TokenType.NUMBER)
+        elif token_type == TokenType.STRING or token_type == TokenType.CHAR:
+            return self.consume(token_type)
+        elif token_type == TokenType.LPAREN:
+            # Что внутри скобок, решаем по двум токенам после '(' без отката:
+            #   - IDENTIFIER ':' -> record
+            #   - иначе (число, строка, '(') -> "массивная" инициализация
+            if self.lookahead(1).type_ == TokenType.IDENTIFIER and self.lookahead(2).type_ == TokenType.COLON:
+                return self.parse_record_initializer()
 
-        elif self.match(TokenType.STRING):
-            return self.consume(TokenType.STRING)
-
-        elif self.match(TokenType.STRING):
-            return self.consume(TokenType.STRING)
-        elif self.match(TokenType.CHAR):
-            return self.consume(TokenType.CHAR)
-        elif self.match(TokenType.LPAREN):
-            # Посмотрим, что за конструкция внутри скобок:
-            #   - Если после '(' сразу IDENTIFIER + ':' -> record
-            #   - Иначе (например, число, строка, '(') -> "массивная" инициализация
-            #     (или просто список значений).
-
-            # Смотрим "вперёд" на следующий токен и токен после него
-            # сохраним позицию парсера, чтобы проверить lookahead
-            saved_position = self.save_position()
+            # Парсим список значений
             self.consume(TokenType.LPAREN)
+            values = []
+            while self.current_token().type_ in CONST_VALUE_FIRST:
+                # Позволим вложенные скобки (на случай, если внутри массива лежит record)
+                values.append(self.parse_const_value())
 
-            is_record_init = False
-
-            if self.match(TokenType.IDENTIFIER):
-                # берём этот IDENTIFIER
-                temp_id_token = self.current_token()
-                # смотрим дальше — двоеточие?
-                if self.lookahead(1).type_ == TokenType.COLON:
-                    # Похоже на record
-                    is_record_init = True
-
-            # восстанавливаемся к началу скобок, т.к. мы только глянули lookahead
-            self.restore_position(saved_position)
-
-            if is_record_init:
-                # Парсим record
-                return self.parse_record_initializer()
-            else:
-                # Парсим список значений
-                self.consume(TokenType.LPAREN)
-                values = []
-                while self.match(TokenType.NUMBER) or self.match(TokenType.STRING) or self.match(TokenType.CHAR) or self.match(TokenType.LPAREN):
-                    # Позволим вложенные скобки (на случай, если внутри массива лежит record)
-                    values.append(self.parse_const_value())
-
-                    if self.match(TokenType.COMMA):
-                        self.consume(TokenType.COMMA)
-                    else:
-                        break
-                self.consume(TokenType.RPAREN)
-                return values
+                if self.match(TokenType.COMMA):
+                    self.consume(TokenType.COMMA)
+                else:
+                    break
+            self.consume(TokenType.RPAREN)
+            return values
 
         else:
             self.raise_error(f"Ожидалось число, символ или конструкция '(...)' после '=' (строка {self.current_token().line}, позиция {self.current_token().column})")
@@ -390,18 +582,24 @@ class Parser:
         """
             TypeSection = "TYPE" { TypeDeclaration ";" }
             """
-        type_declarations = []
+        return list(self.iter_type_section())
+
+    def iter_type_section(self):
         self.consume(TokenType.TYPE)
 
         while self.match(TokenType.IDENTIFIER):
-            type_declarations.append(self.parse_type_declaration())
-
-        return type_declarations
+            try:
+                yield self.parse_type_declaration()
+            except ParseError as error:
+                self.recover(error, LINE_SYNC)
+                if self.match(TokenType.SEMICOLON):
+                    self.consume(TokenType.SEMICOLON)
 
     def parse_type_declaration(self):
         """
         TypeDeclaration = IDENTIFIER "=" Type ";"
         """
+        start = self.pos
         name = self.consume(TokenType.IDENTIFIER)
         self.consume(TokenType.EQ)
 
@@ -410,7 +608,7 @@ class Parser:
         if self.match(TokenType.SEMICOLON):
             self.consume(TokenType.SEMICOLON)
 
-        return TypeDeclarationNode(name, the_type)
+        return self.mark(TypeDeclarationNode(name, the_type), start)
 
     def parse_type(self):
         """
@@ -437,11 +635,38 @@ class Parser:
           | "FUNCTION"  IDENTIFIER [ "(" ParameterList ")" ] ":" Type ";" Block ";"
         """
         kind_token = self.current_token()
+        start = self.pos
         if kind_token.type_ not in [TokenType.PROCEDURE, TokenType.FUNCTION]:
             self.raise_error( f"Ожидалось ключевое слово PROCEDURE или FUNCTION (строка {kind_token.line}, позиция {kind_token.column})")
 
         # Считываем "PROCEDURE" или "FUNCTION"
         kind = self.consume(kind_token.type_)
+        try:
+            ident, parameters, return_type = self.parse_procedure_heading(kind_token.type_)
+        except ParseError as error:
+            # Заголовок с ошибкой пропускается до объявлений или BEGIN, тело всё равно разбирается
+            self.recover(error, DECLARATION_SYNC)
+            ident, parameters, return_type = None, [], None
+
+        # Парсим тело (Block); процедура — якорь для span узлов внутри неё
+        outer_anchor = self.anchor
+        self.anchor = start
+        block = self.parse_block()
+        self.anchor = outer_anchor
+
+        # В конце объявления процедуры/функции тоже стоит ';'
+        self.expect(TokenType.SEMICOLON)
+
+        return self.mark(ProcedureOrFunctionDeclarationNode(
+            kind=kind,
+            identifier=ident,
+            parameters=parameters,
+            block=block,
+            return_type=return_type
+        ), start)
+
+    def parse_procedure_heading(self, kind_type):
+        """Остаток заголовка после PROCEDURE/FUNCTION: (имя, параметры, тип результата), включая ';'."""
         ident = self.consume(TokenType.IDENTIFIER)
 
         parameters = []
@@ -451,7 +676,7 @@ class Parser:
 
         return_type = None
         # Если это FUNCTION, то ожидаем двоеточие и тип
-        if kind_token.type_ == TokenType.FUNCTION:
+        if kind_type == TokenType.FUNCTION:
             # Проверяем наличие ':'
             if self.match(TokenType.COLON):
                 self.consume(TokenType.COLON)
@@ -460,20 +685,7 @@ class Parser:
                 self.raise_error( f"Ожидалось ':' и тип возвращаемого значения после FUNCTION {ident} (строка {self.current_token().line}, позиция {self.current_token().column})")
 
         self.consume(TokenType.SEMICOLON)
-
-        # Парсим тело (Block)
-        block = self.parse_block()
-
-        # В конце объявления процедуры/функции тоже стоит ';'
-        self.consume(TokenType.SEMICOLON)
-
-        return ProcedureOrFunctionDeclarationNode(
-            kind=kind,
-            identifier=ident,
-            parameters=parameters,
-            block=block,
-            return_type=return_type
-        )
+        return ident, parameters, return_type
 
     def parse_parameter_list(self):
         """
@@ -544,44 +756,54 @@ class Parser:
 
     def parse_compound_statement(self):
         """CompoundStatement = "BEGIN" { Statement ";" } "END" """
-        self.consume(TokenType.BEGIN)
+        start = self.pos
+        self.expect(TokenType.BEGIN)
         statements = []
 
         while not self.match(TokenType.END) and self.current_token().type_ != TokenType.EOF:
-            stmt = self.parse_statement()
-            statements.append(stmt)
-            if self.match(TokenType.SEMICOLON):
-                self.consume(TokenType.SEMICOLON)
+            try:
+                stmt = self.parse_statement()
+            except ParseError as error:
+                # Оператор с ошибкой выбрасывается, разбор идёт со следующего
+                self.recover(error, STATEMENT_SYNC)
+                if self.match(TokenType.BEGIN):
+                    continue
             else:
+                statements.append(stmt)
+            if not self.statement_separator():
                 # Если нет ';', выходим, возможно END сразу
                 break
 
-        self.consume(TokenType.END)
-        return CompoundStatementNode(statements=statements)
+        self.expect(TokenType.END)
+        return self.mark(CompoundStatementNode(statements=statements), start)
 
-    def parse_statement(self):
-        if self.match(TokenType.IF):
-            return self.parse_if_statement()
-        elif self.match(TokenType.WHILE):
-            return self.parse_while_statement()
-        elif self.match(TokenType.FOR):
-            return self.parse_for_statement()
-        elif self.match(TokenType.BEGIN):
-            return self.parse_compound_statement()
-
-        elif self.match(TokenType.IDENTIFIER):
-            lookahead = self.tokens[self.pos + 1] if self.pos + 1 < len(self.tokens) else None
-
-            # Проверяем, если следующий токен ":=" или "[",
-            # значит это, скорее всего, присваивание (arr[i] := ...)
-            if lookahead and (lookahead.type_ == TokenType.ASSIGN or lookahead.type_ == TokenType.LBRACKET or
-            lookahead.type_ == TokenType.DOT):
-                return self.parse_assign_statement()
-            else:
-                return self.parse_procedure_call()
+    def statement_separator(self):
+        """
+        Потребляет ';' после оператора составного оператора; True, если список продолжается.
+        В режиме восстановления пропущенная ';' перед началом следующего оператора
+        записывается как ошибка, и список тоже продолжается.
+        """
+        if self.match(TokenType.SEMICOLON):
+            self.consume(TokenType.SEMICOLON)
+            return True
+        if self.recovering and self.current_token().type_ in self.statement_parsers:
+            self.record_error(self.make_error(f"Ожидался токен {TokenType.SEMICOLON}, но получен {self.current_token().type_}"))
+            return True
+        return False
 
-        else:
+    def parse_statement(self):
+        parse = self.statement_parsers.get(self.current_token().type_)
+        if parse is None:
             self.raise_error(f"Токен {self.current_token().type_} не ожидается в этом месте (строка {self.current_token().line}, позиция {self.current_token().column})")
+        start = self.pos
+        return self.mark(parse(), start)
+
+    def parse_identifier_statement(self):
+        """Оператор, начинающийся с идентификатора: присваивание или вызов процедуры"""
+        # Если следующий токен ":=", "[" или ".", это присваивание (x := ..., arr[i] := ..., p.x := ...)
+        if self.lookahead(1).type_ in ASSIGNMENT_FOLLOW:
+            return self.parse_assign_statement()
+        return self.parse_procedure_call()
 
     def parse_assign_statement(self):
         """
@@ -740,103 +962,112 @@ class Parser:
 
     def parse_expression(self):
         """Expression = SimpleExpression [ RelationalOperator SimpleExpression ]"""
+        start = self.pos
         left = self.parse_simple_expression()
-        if self.match(TokenType.EQ) or self.match(TokenType.NEQ) or self.match(TokenType.LT) or \
-                self.match(TokenType.GT) or self.match(TokenType.LTE) or self.match(TokenType.GTE) \
-                or self.match(TokenType.AND) or self.match(TokenType.OR):
-            op = self.current_token().value
-            self.pos += 1
+        token = self.current_token()
+        if token.type_ in RELATIONAL_OPERATORS:
+            self.advance()
             right = self.parse_simple_expression()
-            return ExpressionNode(left=left, relational_operator=op, right=right)
-        return ExpressionNode(left=left)
+            return self.mark(ExpressionNode(left=left, relational_operator=token.value, right=right), start)
+        return self.mark(ExpressionNode(left=left), start)
 
     def parse_simple_expression(self):
         """SimpleExpression = Term { AdditiveOperator Term }"""
+        return self.parse_binary_expression(ADDITIVE_LEVEL)
+
+    def parse_term(self):
+        """Term = Factor { MultiplicativeOperator Factor }"""
+        return self.parse_binary_expression(MULTIPLICATIVE_LEVEL)
+
+    def parse_binary_expression(self, min_level):
+        """
+        Разбирает цепочку бинарных операторов с приоритетом не ниже min_level
+        восхождением по приоритетам (таблица BINARY_OPERATORS).
+        Подряд идущие операторы одного уровня собираются в один n-арный узел:
+        a + b - c * d -> SimpleExpressionNode(terms=[a, '+', b, '-', TermNode([c, '*', d])]).
+        Выражение без операторов возвращается как есть (фактор).
+        """
         left = self.parse_factor()
-        # Смотрим есть ли +, -, OR
-        while self.match(TokenType.PLUS) or self.match(TokenType.MINUS) or self.match(TokenType.OR) or\
-                self.match(TokenType.ASTERISK) or self.match(TokenType.SLASH) or \
-                        self.match(TokenType.DIV) or self.match(TokenType.MOD) or self.match(TokenType.AND):
-            op = self.current_token().value
-            self.pos += 1
-            right = self.parse_factor()
-            left = SimpleExpressionNode(terms=[left, op, right], additive_operator=op)
-        return left
-
-    """
-        def parse_term(self):
-        '''Term = Factor { MultiplicativeOperator Factor }'''
-        left = self.parse_factor()
-        while self.match(TokenType.ASTERISK) or self.match(TokenType.SLASH) or \
-                self.match(TokenType.DIV) or self.match(TokenType.MOD) or self.match(TokenType.AND):
-            op = self.current_token().value
-            self.pos += 1
-            right = self.parse_factor()
-            left = TermNode(factors=[left, op, right])
-        return left
-    """
+        while True:
+            level = BINARY_OPERATORS.get(self.current_token().type_)
+            if level is None or level < min_level:
+                return left
+            items = [left]
+            while True:
+                token = self.current_token()
+                if BINARY_OPERATORS.get(token.type_) != level:
+                    break
+                self.advance()
+                items.append(token.value)
+                items.append(self.parse_binary_expression(level + 1))
+            left = OPERATOR_NODES[level](items, items[1])
 
     def parse_factor(self):
-        # (1) число
-        if self.match(TokenType.NUMBER):
-            val = self.consume(TokenType.NUMBER)
-            return FactorNode(value=val)
+        parse = self.factor_parsers.get(self.current_token().type_)
+        if parse is None:
+            self.raise_error(f"Неожиданный токен {self.current_token().type_} (строка {self.current_token().line}, позиция {self.current_token().column})")
+        return parse()
 
-        # (2) строка
-        elif self.match(TokenType.STRING):
-            val = self.consume(TokenType.STRING)
-            return FactorNode(value=val)
+    def leaf(self, value=None, identifier=None):
+        """
+        Лист FactorNode с литералом или идентификатором. При share_leaves равные
+        листья — один SharedFactorNode; тип значения входит в ключ, так как True == 1.
+        """
+        leaves = self.leaves
+        if leaves is None:
+            return FactorNode(value=value, identifier=identifier)
+        key = (type(value), value, identifier)
+        node = leaves.get(key)
+        if node is None:
+            node = leaves[key] = SharedFactorNode(value=value, identifier=identifier)
+        return node
+
+    def parse_number_factor(self):
+        return self.leaf(value=self.consume(TokenType.NUMBER))
+
+    def parse_text_factor(self):
+        # Строка или символ
+        return self.leaf(value=self.consume(self.current_token().type_))
+
+    def parse_identifier_factor(self):
+        # Идентификатор => переменная, массив, поле записи или вызов функции
+        ident = self.consume(TokenType.IDENTIFIER)
 
-        elif self.match(TokenType.CHAR):
-            val = self.consume(TokenType.CHAR)
-            return FactorNode(value=val)
-        # (3) идентификатор => переменная, массив, или вызов функции
-        elif self.match(TokenType.IDENTIFIER):
-            ident = self.consume(TokenType.IDENTIFIER)
+        # Могут быть индексы массива (arr[i]) — цикл while, если разрешаете многомерные
+        while self.match(TokenType.LBRACKET):
+            self.consume(TokenType.LBRACKET)
+            index_expr = self.parse_expression()
+            self.consume(TokenType.RBRACKET)
+            ident = ArrayAccessNode(array_name=ident, index_expr=index_expr)
 
-            # Могут быть индексы массива (arr[i]) — цикл while, если разрешаете многомерные
-            while self.match(TokenType.LBRACKET):
-                self.consume(TokenType.LBRACKET)
-                index_expr = self.parse_expression()
-                self.consume(TokenType.RBRACKET)
-                ident = ArrayAccessNode(array_name=ident, index_expr=index_expr)
+        if self.match(TokenType.DOT):
+            self.consume(TokenType.DOT)
+            field_ident = self.consume(TokenType.IDENTIFIER)
+            return RecordFieldAccessNode(record_obj=ident, field_name=field_ident)
 
-            while self.match(TokenType.DOT):
-                self.consume(TokenType.DOT)
-                field_ident = self.consume(TokenType.IDENTIFIER)
-                node = RecordFieldAccessNode(record_obj=ident, field_name=field_ident)
-                return node
-
-            # Проверяем вызов функции
-            if self.match(TokenType.LPAREN):
-                func_call_node = self.parse_function_call(ident)
-                return func_call_node
-
-            # Иначе это просто FactorNode с identifier=ident
-            if isinstance(ident, str):
-                return FactorNode(identifier=ident)
-            else:
-                return ident
-
-        # (4) булевые литералы
-        elif self.match(TokenType.TRUE):
-            self.consume(TokenType.TRUE)
-            return FactorNode(value=True)
-        elif self.match(TokenType.FALSE):
-            self.consume(TokenType.FALSE)
-            return FactorNode(value=False)
-
-        # (5) скобки ( ... )
-        elif self.match(TokenType.LPAREN):
-            self.consume(TokenType.LPAREN)
-            inner_expr = self.parse_expression()
-            self.consume(TokenType.RPAREN)
-            return FactorNode(sub_expression=inner_expr)
+        # Проверяем вызов функции
+        if self.match(TokenType.LPAREN):
+            return self.parse_function_call(ident)
 
-        elif self.match(TokenType.NOT):
-            self.consume(TokenType.NOT)
-            factor = self.parse_factor()
-            return FactorNode(sub_expression=factor, is_not=True)
+        # Иначе это просто FactorNode с identifier=ident
+        if isinstance(ident, str):
+            return self.leaf(identifier=ident)
+        return ident
 
-        else:
-            self.raise_error(f"Неожиданный токен {self.current_token().type_} (строка {self.current_token().line}, позиция {self.current_token().column})")
+    def parse_boolean_factor(self):
+        # Булевы литералы
+        token_type = self.current_token().type_
+        self.consume(token_type)
+        return self.leaf(value=token_type == TokenType.TRUE)
+
+    def parse_parenthesized_factor(self):
+        # Скобки ( ... )
+        self.consume(TokenType.LPAREN)
+        inner_expr = self.parse_expression()
+        self.consume(TokenType.RPAREN)
+        return FactorNode(sub_expression=inner_expr)
+
+    def parse_not_factor(self):
+        self.consume(TokenType.NOT)
+        factor = self.parse_factor()
+        return FactorNode(sub_expression=factor, is_not=True)
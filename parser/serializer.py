@@ -0,0 +1,430 @@
+import gc
+import io
+import struct
+import sys
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from itertools import chain, count, repeat
+from operator import attrgetter
+
+from lexer.interner import Symbol
+from .arena import NODE_CLASSES, NODE_KINDS, NODE_FIELDS
+from .ast_node import SharedFactorNode
+
+# Двоичный формат AST (версия FORMAT_VERSION), по столбцам, как TokenBuffer и AstArena:
+#   заголовок — MAGIC, версия, порядок байтов массивов ('<' или '>');
+#   далее кадры, по одному на записанное значение (AstWriter.write), до конца потока.
+#
+# Значения кадра пронумерованы: сначала литералы (таблица литералов общая для
+# всех кадров потока), затем узлы, сгруппированные по классам в порядке
+# SERIAL_CLASSES, затем списки и кортежи (вложенные кортежи раньше содержащих).
+# Кадр — заголовок FRAME и массивы:
+#   node_counts — число узлов каждого класса;
+#   новые литералы: виды (array('B')), целые (array('q')), вещественные (array('d'))
+#   и байты строк и длинных целых;
+#   lengths — длины списков, затем кортежей;
+#   refs — номера значений: поля узлов (для каждого класса — столбец на поле),
+#   элементы списков, элементы кортежей; последним — номер самого значения;
+#   spans — столбец start + 1 (0 — span нет), затем столбец stop, по узлам.
+# lengths, refs и spans записываются самым узким из типов 'B', 'H', 'I'.
+MAGIC = b"PAST"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sBc")
+FRAME = struct.Struct("<cccIIIIIII")
+
+# Классы узлов формата: классы арены и общий лист, который остаётся общим и неизменяемым
+SERIAL_CLASSES = NODE_CLASSES + (SharedFactorNode,)
+SERIAL_KINDS = dict(NODE_KINDS)
+SERIAL_KINDS[SharedFactorNode] = len(NODE_CLASSES)
+SERIAL_FIELDS = [NODE_FIELDS[node_class] for node_class in SERIAL_CLASSES]
+
+
+def _field_getter(names):
+    # attrgetter с одним именем возвращает само значение, а не кортеж
+    if len(names) > 1:
+        return attrgetter(*names)
+    name, = names
+    return lambda node: (getattr(node, name),)
+
+
+# Номер класса -> функция, возвращающая поля узла кортежем
+FIELD_GETTERS = [_field_getter(names) for names in SERIAL_FIELDS]
+
+# Виды литералов
+NONE_LITERAL = 0
+FALSE_LITERAL = 1
+TRUE_LITERAL = 2
+INT_LITERAL = 3
+FLOAT_LITERAL = 4
+STR_LITERAL = 5
+SYMBOL_LITERAL = 6
+# Целое вне int64: длина и байты дополнительного кода (little-endian)
+BIG_INT_LITERAL = 7
+# Других литералов формат не сохраняет (TypeError при записи)
+LITERAL_TYPES = frozenset((type(None), bool, int, float, str, Symbol))
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+
+def _narrowest(values):
+    """Массив с values самого узкого беззнакового типа."""
+    largest = max(values, default=0)
+    for typecode in "BHI":
+        if largest < 1 << 8 * array(typecode).itemsize:
+            return array(typecode, values)
+    raise OverflowError(f"Значение {largest} не помещается в 32 бита")
+
+
+def _consume(iterator):
+    deque(iterator, maxlen=0)
+
+
+@contextmanager
+def _gc_paused():
+    """
+    Сборщик мусора выключен, пока создаются объекты кадра: дерево без циклов,
+    а сборки поколений, запускаемые каждые несколько сотен новых объектов,
+    занимали бы бОльшую часть времени (как и у pickle.loads).
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _children_first(tuples):
+    """Кортежи в таком порядке, что вложенный кортеж идёт раньше содержащего его."""
+    order = []
+    placed = set()
+    for root in tuples:
+        stack = [(root, False)]
+        while stack:
+            item, expanded = stack.pop()
+            if id(item) in placed:
+                continue
+            if expanded:
+                placed.add(id(item))
+                order.append(item)
+            else:
+                stack.append((item, True))
+                stack.extend((child, False) for child in item if type(child) is tuple)
+    return order
+
+
+class AstWriter:
+    """
+    Потоковая запись AST в двоичный файл (file — объект с write, открытый в режиме 'wb').
+    Каждый вызов write сохраняет одно значение — узел с поддеревом (в том числе
+    представление AstArena), список или литерал — отдельным кадром, так что
+    объявления из Parser.iter_declarations() можно записывать по одному, не держа
+    всё дерево в памяти. Равные литералы (имена, числа, операторы) сохраняются
+    один раз на весь поток; объект, на который ссылаются несколько полей
+    (например, SharedFactorNode), — один раз на кадр. Литералы — None, bool, int,
+    float, str и Symbol; значение другого типа — TypeError.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        # (тип, значение) -> номер литерала; тип в ключе, так как True == 1 и Symbol('x') == 'x'
+        self.slots = {}
+        self.literal_count = 0
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER))
+
+    def _literal(self, value, new_literals):
+        value_type = type(value)
+        if value_type not in LITERAL_TYPES:
+            # Произвольные объекты не сохраняются: чтение файла не должно исполнять код
+            raise TypeError(f"Литерал типа {value_type.__name__} не поддерживается двоичным форматом AST")
+        key = value_type, value
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.literal_count
+            self.literal_count += 1
+            new_literals.append(value)
+            self.slots[key] = slot
+        return slot
+
+    def write(self, value):
+        with _gc_paused():
+            self._write(value)
+
+    def _write(self, value):
+        root = value
+        # id значения -> его номер в кадре (у узлов, списков и кортежей — после обхода)
+        numbers = {}
+        nodes = [[] for _ in SERIAL_CLASSES]
+        fields = [[] for _ in SERIAL_CLASSES]
+        lists = []
+        tuples = []
+        new_literals = []
+        kinds = SERIAL_KINDS
+        getters = FIELD_GETTERS
+        # Обход по уровням: значения уровня разбираются по одному разу (повторы
+        # отсеиваются по id), поля узлов одного класса достаются через map.
+        # Все значения живут в nodes, fields, lists и tuples до конца записи, поэтому id не повторяются
+        frontier = [value]
+        while frontier:
+            buckets = [[] for _ in SERIAL_CLASSES]
+            containers = []
+            for key, value in dict(zip(map(id, frontier), frontier)).items():
+                if key in numbers:
+                    continue
+                numbers[key] = None
+                value_type = type(value)
+                kind = kinds.get(value_type)
+                if kind is not None:
+                    buckets[kind].append(value)
+                elif value_type is list or value_type is tuple:
+                    (lists if value_type is list else tuples).append(value)
+                    containers.append(value)
+                else:
+                    numbers[key] = self._literal(value, new_literals)
+            frontier = []
+            for kind, bucket in enumerate(buckets):
+                if bucket:
+                    nodes[kind] += bucket
+                    values = list(map(getters[kind], bucket))
+                    fields[kind] += values
+                    frontier += chain.from_iterable(values)
+            frontier += chain.from_iterable(containers)
+
+        tuples = _children_first(tuples)
+        number = self.literal_count
+        for group in nodes + [lists, tuples]:
+            numbers.update(zip(map(id, group), count(number)))
+            number += len(group)
+
+        reference = numbers.__getitem__
+        refs = []
+        for columns in fields:
+            for column in zip(*columns):
+                refs.extend(map(reference, map(id, column)))
+        for items in lists + tuples:
+            refs.extend(map(reference, map(id, items)))
+        refs.append(reference(id(root)))
+
+        starts = []
+        stops = []
+        for group in nodes:
+            for span in map(attrgetter('span'), group):
+                if span is None:
+                    starts.append(0)
+                    stops.append(0)
+                else:
+                    starts.append(span[0] + 1)
+                    stops.append(span[1])
+
+        self._write_frame(array('I', map(len, nodes)), new_literals,
+                          _narrowest(list(map(len, lists + tuples))), len(lists), len(tuples),
+                          _narrowest(refs), _narrowest(starts + stops))
+
+    def _write_frame(self, node_counts, literals, lengths, list_count, tuple_count, refs, spans):
+        kinds = array('B')
+        numbers = array('q')
+        floats = array('d')
+        texts = []
+        for value in literals:
+            value_type = type(value)
+            if value is None:
+                kinds.append(NONE_LITERAL)
+            elif value_type is bool:
+                kinds.append(TRUE_LITERAL if value else FALSE_LITERAL)
+            elif value_type is int and INT64_MIN <= value <= INT64_MAX:
+                kinds.append(INT_LITERAL)
+                numbers.append(value)
+            elif value_type is float:
+                kinds.append(FLOAT_LITERAL)
+                floats.append(value)
+            elif value_type is str or value_type is Symbol:
+                data = value.encode("utf-8")
+                if value_type is Symbol:
+                    kinds.append(SYMBOL_LITERAL)
+                    numbers.append(value.id)
+                else:
+                    kinds.append(STR_LITERAL)
+                numbers.append(len(data))
+                texts.append(data)
+            else:
+                data = value.to_bytes((value.bit_length() + 8) // 8, "little", signed=True)
+                kinds.append(BIG_INT_LITERAL)
+                numbers.append(len(data))
+                texts.append(data)
+        text = b"".join(texts)
+        write = self.file.write
+        write(FRAME.pack(lengths.typecode.encode(), refs.typecode.encode(), spans.typecode.encode(),
+                         len(kinds), len(numbers), len(floats), len(text), list_count, tuple_count, len(refs)))
+        write(node_counts.tobytes())
+        write(kinds.tobytes())
+        write(numbers.tobytes())
+        write(floats.tobytes())
+        write(text)
+        write(lengths.tobytes())
+        write(refs.tobytes())
+        write(spans.tobytes())
+
+
+class AstReader:
+    """
+    Потоковое чтение файла AstWriter (file — объект с read, открытый в режиме 'rb').
+    read() возвращает следующее записанное значение, итерация — все значения
+    по порядку; файл читается кадр за кадром. Узлы — обычные узлы parser/ast_node.py
+    (общие листья — снова SharedFactorNode), Symbol — с прежними id.
+    Узлы создаются сразу всем классом, а поля заполняются столбцами через map,
+    без цикла Python на каждый узел.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.literals = []
+        magic, version, byte_order = HEADER.unpack(self._read_exactly(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Это не двоичный файл AST")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Версия формата AST {version} не поддерживается (ожидалась {FORMAT_VERSION})")
+        self.swap = byte_order != BYTE_ORDER
+
+    def _read_exactly(self, size):
+        data = self.file.read(size)
+        if len(data) != size:
+            raise ValueError("Двоичный файл AST оборван")
+        return data
+
+    def _read_array(self, typecode, size):
+        values = array(typecode)
+        values.frombytes(self._read_exactly(size * values.itemsize))
+        if self.swap:
+            values.byteswap()
+        return values
+
+    def __iter__(self):
+        while True:
+            try:
+                yield self.read()
+            except EOFError:
+                return
+
+    def read(self):
+        """Следующее значение потока; в конце потока — EOFError, как у pickle.load."""
+        header = self.file.read(FRAME.size)
+        if not header:
+            raise EOFError("Двоичный файл AST закончился")
+        if len(header) != FRAME.size:
+            raise ValueError("Двоичный файл AST оборван")
+        (lengths_type, refs_type, spans_type, literal_count, number_count, float_count,
+         text_size, list_count, tuple_count, ref_count) = FRAME.unpack(header)
+        node_counts = self._read_array('I', len(SERIAL_CLASSES))
+        self._read_literals(self._read_array('B', literal_count), self._read_array('q', number_count),
+                            self._read_array('d', float_count), self._read_exactly(text_size))
+        lengths = self._read_array(lengths_type.decode(), list_count + tuple_count)
+        refs = self._read_array(refs_type.decode(), ref_count)
+        spans = self._read_array(spans_type.decode(), 2 * sum(node_counts))
+        with _gc_paused():
+            return self._build(node_counts, lengths, list_count, refs, spans)
+
+    def _read_literals(self, kinds, numbers, floats, text):
+        literals = self.literals
+        numbers = iter(numbers)
+        floats = iter(floats)
+        offset = 0
+        for kind in kinds:
+            if kind == NONE_LITERAL:
+                literals.append(None)
+            elif kind == FALSE_LITERAL:
+                literals.append(False)
+            elif kind == TRUE_LITERAL:
+                literals.append(True)
+            elif kind == INT_LITERAL:
+                literals.append(next(numbers))
+            elif kind == FLOAT_LITERAL:
+                literals.append(next(floats))
+            elif kind in (STR_LITERAL, SYMBOL_LITERAL, BIG_INT_LITERAL):
+                id_ = next(numbers) if kind == SYMBOL_LITERAL else None
+                size = next(numbers)
+                data = text[offset:offset + size]
+                offset += size
+                if kind == BIG_INT_LITERAL:
+                    literals.append(int.from_bytes(data, "little", signed=True))
+                elif kind == SYMBOL_LITERAL:
+                    symbol = Symbol(data.decode("utf-8"))
+                    symbol.id = id_
+                    literals.append(symbol)
+                else:
+                    literals.append(data.decode("utf-8"))
+            else:
+                raise ValueError(f"Неизвестный вид литерала {kind} в двоичном файле AST")
+
+    def _build(self, node_counts, lengths, list_count, refs, spans):
+        # Сначала создаются все объекты кадра (узлы и списки — пустыми), затем
+        # кортежи по порядку (вложенные раньше), и только потом заполняются
+        # списки и поля узлов: к этому моменту все значения, на которые они
+        # ссылаются, уже есть в table. table — таблица литералов потока,
+        # к которой на время сборки дописаны объекты кадра
+        table = self.literals
+        literal_count = len(table)
+        groups = []
+        for kind, size in enumerate(node_counts):
+            if size:
+                node_class = SERIAL_CLASSES[kind]
+                group = list(map(node_class.__new__, repeat(node_class, size)))
+                groups.append((kind, group))
+                table += group
+        lists = [[] for _ in range(list_count)]
+        table += lists
+        tuple_base = len(table)
+        table += repeat(None, len(lengths) - list_count)
+
+        value = table.__getitem__
+        list_position = sum(size * len(SERIAL_FIELDS[kind]) for kind, size in enumerate(node_counts))
+        position = list_position + sum(lengths[:list_count])
+        for number, size in enumerate(lengths[list_count:], tuple_base):
+            table[number] = tuple(map(value, refs[position:position + size]))
+            position += size
+        position = list_position
+        for items, size in zip(lists, lengths):
+            items.extend(map(value, refs[position:position + size]))
+            position += size
+
+        # object.__setattr__ — в обход запрета изменять SharedFactorNode
+        setter = object.__setattr__
+        position = 0
+        start = 0
+        node_total = len(spans) // 2
+        for kind, group in groups:
+            size = len(group)
+            for name in SERIAL_FIELDS[kind]:
+                _consume(map(setter, group, repeat(name), map(value, refs[position:position + size])))
+                position += size
+            starts = spans[start:start + size]
+            stops = spans[node_total + start:node_total + start + size]
+            _consume(map(setter, group, repeat('span'),
+                         [(first - 1, stop) if first else None for first, stop in zip(starts, stops)]))
+            start += size
+        value = table[refs[-1]]
+        del table[literal_count:]
+        return value
+
+
+def dump(value, file):
+    """Записывает одно значение (обычно ProgramNode) в двоичный файл."""
+    AstWriter(file).write(value)
+
+
+def load(file):
+    """Читает значение, записанное dump."""
+    return AstReader(file).read()
+
+
+def dumps(value):
+    buffer = io.BytesIO()
+    dump(value, buffer)
+    return buffer.getvalue()
+
+
+def loads(data):
+    return load(io.BytesIO(data))
@@ -0,0 +1,263 @@
+from lexer.token_type import TokenType
+from custom_exceptions.parse_error import ParseError
+from .ast_node import *
+from .parser import Parser, BINARY_OPERATORS, OPERATOR_NODES, RELATIONAL_OPERATORS, ASSIGNMENT_FOLLOW, \
+    ADDITIVE_LEVEL, MULTIPLICATIVE_LEVEL, STATEMENT_SYNC
+
+
+class StackParser(Parser):
+    """
+    Парсер с явным стеком вместо рекурсии Python для операторов и выражений.
+
+    Правила грамматики для операторов и выражений записаны как генераторы:
+    вместо вызова вложенного правила генератор выдаёт (yield) его генератор
+    и получает обратно построенный узел. Генераторы выполняет цикл run,
+    держа их в обычном списке. Поэтому глубина вложенности begin ... end,
+    цепочек else if и скобок ограничена памятью, а не sys.getrecursionlimit().
+    Строятся те же узлы parser/ast_node.py, что и у Parser.
+    Объявления (и вложенные процедуры) разбираются как в Parser.
+    """
+
+    def __init__(self, tokens, start=0, recover=False, share_leaves=False):
+        super().__init__(tokens, start, recover, share_leaves)
+        self.statement_routines = {
+            TokenType.IF: self.if_statement_routine,
+            TokenType.WHILE: self.while_statement_routine,
+            TokenType.FOR: self.for_statement_routine,
+            TokenType.BEGIN: self.compound_statement_routine,
+            TokenType.IDENTIFIER: self.identifier_statement_routine,
+        }
+
+    @staticmethod
+    def run(routine):
+        """
+        Выполняет правило-генератор и все вложенные в него правила на явном стеке.
+        ParseError вложенного правила передаётся (throw) в вызвавшее его, как при рекурсии.
+        """
+        stack = [routine]
+        value = None
+        error = None
+        while True:
+            try:
+                if error is None:
+                    child = stack[-1].send(value)
+                else:
+                    thrown, error = error, None
+                    child = stack[-1].throw(thrown)
+            except StopIteration as stop:
+                stack.pop()
+                if not stack:
+                    return stop.value
+                value = stop.value
+                continue
+            except ParseError as raised:
+                stack.pop()
+                if not stack:
+                    raise
+                error = raised
+                continue
+            stack.append(child)
+            value = None
+
+    def parse_compound_statement(self):
+        return self.run(self.compound_statement_routine())
+
+    def parse_statement(self):
+        return self.run(self.statement_routine())
+
+    def parse_expression(self):
+        return self.run(self.expression_routine())
+
+    def parse_simple_expression(self):
+        return self.run(self.binary_expression_routine(ADDITIVE_LEVEL))
+
+    def parse_term(self):
+        return self.run(self.binary_expression_routine(MULTIPLICATIVE_LEVEL))
+
+    def parse_factor(self):
+        return self.run(self.factor_routine())
+
+    # Операторы
+
+    def compound_statement_routine(self):
+        """CompoundStatement = "BEGIN" { Statement ";" } "END" """
+        start = self.pos
+        self.expect(TokenType.BEGIN)
+        statements = []
+
+        while not self.match(TokenType.END) and self.current_token().type_ != TokenType.EOF:
+            try:
+                statements.append((yield self.statement_routine()))
+            except ParseError as error:
+                self.recover(error, STATEMENT_SYNC)
+                if self.match(TokenType.BEGIN):
+                    continue
+            if not self.statement_separator():
+                break
+
+        self.expect(TokenType.END)
+        return self.mark(CompoundStatementNode(statements=statements), start)
+
+    def statement_routine(self):
+        routine = self.statement_routines.get(self.current_token().type_)
+        if routine is None:
+            self.raise_error(f"Токен {self.current_token().type_} не ожидается в этом месте (строка {self.current_token().line}, позиция {self.current_token().column})")
+        start = self.pos
+        return self.mark((yield routine()), start)
+
+    def identifier_statement_routine(self):
+        if self.lookahead(1).type_ in ASSIGNMENT_FOLLOW:
+            lval = yield self.lvalue_routine()
+            self.consume(TokenType.ASSIGN)
+            expr = yield self.expression_routine()
+            return AssignStatementNode(identifier=lval, expression=expr)
+
+        ident = self.consume(TokenType.IDENTIFIER)
+        args = []
+        if self.match(TokenType.LPAREN):
+            self.consume(TokenType.LPAREN)
+            args.append((yield self.expression_routine()))
+            while self.match(TokenType.COMMA):
+                self.consume(TokenType.COMMA)
+                args.append((yield self.expression_routine()))
+            self.consume(TokenType.RPAREN)
+        return ProcedureCallNode(identifier=ident, arguments=args)
+
+    def lvalue_routine(self):
+        base_ident = self.consume(TokenType.IDENTIFIER)
+
+        while True:
+            if self.match(TokenType.LBRACKET):
+                self.consume(TokenType.LBRACKET)
+                index_expr = yield self.expression_routine()
+                self.consume(TokenType.RBRACKET)
+                base_ident = ArrayAccessNode(array_name=base_ident, index_expr=index_expr)
+            elif self.match(TokenType.DOT):
+                self.consume(TokenType.DOT)
+                field = self.consume(TokenType.IDENTIFIER)
+                base_ident = RecordFieldAccessNode(record_obj=base_ident, field_name=field)
+            else:
+                break
+
+        return base_ident
+
+    def if_statement_routine(self):
+        """IfStatement = "IF" Expression "THEN" Statement [ "ELSE" Statement ]"""
+        self.consume(TokenType.IF)
+        condition = yield self.expression_routine()
+        self.consume(TokenType.THEN)
+        then_stmt = yield self.statement_routine()
+        else_stmt = None
+        if self.match(TokenType.ELSE):
+            self.consume(TokenType.ELSE)
+            else_stmt = yield self.statement_routine()
+        return IfStatementNode(condition=condition, then_statement=then_stmt, else_statement=else_stmt)
+
+    def while_statement_routine(self):
+        """WhileStatement = "WHILE" Expression "DO" Statement"""
+        self.consume(TokenType.WHILE)
+        condition = yield self.expression_routine()
+        self.consume(TokenType.DO)
+        body = yield self.statement_routine()
+        return WhileStatementNode(condition=condition, body=body)
+
+    def for_statement_routine(self):
+        """ForStatement = "FOR" IDENTIFIER ":=" Expression ("TO" | "DOWNTO") Expression "DO" Statement"""
+        self.consume(TokenType.FOR)
+        ident = self.consume(TokenType.IDENTIFIER)
+        self.consume(TokenType.ASSIGN)
+        start_expr = yield self.expression_routine()
+        if self.match(TokenType.TO):
+            direction = self.consume(TokenType.TO)
+        elif self.match(TokenType.IDENTIFIER) and self.current_token().value.upper() == 'DOWNTO':
+            direction = self.consume(TokenType.IDENTIFIER)
+        else:
+            self.raise_error("Ожидалось ключевое слово TO в цикле FOR")
+
+        end_expr = yield self.expression_routine()
+        self.consume(TokenType.DO)
+        body = yield self.statement_routine()
+        return ForStatementNode(identifier=ident, start_expr=start_expr, direction=direction, end_expr=end_expr,
+                                body=body)
+
+    # Выражения
+
+    def expression_routine(self):
+        """Expression = SimpleExpression [ RelationalOperator SimpleExpression ]"""
+        start = self.pos
+        left = yield self.binary_expression_routine(ADDITIVE_LEVEL)
+        token = self.current_token()
+        if token.type_ in RELATIONAL_OPERATORS:
+            self.advance()
+            right = yield self.binary_expression_routine(ADDITIVE_LEVEL)
+            return self.mark(ExpressionNode(left=left, relational_operator=token.value, right=right), start)
+        return self.mark(ExpressionNode(left=left), start)
+
+    def binary_expression_routine(self, min_level):
+        """Восхождение по приоритетам, как Parser.parse_binary_expression."""
+        left = yield self.factor_routine()
+        while True:
+            level = BINARY_OPERATORS.get(self.current_token().type_)
+            if level is None or level < min_level:
+                return left
+            items = [left]
+            while True:
+                token = self.current_token()
+                if BINARY_OPERATORS.get(token.type_) != level:
+                    break
+                self.advance()
+                items.append(token.value)
+                if level < MULTIPLICATIVE_LEVEL:
+                    items.append((yield self.binary_expression_routine(level + 1)))
+                else:
+                    items.append((yield self.factor_routine()))
+            left = OPERATOR_NODES[level](items, items[1])
+
+    def factor_routine(self):
+        token_type = self.current_token().type_
+
+        if token_type == TokenType.LPAREN:
+            self.consume(TokenType.LPAREN)
+            inner_expr = yield self.expression_routine()
+            self.consume(TokenType.RPAREN)
+            return FactorNode(sub_expression=inner_expr)
+
+        if token_type == TokenType.NOT:
+            self.consume(TokenType.NOT)
+            factor = yield self.factor_routine()
+            return FactorNode(sub_expression=factor, is_not=True)
+
+        if token_type == TokenType.IDENTIFIER:
+            ident = self.consume(TokenType.IDENTIFIER)
+
+            while self.match(TokenType.LBRACKET):
+                self.consume(TokenType.LBRACKET)
+                index_expr = yield self.expression_routine()
+                self.consume(TokenType.RBRACKET)
+                ident = ArrayAccessNode(array_name=ident, index_expr=index_expr)
+
+            if self.match(TokenType.DOT):
+                self.consume(TokenType.DOT)
+                field_ident = self.consume(TokenType.IDENTIFIER)
+                return RecordFieldAccessNode(record_obj=ident, field_name=field_ident)
+
+            if self.match(TokenType.LPAREN):
+                self.consume(TokenType.LPAREN)
+                arguments = []
+                if not self.match(TokenType.RPAREN):
+                    arguments.append((yield self.expression_routine()))
+                    while self.match(TokenType.COMMA):
+                        self.consume(TokenType.COMMA)
+                        arguments.append((yield self.expression_routine()))
+                self.consume(TokenType.RPAREN)
+                return FunctionCallNode(ident, arguments)
+
+            if isinstance(ident, str):
+                return self.leaf(identifier=ident)
+            return ident
+
+        # Литералы разбираются без вложенных правил
+        parse = self.factor_parsers.get(token_type)
+        if parse is None:
+            self.raise_error(f"Неожиданный токен {self.current_token().type_} (строка {self.current_token().line}, позиция {self.current_token().column})")
+        return parse()
@@ -0,0 +1,47 @@
+class NodeVisitor:
+    """
+    Базовый класс обходчиков AST (CodeGenerator, SemanticAnalyzer, Translator).
+
+    Подкласс задаёт visit_methods — ключ диспетчеризации -> имя своего метода.
+    Ключ по умолчанию — класс узла (dispatch_key = type); Translator, который
+    обходит словари CodeGenerator, берёт ключ из поля "type".
+    visit(node, ...) вызывает метод для ключа узла с остальными аргументами,
+    generic_visit — если метода нет.
+
+    Метод для класса узла ищется по MRO один раз (так подклассы — представления
+    AstArena, SharedFactorNode — получают метод базового класса) и кэшируется
+    в dispatch_cache подкласса обходчика: дальше каждый узел — один поиск в словаре,
+    сколько бы классов ни было в visit_methods.
+    """
+    visit_methods = {}
+    dispatch_key = type
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Свой кэш у каждого подкласса: переопределённые методы не смешиваются
+        cls.dispatch_cache = {}
+
+    def visit(self, node, *args, **kwargs):
+        key = self.dispatch_key(node)
+        method = self.dispatch_cache.get(key)
+        if method is None:
+            method = self.resolve(key)
+        return method(self, node, *args, **kwargs)
+
+    @classmethod
+    def resolve(cls, key):
+        """Метод для ключа: по visit_methods, для класса — с учётом базовых классов."""
+        for base in getattr(key, '__mro__', (key,)):
+            name = cls.visit_methods.get(base)
+            if name is not None:
+                break
+        else:
+            name = 'generic_visit'
+        method = cls.dispatch_cache[key] = getattr(cls, name)
+        return method
+
+    def generic_visit(self, node, *args, **kwargs):
+        return None
+
+
+NodeVisitor.dispatch_cache = {}
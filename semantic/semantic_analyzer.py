@@ -3,22 +3,68 @@ import re
 
 from custom_exceptions.semantic_error import SemanticError
 from semantic.symbol_table import SymbolTable
+from semantic.types import TypeRegistry, PrimitiveType, ArrayType, RecordType, FunctionType
 from parser.ast_node import *
+from parser.visitor import NodeVisitor
 from generator.codegen import CodeGenerator
 
-GLOBAL_TYPE_CHECKS = {
-    "integer": int,
-    "string": str,
-    "boolean": bool
-}
-
-class SemanticAnalyzer:
-    def __init__(self):
-        self.symbol_table = SymbolTable()
+class SemanticAnalyzer(NodeVisitor):
+    # Объявления и операторы обходятся без дополнительных аргументов,
+    # выражения — с ожидаемым типом stmt_type (см. visit_expression_node)
+    visit_methods = {
+        ConstDeclarationNode: 'visit_const_declaration',
+        TypeDeclarationNode: 'visit_type_declaration',
+        VarDeclarationNode: 'visit_var_declaration',
+        ProcedureOrFunctionDeclarationNode: 'visit_proc_or_func_declaration',
+        CompoundStatementNode: 'visit_compound_statement',
+        AssignStatementNode: 'visit_assign_statement_node',
+        ForStatementNode: 'visit_for_statement_node',
+        WhileStatementNode: 'visit_while_statement_node',
+        IfStatementNode: 'visit_if_statement_node',
+        ProcedureCallNode: 'visit_procedure_call_node',
+        ExpressionNode: 'visit_expr_node',
+        SimpleExpressionNode: 'visit_simple_expr_node',
+        TermNode: 'visit_term_node',
+        FactorNode: 'visit_factor_node',
+        ArrayAccessNode: 'visit_array_access_node',
+        FunctionCallNode: 'visit_function_call_node',
+        RecordFieldAccessNode: 'visit_record_field_access_node',
+    }
+
+    def __init__(self, interner=None, types=None):
+        # С interner (общим с лексером) таблицы символов ищут имена по id без учёта регистра
+        self.symbol_table = SymbolTable(interner=interner)
         self.code_generator = CodeGenerator()
+        # Канонические типы; объявления хранят свой тип в "type_object" записи таблицы символов
+        self.types = types if types is not None else TypeRegistry()
+        # Результаты анализа, привязанные к узлам. Сам AST анализатор не меняет,
+        # поэтому одно дерево можно анализировать повторно и из разных потоков.
+        # ArrayTypeNode переменной -> значения элементов (заданные или по умолчанию)
+        self.array_values = {}
+        # ParameterNode -> тип параметра ('array' для массивов)
+        self.parameter_types = {}
     
+    def lookup_type(self, name):
+        """Канонический тип, объявленный как name в текущей области видимости (запись или псевдоним массива)."""
+        info = self.symbol_table.lookup(name)
+        if info and info.get('type') in ('record', 'type'):
+            return info.get('type_object')
+        return None
+
+    def resolve_type(self, spec):
+        """Канонический тип описания spec; имена типов разрешаются с учётом областей видимости."""
+        return self.types.resolve(spec, self.lookup_type)
+
+    def same_type(self, first, second):
+        """Совпадение типов по каноническим объектам (см. TypeRegistry.same)."""
+        return self.types.same(first, second, self.lookup_type)
+
     def raise_error(self, message):
         raise SemanticError(message)
+
+    def generic_visit(self, node, *args, **kwargs):
+        self.raise_error(f"Неподдерживаемый тип узла: {type(node)}")
+
     def visit_program(self, node: ProgramNode):
         self.visit_block(node.children[0])
 
@@ -26,29 +72,38 @@ class SemanticAnalyzer:
         if node.declarations:
             self.visit_declarations(node.declarations)
 
-        outer_scope = self.symbol_table
-        self.symbol_table = SymbolTable(parent=outer_scope)
+        self.symbol_table = self.symbol_table.enter_scope()
         self.code_generator = self.visit_compound_statement(node.compound_statement)
+        # Область закрыта, но остаётся в self.symbol_table: её parent — таблица объявлений блока
+        self.symbol_table.exit_scope()
         block = self.code_generator
         return block
-        #self.symbol_table = outer_scope
+
+    def visit_declaration_stream(self, items):
+        """
+        Анализ программы по частям из Parser.iter_declarations(): каждое объявление
+        проверяется сразу после разбора, последним приходит главный составной оператор.
+        """
+        for item in items:
+            if isinstance(item, CompoundStatementNode):
+                self.symbol_table = self.symbol_table.enter_scope()
+                self.code_generator = self.visit_compound_statement(item)
+                self.symbol_table.exit_scope()
+            else:
+                self.visit_declarations([item])
+        return self.code_generator
 
     def visit_declarations(self, node: DeclarationNode):
         for declaration in node:
-            if isinstance(declaration, ConstDeclarationNode):
-                self.visit_const_declaration(declaration)
-            elif isinstance(declaration, TypeDeclarationNode):
-                self.visit_type_declaration(declaration)
-            elif isinstance(declaration, VarDeclarationNode):
-                self.visit_var_declaration(declaration)
-            elif isinstance(declaration, ProcedureOrFunctionDeclarationNode):
-                self.visit_proc_or_func_declaration(declaration)
+            self.visit(declaration)
 
     def create_array_info(self, node: ArrayTypeNode, declaration_place):
         """
         Эта функция проверяет, что размеры массива и его вложенности соответствуют
         указанным в декларации. Также проверяет соответствие типов данных в массиве.
+        Значения берутся из array_values, если они там есть, иначе из node.initial_values.
         """
+        initial_values = self.array_values.get(node, node.initial_values)
         type_checks = {
             "integer": int,
             "string": str,
@@ -111,10 +166,10 @@ class SemanticAnalyzer:
             size *= (upper_bound - lower_bound + 1)
 
         if declaration_place == 'const':
-            if node.initial_values is None:
+            if initial_values is None:
                 self.raise_error("В константном объявлении массива не заданы начальные значения")
 
-            total_elements = check_array_size_and_types(node.dimensions, node.initial_values)
+            total_elements = check_array_size_and_types(node.dimensions, initial_values)
             if total_elements != size:
                 self.raise_error(f"Неверный размер массива. Ожидалось {size} элементов, получено {total_elements}")
             else:
@@ -123,13 +178,13 @@ class SemanticAnalyzer:
                     "element_type": node.element_type,
                     "size": size,
                     "dimensions": node.dimensions,
-                    "initial_values": node.initial_values
+                    "initial_values": initial_values
                 }
                 # Если element_type соответствует записи, преобразуем инициализаторы в словари
                 record_type_info = self.symbol_table.lookup(node.element_type)
                 if record_type_info and record_type_info.get("type") == "record":
                     arr_info["initial_values"] = self.transform_record_array_values(
-                        node.initial_values, node.dimensions, record_type_info
+                        initial_values, node.dimensions, record_type_info
                     )
                 return arr_info
 
@@ -139,17 +194,17 @@ class SemanticAnalyzer:
                 "element_type": node.element_type,
                 "size": size,
                 "dimensions": node.dimensions,
-                "initial_values": node.initial_values
+                "initial_values": initial_values
             }
             record_type_info = self.symbol_table.lookup(node.element_type)
             if record_type_info and record_type_info.get("type") == "record":
                 # Если для массива записей заданы начальные значения, преобразуем их
-                if node.initial_values is not None:
+                if initial_values is not None:
                     arr_info["initial_values"] = self.transform_record_array_values(
-                        node.initial_values, node.dimensions, record_type_info
+                        initial_values, node.dimensions, record_type_info
                     )
-            if node.initial_values is not None:
-                total_elements = check_array_size_and_types(node.dimensions, node.initial_values)
+            if initial_values is not None:
+                total_elements = check_array_size_and_types(node.dimensions, initial_values)
                 if total_elements != size:
                     self.raise_error(f"Неверный размер массива. Ожидалось {size} элементов, получено {total_elements}")
             return arr_info
@@ -181,6 +236,7 @@ class SemanticAnalyzer:
 
         if isinstance(type_node, RecordTypeNode):
             fields = []
+            field_types = []
             for field_name, field in type_node.fields:
                 #print(field)
                 if isinstance(field, TypeNode):
@@ -191,6 +247,7 @@ class SemanticAnalyzer:
                             "field_type": field.identifier_type
                         }
                         fields.append(field_info)
+                        field_types.append((field_name, self.resolve_type(field)))
                     else:
                         # если не в symbol_table, значит не запись
                         self.raise_error(f'Неверный тип {field.identifier_type} в поле {field_name}')
@@ -203,18 +260,20 @@ class SemanticAnalyzer:
                         "arr_info": arr_info
                     }
                     fields.append(field_info)
+                    field_types.append((field_name, self.resolve_type(field)))
 
             #print(fields)
             info = {
                 "name": name,
                 "type": 'record',
-                "fields_info": fields
+                "fields_info": fields,
+                "type_object": self.types.record(name, field_types)
             }
             self.symbol_table.declare(name, info)
 
         elif isinstance(type_node, ArrayTypeNode):
             arr_info = self.create_array_info(type_node, "record")
-            info = {'info': arr_info}
+            info = {'type': 'type', 'info': arr_info, 'type_object': self.resolve_type(type_node)}
             self.symbol_table.declare(name, info)
 
     def validate_record_initializer(self, record_type_info, initializer):
@@ -334,7 +393,7 @@ class SemanticAnalyzer:
 
         info = self.look_const_type(const_value)
 
-        const_info = {"type": "const", "info": info}
+        const_info = {"type": "const", "info": info, "type_object": self.resolve_type(const_value[0])}
         self.symbol_table.declare(name, const_info)
 
     def look_const_type(self, value):
@@ -395,7 +454,7 @@ class SemanticAnalyzer:
 
         info = self.look_var_type(var_type, init_value)
 
-        var_info = {"type": "var", "info": info}
+        var_info = {"type": "var", "info": info, "type_object": self.resolve_type(var_type)}
         self.symbol_table.declare(name, var_info)
 
     def look_var_type(self, var_type, init_value):
@@ -431,14 +490,11 @@ class SemanticAnalyzer:
         elif isinstance(var_type, ArrayTypeNode):
 
             # Если init_value не задан, заполним массив дефолтными значениями
-            """
-            """
-            if var_type.initial_values is None:
-                init_value = self.fill_array_with_defaults(
+            if var_type.initial_values is None and var_type not in self.array_values:
+                self.array_values[var_type] = self.fill_array_with_defaults(
                     dimensions=var_type.dimensions,
                     element_type=var_type.element_type
                 )
-                var_type.initial_values = init_value
             # Вызываем create_array_info
             info = self.create_array_info(var_type, declaration_place="var")
             return info
@@ -579,93 +635,55 @@ class SemanticAnalyzer:
 
     def visit_compound_statement(self, node: CompoundStatementNode):
         """Обход составного оператора (Compound Statement)"""
-        generated_statements = []
-        for statement_node in node.statements:
-            if isinstance(statement_node, AssignStatementNode):
-                generated_statements.append(self.visit_assign_statement_node(statement_node))
-            elif isinstance(statement_node, ForStatementNode):
-                generated_statements.append(self.visit_for_statement_node(statement_node))
-            elif isinstance(statement_node, WhileStatementNode):
-                generated_statements.append(self.visit_while_statement_node(statement_node))
-            elif isinstance(statement_node, IfStatementNode):
-                generated_statements.append(self.visit_if_statement_node(statement_node))
-            elif isinstance(statement_node, ProcedureCallNode):
-                generated_statements.append(self.visit_procedure_call_node(statement_node))
-
+        generated_statements = [self.visit(statement_node) for statement_node in node.statements]
         return {"type": "block", "statements": generated_statements}
 
     def visit_expression_node(self, node, stmt_type=None):
         """
-        Обходит выражение и выполняет семантическую проверку.
-
-        Если node является ExpressionNode, то проверяются реляционные операторы.
-        Если node — FactorNode или SimpleExpressionNode, то вызывается соответствующий метод.
+        Обходит выражение и выполняет семантическую проверку: вызывает visit-метод
+        класса узла (ExpressionNode, FactorNode, SimpleExpressionNode, ...) с ожидаемым типом.
         """
-        # Если node является ExpressionNode, обрабатываем его отдельно.
-        if isinstance(node, ExpressionNode):
-            # Если в узле присутствует реляционный оператор, результат считается boolean.
-            if getattr(node, "relational_operator", None):
-                left_type = self.get_expression_type(node.left)
-                right_type = self.get_expression_type(node.right)
-                if left_type != right_type:
-                    self.raise_error(
-                        f"Ошибка типов: {left_type} != {right_type} в сравнении {node.relational_operator}"
-                    )
-                # Обходим подвыражения без ожидания конкретного типа.
-                self.visit_expression_node(node.left, None)
-                self.visit_expression_node(node.right, None)
-                result = self.code_generator.generate(node)
-                # Если сверху ожидался не boolean, сообщаем об ошибке.
-                if stmt_type is not None and stmt_type != "boolean":
-                    self.raise_error(
-                        f"Ошибка типов: ожидаемый тип {stmt_type}, но выражение возвращает boolean"
-                    )
-                return result
-            else:
-                # Если реляционного оператора нет, обрабатываем левую часть.
-                # Здесь предполагается, что node.left является либо FactorNode, либо SimpleExpressionNode.
-                return self.visit_expression_node(node.left, stmt_type)
-
-        # Если node уже является FactorNode, передаем его в visit_factor_node.
-        elif isinstance(node, FactorNode):
-            return self.visit_factor_node(node, stmt_type)
-
-        # Если node является SimpleExpressionNode, передаем его в visit_simple_expr_node.
-        elif isinstance(node, SimpleExpressionNode):
-            return self.visit_simple_expr_node(node, stmt_type)
-
-        elif isinstance(node, ArrayAccessNode):
-            return self.visit_array_access_node(node, stmt_type)
-        elif isinstance(node, FunctionCallNode):
-            return self.visit_function_call_node(node)
-        elif isinstance(node, RecordFieldAccessNode):
-            return self.visit_record_field_access_node(node)
-        else:
-            self.raise_error(f"Неподдерживаемый тип узла в  visit_expression_node: {type(node)}")
+        return self.visit(node, stmt_type)
+
+    def visit_expr_node(self, node: ExpressionNode, stmt_type=None):
+        """Обход ExpressionNode: если есть реляционный оператор, результат считается boolean."""
+        if getattr(node, "relational_operator", None):
+            left_type = self.get_expression_type(node.left)
+            right_type = self.get_expression_type(node.right)
+            if not self.same_type(left_type, right_type):
+                self.raise_error(
+                    f"Ошибка типов: {left_type} != {right_type} в сравнении {node.relational_operator}"
+                )
+            # Обходим подвыражения без ожидания конкретного типа.
+            self.visit_expression_node(node.left, None)
+            self.visit_expression_node(node.right, None)
+            result = self.code_generator.generate(node)
+            # Если сверху ожидался не boolean, сообщаем об ошибке.
+            if stmt_type is not None and not self.same_type(stmt_type, "boolean"):
+                self.raise_error(
+                    f"Ошибка типов: ожидаемый тип {stmt_type}, но выражение возвращает boolean"
+                )
+            return result
+        # Если реляционного оператора нет, обрабатываем левую часть.
+        return self.visit_expression_node(node.left, stmt_type)
 
     def visit_simple_expr_node(self, node: SimpleExpressionNode, stmt_type):
         """Обход простого выражения (например, a + b)"""
         print("Проверяем простое выражение:", node.to_dict())
+        self.visit_operands(node.terms, stmt_type)
+        return self.code_generator.generate(node)
 
-        for i, term in enumerate(node.terms):
-            if isinstance(term, FactorNode):
-                self.visit_factor_node(term, stmt_type)
-            elif term in {"+", "-", "or", "*", "div", "mod", "and"}:
-                continue  # Это оператор, его проверять не нужно
-            elif isinstance(term, SimpleExpressionNode):
-                self.visit_simple_expr_node(term, stmt_type)
-            elif isinstance(term, TermNode):
-                self.visit_term_node(term, stmt_type)
-            elif isinstance(term, ArrayAccessNode):
-                self.visit_array_access_node(term, stmt_type)
-            elif isinstance(term, RecordFieldAccessNode):
-                self.visit_record_field_access_node(term, stmt_type)
-            else:
-                print(type(term))
-                self.raise_error(f"Некорректный элемент в terms: {term}")
-
+    def visit_term_node(self, node: TermNode, stmt_type):
+        """Обход терма (например, a * b)"""
+        self.visit_operands(node.factors, stmt_type)
         return self.code_generator.generate(node)
 
+    def visit_operands(self, items, stmt_type):
+        """Обход операндов n-арной цепочки [операнд, оператор, операнд, ...]"""
+        # На нечётных местах — операторы, их проверять не нужно
+        for term in items[::2]:
+            self.visit(term, stmt_type)
+
     def visit_factor_node(self, node: FactorNode, stmt_type):
         """Обход отдельных факторов (чисел, переменных, подвыражений)"""
         print("Проверяем фактор:", node.to_dict())
@@ -682,19 +700,14 @@ class SemanticAnalyzer:
             var_info = self.symbol_table.lookup(node.identifier)
             if not var_info:
                 self.raise_error(f"Ошибка: переменная {node.identifier} не объявлена")
-            var_type = var_info.get('info', {}).get('type')
-            print('inf',var_info)
-            if var_info.get('kind') == 'parameter':
-                var_type = var_info.get('type')
+            var_type = var_info.get('type_object')
+            if var_type is None:
+                # Тип не из реестра (например, массив из real) — сравниваем по записи таблицы символов
+                var_type = var_info.get('type') if var_info.get('kind') == 'parameter' else var_info.get('info', {}).get('type')
             print("Тип переменной:", var_info)
             # Only check if an expected type was given
-            if stmt_type is not None and str(var_type) != str(stmt_type):
-                if var_type != 'record':
-                    self.raise_error(f"Ошибка типов: {var_type} != {stmt_type} для {node.identifier}")
-                elif var_type == 'record':
-                    var_type = var_info.get('info', {}).get('record_type')
-                    if stmt_type is not None and var_type != stmt_type:
-                        self.raise_error(f"Ошибка типов: {var_type} != {stmt_type} для {node.identifier}")
+            if stmt_type is not None and not self.same_type(var_type, stmt_type):
+                self.raise_error(f"Ошибка типов: {var_type} != {stmt_type} для {node.identifier}")
             print(self.code_generator)
             return self.code_generator.generate(node)
 
@@ -726,22 +739,27 @@ class SemanticAnalyzer:
             func_info = self.symbol_table.lookup(node.identifier)
             if not func_info:
                 self.raise_error(f"Ошибка: функция '{node.identifier}' не объявлена")
+            function_type = func_info.get('type_object')
+            if isinstance(function_type, FunctionType) and function_type.return_type is not None:
+                return function_type.return_type
             return func_info.get('return_type')
         elif isinstance(node, ExpressionNode):
             if node.relational_operator:
                 left_type = self.get_expression_type(node.left, detailed)
 
                 right_type = self.get_expression_type(node.right, detailed)
-                if left_type != right_type:
+                if not self.same_type(left_type, right_type):
                     self.raise_error(
                         f"Ошибка типов: {left_type} != {right_type} в сравнении {node.relational_operator}"
                     )
-                return "boolean"
+                return self.types.primitive("boolean")
             else:
                 if isinstance(node.left, FactorNode):
                     return self.get_factor_type(node.left, detailed)
                 elif isinstance(node.left, SimpleExpressionNode):
                     return self.get_simple_expr_type(node.left)
+                elif isinstance(node.left, TermNode):
+                    return self.get_term_type(node.left)
                 elif isinstance(node.left, ArrayAccessNode):
                     return self.get_array_access_type(node.left)
                 else:
@@ -749,7 +767,9 @@ class SemanticAnalyzer:
         elif isinstance(node, FactorNode):
             return self.get_factor_type(node, detailed)
         elif isinstance(node, SimpleExpressionNode):
-            return self.get_simple_expr_type(node, detailed)
+            return self.get_simple_expr_type(node)
+        elif isinstance(node, TermNode):
+            return self.get_term_type(node)
         elif isinstance(node, ArrayAccessNode):
             return self.get_array_access_type(node)
         return None
@@ -759,18 +779,31 @@ class SemanticAnalyzer:
         if node.identifier:
             var_info = self.symbol_table.lookup(node.identifier)
             if not detailed:
+                if not var_info:
+                    return None
+                if var_info.get('type_object') is not None:
+                    return var_info['type_object']
+                # Тип вне реестра (например, массив из real) — метка записи таблицы символов
                 if var_info.get('kind') == 'parameter':
                     return str(var_info.get('type'))
-                return var_info.get('info', {}).get('type') if var_info else None
+                return var_info.get('info', {}).get('type')
             else:
                 return var_info.get('info', {})
         elif node.value is not None:
-            return self.get_python_type_name(node.value)
+            type_name = self.get_python_type_name(node.value)
+            return self.types.primitive(type_name) or type_name
         return None
 
     def get_simple_expr_type(self, node: SimpleExpressionNode):
         """Определяет тип простого выражения (например, a + b)"""
-        first_term = node.terms[0]
+        return self.get_operand_type(node.terms[0])
+
+    def get_term_type(self, node: TermNode):
+        """Определяет тип терма (например, a * b) по первому множителю"""
+        return self.get_operand_type(node.factors[0])
+
+    def get_operand_type(self, first_term):
+        """Тип n-арной цепочки операторов — тип её первого операнда"""
         if isinstance(first_term, FactorNode):
             return self.get_factor_type(first_term)
         elif isinstance(first_term, ArrayAccessNode):
@@ -795,8 +828,14 @@ class SemanticAnalyzer:
 
         # Можно также добавить проверку количества индексов и границ,
         # но для определения типа достаточно вернуть тип элемента
-        element_type = array_info['info'].get('element_type')
-        return element_type
+        return self.get_array_element_type(array_info)
+
+    def get_array_element_type(self, array_info):
+        """Тип элементов массива: канонический, если массив в реестре, иначе имя из info."""
+        array_type = array_info.get('type_object')
+        if isinstance(array_type, ArrayType):
+            return array_type.element
+        return array_info['info'].get('element_type')
 
     def flatten_array_access(self, node: ArrayAccessNode):
         """
@@ -845,7 +884,7 @@ class SemanticAnalyzer:
 
                     # Получаем тип выражения справа
                     expr_type = self.get_expression_type(node.expression)
-                    if expr_type != 'array':
+                    if not isinstance(expr_type, ArrayType) and expr_type != 'array':
                         self.raise_error(
                             f"Ошибка: массиву нельзя присвоить значение типа {expr_type}"
                         )
@@ -856,7 +895,7 @@ class SemanticAnalyzer:
                     other_element_type = other_array.get('info', {}).get('element_type')
 
                     # Проверяем совпадение типов элементов
-                    if element_type != other_element_type:
+                    if not self.same_type(element_type, other_element_type):
                         self.raise_error(
                             f"Ошибка: несовпадение типов элементов массивов ({element_type} != {other_element_type})"
                         )
@@ -864,6 +903,9 @@ class SemanticAnalyzer:
                     if stmt_info.get('dimensions') != other_array.get('info', {}).get('dimensions'):
                         self.raise_error("Ошибка: несовпадение размерностей массивов")
 
+                # Массив и запись проверяются по своему каноническому типу, а не по метке 'array'/'record'
+                if stmt_type is not None:
+                    stmt_type = stmt.get('type_object') or stmt_type
                 self.visit_expression_node(node.expression, stmt_type)
                 return self.code_generator.generate(node)
             else:
@@ -895,13 +937,13 @@ class SemanticAnalyzer:
                     )
 
             # Получаем тип элемента массива, которому присваиваем
-            element_type = array_info['info'].get('element_type')
+            element_type = self.get_array_element_type(array_info)
 
             # Получаем тип выражения справа
             expr_type = self.get_expression_type(node.expression)
             print(f"Debug: array element type = {element_type}, expression type = {expr_type}")
 
-            if element_type != expr_type:
+            if not self.same_type(element_type, expr_type):
                 self.raise_error(
                     f"Ошибка типов: нельзя присвоить значение типа {expr_type} элементу типа {element_type}"
                 )
@@ -977,34 +1019,18 @@ class SemanticAnalyzer:
         else:self.raise_error(f"Ошибка: не удалось вычислить индексное выражение: {expr}")
 
     def visit_record_field_access_node(self, node: RecordFieldAccessNode, stmt_type=None):
-        """Обход обращения к полю записи (Record Field Access) с учетом структуры таблицы символов."""
+        """Обход обращения к полю записи: тип записи берётся из канонического типа объекта."""
         print("Проверяем доступ к полю записи:", node)
 
-        # Determine the record definition based on the type of node.record_obj.
+        # Determine the record type based on the type of node.record_obj.
         if isinstance(node.record_obj, str):
             # Если record_obj – это простой идентификатор.
             var_info = self.symbol_table.lookup(node.record_obj)
             if not var_info:
                 self.raise_error(f"Ошибка: переменная/запись '{node.record_obj}' не объявлена")
-            # Из переменной получаем имя типа записи.
-            record_type = var_info.get("info", {}).get("record_type")
-            if var_info.get('kind') == 'parameter':
-                record_type = str(var_info.get('type'))
-            if not record_type:
+            record = var_info.get("type_object")
+            if not isinstance(record, RecordType):
                 self.raise_error(f"Ошибка: переменная '{node.record_obj}' не является записью")
-            # Ищем определение записи по record_type.
-            print(record_type)
-
-            record_def = self.symbol_table.lookup(record_type)
-
-            if not record_def or record_def.get("type") != "record":
-                self.raise_error(f"Ошибка: '{record_type}' не является корректной записью")
-            # Извлекаем информацию о полях.
-            fields = record_def.get("fields_info", [])
-            field_entry = next((f for f in fields if f["field_name"] == node.field_name), None)
-            if not field_entry:
-                self.raise_error(f"Ошибка: поле '{node.field_name}' отсутствует в записи '{record_type}'")
-            field_type = field_entry["field_type"]
 
         elif isinstance(node.record_obj, ArrayAccessNode):
             # Если record_obj – это обращение к элементу массива, предполагаем, что тип элемента – запись.
@@ -1013,42 +1039,30 @@ class SemanticAnalyzer:
             array_info = self.symbol_table.lookup(base_array_name)
             if not array_info:
                 self.raise_error(f"Ошибка: массив '{base_array_name}' не объявлен")
-            if array_info.get("info", {}).get("type") != "array":
+            array = array_info.get("type_object")
+            if not isinstance(array, ArrayType):
                 self.raise_error(f"Ошибка: '{base_array_name}' не является массивом")
-            element_type = array_info.get("info", {}).get("element_type")
-            if not element_type:
-                self.raise_error(f"Ошибка: тип элемента массива '{base_array_name}' не указан")
-            record_def = self.symbol_table.lookup(element_type)
-            if not record_def or record_def.get("type") != "record":
+            record = array.element
+            if not isinstance(record, RecordType):
                 self.raise_error(f"Ошибка: элемент массива '{base_array_name}' не является записью")
-            fields = record_def.get("fields_info", [])
-            field_entry = next((f for f in fields if f["field_name"] == node.field_name), None)
-            if not field_entry:
-                self.raise_error(f"Ошибка: поле '{node.field_name}' отсутствует в записи '{element_type}'")
-            field_type = field_entry["field_type"]
 
         elif isinstance(node.record_obj, RecordFieldAccessNode):
             # Если record_obj – это вложенное обращение к полю записи, обрабатываем рекурсивно.
-            print(type(node.record_obj))
-            inner_field_type = self.get_record_field_type(node.record_obj)
-            print(inner_field_type)
-            if not inner_field_type:
-                #self.visit_record_field_access_node(node.record_obj)
+            record = self.get_record_field_type(node.record_obj)
+            if record is None:
                 self.raise_error(f"Ошибка: не удалось определить тип вложенной записи в {node.record_obj}")
-            record_def = self.symbol_table.lookup(inner_field_type)
-            if not record_def or record_def.get("type") != "record":
+            if not isinstance(record, RecordType):
                 self.raise_error(f"Ошибка: {node.record_obj} не является записью")
-            fields = record_def.get("fields_info", [])
-            field_entry = next((f for f in fields if f["field_name"] == node.field_name), None)
-            if not field_entry:
-                self.raise_error(f"Ошибка: поле '{node.field_name}' отсутствует в записи {node.record_obj}")
-            field_type = field_entry["field_type"]
 
         else:
             self.raise_error("Ошибка: неверный тип объекта записи при обращении к полю")
 
+        if node.field_name not in record.field_types:
+            self.raise_error(f"Ошибка: поле '{node.field_name}' отсутствует в записи '{record}'")
+        field_type = record.field_types[node.field_name]
+
         # Если задан ожидаемый тип (например, в контексте присваивания), проверяем соответствие.
-        if stmt_type and field_type != stmt_type:
+        if stmt_type and not self.same_type(field_type, stmt_type):
             self.raise_error(
                 f"Ошибка типов: ожидаемый тип '{stmt_type}', а получен '{field_type}' для поля '{node.field_name}'"
             )
@@ -1058,57 +1072,25 @@ class SemanticAnalyzer:
 
     def get_record_field_type(self, node: RecordFieldAccessNode):
         """
-        Вспомогательная функция, которая определяет тип поля записи.
+        Вспомогательная функция, которая определяет канонический тип поля записи.
         Например, для выражения person.address.street возвращает тип поля 'street',
         если 'address' является полем типа записи в 'person'.
         """
-        print("node", node.record_obj)
         if isinstance(node.record_obj, str):
             var_info = self.symbol_table.lookup(node.record_obj)
-
-            if not var_info:
-                return None
-            record_type = var_info.get("info", {}).get("record_type")
-            if var_info.get('kind') == 'parameter':
-                record_type = str(var_info.get('type'))
-            if not record_type:
-                return None
-            record_def = self.symbol_table.lookup(record_type)
-            if not record_def or record_def.get("type") != "record":
-                return None
-            fields = record_def.get("fields_info", [])
-            field_entry = next((f for f in fields if f["field_name"] == node.field_name), None)
-            return field_entry["field_type"] if field_entry else None
-
+            record = var_info.get("type_object") if var_info else None
         elif isinstance(node.record_obj, RecordFieldAccessNode):
-
-            inner_field_type = self.get_record_field_type(node.record_obj)
-            if not inner_field_type:
-                return None
-            record_def = self.symbol_table.lookup(inner_field_type)
-            if not record_def or record_def.get("type") != "record":
-                return None
-            fields = record_def.get("fields_info", [])
-            field_entry = next((f for f in fields if f["field_name"] == node.field_name), None)
-            return field_entry["field_type"] if field_entry else None
-
+            record = self.get_record_field_type(node.record_obj)
         elif isinstance(node.record_obj, ArrayAccessNode):
             base_array_name, indices = self.flatten_array_access(node.record_obj)
             array_info = self.symbol_table.lookup(base_array_name)
-            if not array_info:
-                return None
-            if array_info.get("info", {}).get("type") != "array":
-                return None
-            element_type = array_info.get("info", {}).get("element_type")
-            record_def = self.symbol_table.lookup(element_type)
-            if not record_def or record_def.get("type") != "record":
-                return None
-            fields = record_def.get("fields_info", [])
-            field_entry = next((f for f in fields if f["field_name"] == node.field_name), None)
-            return field_entry["field_type"] if field_entry else None
-
+            array = array_info.get("type_object") if array_info else None
+            record = array.element if isinstance(array, ArrayType) else None
         else:
             return None
+        if not isinstance(record, RecordType):
+            return None
+        return record.field_types.get(node.field_name)
 
     def visit_for_statement_node(self, node: ForStatementNode):
         """
@@ -1129,19 +1111,19 @@ class SemanticAnalyzer:
 
         # Verify that the loop variable is of type integer.
         var_type = var_info.get("info", {}).get("type")
-        if var_type != "integer":
+        if not self.same_type(var_type, "integer"):
             self.raise_error(f"Ошибка: переменная цикла '{loop_var}' должна быть типа integer, а не {var_type}")
 
         # Check that the start expression evaluates to an integer.
         start_type = self.get_expression_type(node.start_expr)
-        if start_type != "integer":
+        if not self.same_type(start_type, "integer"):
             self.raise_error(f"Ошибка: начальное значение цикла FOR должно быть целого типа, получено {start_type}")
         # Visit the start expression.
         self.visit_expression_node(node.start_expr, "integer")
 
         # Check that the end expression evaluates to an integer.
         end_type = self.get_expression_type(node.end_expr)
-        if end_type != "integer":
+        if not self.same_type(end_type, "integer"):
             self.raise_error(f"Ошибка: конечное значение цикла FOR должно быть целого типа, получено {end_type}")
         # Visit the end expression.
         self.visit_expression_node(node.end_expr, "integer")
@@ -1169,7 +1151,7 @@ class SemanticAnalyzer:
         """
         # Определяем тип выражения условия.
         cond_type = self.get_expression_type(node.condition)
-        if cond_type != "boolean":
+        if not self.same_type(cond_type, "boolean"):
             self.raise_error(f"Ошибка: условие WHILE должно быть булевого типа, получено {cond_type}")
 
         # Посещаем условие с ожидаемым типом "boolean"
@@ -1191,7 +1173,7 @@ class SemanticAnalyzer:
         """
         # Проверяем тип условия
         cond_type = self.get_expression_type(node.condition)
-        if cond_type != "boolean":
+        if not self.same_type(cond_type, "boolean"):
             self.raise_error(f"Ошибка: условие IF должно быть булевого типа, получено {cond_type}")
 
         # Посещаем условие с ожидаемым типом "boolean"
@@ -1224,33 +1206,22 @@ class SemanticAnalyzer:
             self.raise_error(
                 f"Ошибка: процедура '{node.identifier}' ожидает {len(expected_params)} аргументов, получено {len(node.arguments)}")
 
-        for param, arg in zip(expected_params, node.arguments):
-            expected_type = param['type']
+        # Аргументы сверяются с каноническими типами параметров; массив совпадает
+        # с параметром только при тех же типе элементов и границах
+        parameter_types = proc_info['type_object'].parameters
+        for param, param_type, arg in zip(expected_params, parameter_types, node.arguments):
+            expected_type = param_type if param_type is not None else param['type']
             print('arg',arg)
             print(param)
             print(expected_type)
-
-            if isinstance(expected_type, ArrayTypeNode):
-                arg_type = self.get_expression_type(arg, True)
-                dim = expected_type.dimensions
-                elem_type = expected_type.element_type
-                if dim != arg_type['dimensions']:
-                    self.raise_error (
-                        f'Ошибка размерностей {dim} != {arg_type["dimensions"]}'
-                    )
-                if elem_type != arg_type['element_type']:
-                    self.raise_error(
-                        f'Ошибка типов {elem_type} != { arg_type["element_type"]}'
-                    )
-                return self.code_generator.generate(node)
             arg_type = self.get_expression_type(arg)
-            if arg_type != expected_type:
+            if not self.same_type(arg_type, expected_type):
                 self.raise_error(
                     f"Ошибка типов в вызове процедуры '{node.identifier}': для параметра '{param['name']}' ожидается {expected_type}, получено {arg_type}")
         return self.code_generator.generate(node)
 
     # Обработка вызова функции
-    def visit_function_call_node(self, node: FunctionCallNode):
+    def visit_function_call_node(self, node: FunctionCallNode, stmt_type=None):
         """
         Обрабатывает вызов функции.
         Проверяет, что функция объявлена, число и типы аргументов соответствуют параметрам,
@@ -1267,11 +1238,12 @@ class SemanticAnalyzer:
             self.raise_error(
                 f"Ошибка: функция '{node.identifier}' ожидает {len(expected_params)} аргументов, получено {len(node.arguments)}")
 
-        for param, arg in zip(expected_params, node.arguments):
+        parameter_types = func_info['type_object'].parameters
+        for param, param_type, arg in zip(expected_params, parameter_types, node.arguments):
             print(param)
-            expected_type = param['type']
+            expected_type = param_type if param_type is not None else param['type']
             arg_type = self.get_expression_type(arg)
-            if str(arg_type).lower().strip() != str(expected_type).lower().strip():
+            if not self.same_type(arg_type, expected_type):
                 self.raise_error(
                     f"Ошибка типов в вызове функции '{node.identifier}': для параметра '{param['name']}' ожидается {expected_type}, получено {arg_type}")
         # Генерация кода для вызова функции. Можно также вернуть ожидаемый тип.
@@ -1317,18 +1289,25 @@ class SemanticAnalyzer:
         }
 
         # Обработка параметров (предполагается, что у каждого параметра есть identifier и param_type)
+        array_infos = {}
+        param_types = {}
         if node.parameters:
             for param in node.parameters:
-
-                if isinstance(param.type_node, ArrayTypeNode):
-                    array_info = self.create_array_info(param.type_node, 'var')
-                    param.type_node = 'array'
+                param_type = param.type_node
+                param_types[param] = self.resolve_type(param_type)
+                if isinstance(param_type, ArrayTypeNode):
+                    array_infos[param] = self.create_array_info(param_type, 'var')
+                    param_type = 'array'
+                self.parameter_types[param] = param_type
 
                 proc_info["parameters"].append({
                     "name": param.identifier,
-                    "type": param.type_node
+                    "type": param_type
                 })
 
+        proc_info["type_object"] = self.types.function(
+            node.kind, param_types.values(), self.resolve_type(node.return_type))
+
         # Регистрируем объявление в глобальной таблице символов
         self.symbol_table.declare(node.identifier, proc_info)
 
@@ -1337,16 +1316,18 @@ class SemanticAnalyzer:
         old_code_generator = self.code_generator
 
         # Создаем новые (локальные) объекты для обработки тела функции/процедуры
-        local_symbol_table = SymbolTable(parent=old_symbol_table)
+        local_symbol_table = old_symbol_table.enter_scope()
         local_code_generator = CodeGenerator()
 
         # Добавляем параметры в локальную таблицу
         if node.parameters:
             for param in node.parameters:
-                if param.type_node == 'array':
-                    local_symbol_table.declare(param.identifier, {"kind": "parameter", "info": array_info})
+                if param in array_infos:
+                    local_symbol_table.declare(param.identifier, {
+                        "kind": "parameter", "info": array_infos[param], "type_object": param_types[param]})
                 else:
-                    local_symbol_table.declare(param.identifier, {"kind": "parameter", "type": param.type_node})
+                    local_symbol_table.declare(param.identifier, {
+                        "kind": "parameter", "type": self.parameter_types[param], "type_object": param_types[param]})
 
 
         # Переключаемся на локальные объекты
@@ -1362,6 +1343,7 @@ class SemanticAnalyzer:
         proc_info["local_symbol_table"] = local_symbol_table
 
         # Возвращаемся к исходным (глобальным) объектам
+        local_symbol_table.exit_scope()
         self.symbol_table = old_symbol_table
         self.code_generator = old_code_generator
 
@@ -1378,13 +1360,6 @@ class SemanticAnalyzer:
             return "boolean"
         return "unknown"
     def map_type(self, stmt_type):
-        """Сопоставляет строковое представление типа с Python-типом"""
-        mapping = {
-            "integer": int,
-            "string": str,
-            "boolean": bool,
-            "char": str,
-        }
-        return mapping.get(stmt_type, object)
-
-
+        """Сопоставляет тип (имя или канонический тип) с Python-типом значений"""
+        resolved = self.resolve_type(stmt_type)
+        return resolved.python_type if isinstance(resolved, PrimitiveType) else object
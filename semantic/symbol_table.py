@@ -1,17 +1,103 @@
 class SymbolTable:
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, interner=None):
+        """
+        Если задан interner (lexer.interner.Interner), ключи таблицы — id имён:
+        поиск не зависит от регистра, а объявлять и искать можно как по имени,
+        так и по id. Дочерние таблицы наследуют interner родителя.
+
+        Таблицы одной цепочки (корень и все его потомки) делят общий индекс
+        bindings: ключ -> стек информации о символе из открытых областей видимости,
+        внутренняя — последней. Вложенная область открывается enter_scope()
+        и закрывается exit_scope(), который снимает её объявления со стеков
+        по журналу undo_log. Поэтому lookup в самой внутренней открытой области —
+        один поиск в словаре, независимо от глубины вложенности. В остальных
+        таблицах (внешних и закрытых) lookup идёт по цепочке parent.
+
+        Таблица, созданная напрямую с parent, в индекс не входит (ищет по цепочке);
+        вложенные области анализа создаются через enter_scope().
+        """
         self.symbols = {}
+        self.names = {}
         self.parent = parent
+        if interner is None and parent is not None:
+            interner = parent.interner
+        self.interner = interner
+        # Ключи, положенные этой областью в bindings, — снимаются в exit_scope()
+        self.undo_log = []
+        if parent is None:
+            self.bindings = {}
+            self.scopes = [self]
+        else:
+            self.bindings = parent.bindings
+            self.scopes = parent.scopes
+        self.is_open = parent is None
+
+    def _key(self, name, create=False):
+        if self.interner is None or not isinstance(name, str):
+            return name
+        # У Symbol из лексера id уже вычислен
+        id_ = getattr(name, 'id', None)
+        if id_ is not None:
+            return id_
+        if create:
+            return self.interner.intern(name).id
+        return self.interner.lookup(name)
+
+    def enter_scope(self):
+        """Открывает и возвращает вложенную область; таблица должна быть самой внутренней открытой."""
+        if self.scopes[-1] is not self:
+            raise Exception("Nested scope can only be entered from the innermost open scope.")
+        scope = SymbolTable(parent=self)
+        scope.is_open = True
+        self.scopes.append(scope)
+        return scope
+
+    def exit_scope(self):
+        """Закрывает самую внутреннюю открытую область и возвращает родительскую таблицу."""
+        if self.parent is None or self.scopes[-1] is not self:
+            raise Exception("Only the innermost nested scope can be exited.")
+        bindings = self.bindings
+        for key in self.undo_log:
+            stack = bindings[key]
+            stack.pop()
+            if not stack:
+                del bindings[key]
+        self.undo_log = []
+        self.is_open = False
+        self.scopes.pop()
+        return self.parent
 
     def declare(self, name, info):
-        if name in self.symbols:
+        key = self._key(name, create=True)
+        if key in self.symbols:
             raise Exception(f"Duplicate identifier '{name}' in the same scope.")
-        self.symbols[name] = info
+        self.symbols[key] = info
+        if self.interner is not None:
+            self.names[key] = self.interner.key(key) if isinstance(name, int) else name
+        if self.is_open:
+            stack = self.bindings.setdefault(key, [])
+            if self.scopes[-1] is self:
+                stack.append(info)
+            else:
+                # Во внешней открытой области объявление встаёт под объявления вложенных
+                deeper = sum(key in scope.symbols for scope in self.scopes[self.scopes.index(self) + 1:])
+                stack.insert(len(stack) - deeper, info)
+            self.undo_log.append(key)
 
     def lookup(self, name):
-        if name in self.symbols:
-            return self.symbols[name]
-        elif self.parent is not None:
-            return self.parent.lookup(name)
-        else:
-            return None
+        key = self._key(name)
+        if self.scopes[-1] is self:
+            stack = self.bindings.get(key)
+            return stack[-1] if stack else None
+        table = self
+        while table is not None:
+            if key in table.symbols:
+                return table.symbols[key]
+            table = table.parent
+        return None
+
+    def items(self):
+        """Пары (имя, информация) этой области видимости."""
+        if self.interner is None:
+            return self.symbols.items()
+        return [(self.names[key], info) for key, info in self.symbols.items()]
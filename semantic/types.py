@@ -0,0 +1,153 @@
+from parser.ast_node import ArrayTypeNode, TypeNode
+
+
+class Type:
+    """
+    Канонический тип. Объекты неизменяемы и создаются только через TypeRegistry,
+    который возвращает один и тот же объект для одинаковых типов, поэтому типы
+    сравниваются по идентичности (is). name — каноническое имя типа.
+
+    repr — имя в кавычках: str(info) символа остаётся литералом Python,
+    который Translator._parse_info разбирает; сам объект Translator берёт
+    из записи таблицы символов.
+    """
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        object.__setattr__(self, 'name', name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} неизменяем")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} неизменяем")
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return repr(self.name)
+
+
+class PrimitiveType(Type):
+    """Базовый тип: integer, string, boolean, char; python_type — тип значений в AST."""
+    __slots__ = ('python_type',)
+
+    def __init__(self, name, python_type):
+        super().__init__(name)
+        object.__setattr__(self, 'python_type', python_type)
+
+
+class ArrayType(Type):
+    """Массив: element — тип элементов, dimensions — кортеж пар границ, size — число элементов."""
+    __slots__ = ('element', 'dimensions', 'size')
+
+    def __init__(self, element, dimensions):
+        bounds = ", ".join(f"{lower}..{upper}" for lower, upper in dimensions)
+        super().__init__(f"array[{bounds}] of {element}")
+        size = 1
+        for lower, upper in dimensions:
+            size *= upper - lower + 1
+        object.__setattr__(self, 'element', element)
+        object.__setattr__(self, 'dimensions', dimensions)
+        object.__setattr__(self, 'size', size)
+
+
+class RecordType(Type):
+    """Запись: fields — кортеж пар (имя поля, тип), field_types — те же пары словарём."""
+    __slots__ = ('fields', 'field_types')
+
+    def __init__(self, name, fields):
+        super().__init__(name)
+        object.__setattr__(self, 'fields', fields)
+        object.__setattr__(self, 'field_types', dict(fields))
+
+
+class FunctionType(Type):
+    """Процедура или функция: kind, кортеж типов параметров и тип результата (None у процедуры)."""
+    __slots__ = ('kind', 'parameters', 'return_type')
+
+    def __init__(self, kind, parameters, return_type):
+        signature = f"{kind}({', '.join(map(str, parameters))})"
+        super().__init__(f"{signature}: {return_type}" if return_type is not None else signature)
+        object.__setattr__(self, 'kind', kind)
+        object.__setattr__(self, 'parameters', parameters)
+        object.__setattr__(self, 'return_type', return_type)
+
+
+PRIMITIVE_TYPES = {
+    "integer": int,
+    "string": str,
+    "boolean": bool,
+    "char": str,
+}
+
+
+class TypeRegistry:
+    """
+    Реестр канонических типов анализа. Конструкторы (array, record, function)
+    возвращают уже созданный объект, если такой тип был, так что метаданные
+    массива и записи вычисляются один раз на тип.
+
+    Реестр не знает областей видимости: имена записей и псевдонимов типов
+    разрешает переданная в resolve функция lookup (у SemanticAnalyzer — поиск
+    в текущей таблице символов). Сам реестр по имени находит только базовые типы.
+    """
+
+    def __init__(self):
+        self.types = {}
+        self.primitives = {name: self._intern(('primitive', name), PrimitiveType, name, python_type)
+                           for name, python_type in PRIMITIVE_TYPES.items()}
+
+    def _intern(self, key, type_class, *args):
+        canonical = self.types.get(key)
+        if canonical is None:
+            canonical = self.types[key] = type_class(*args)
+        return canonical
+
+    def primitive(self, name):
+        """Базовый тип по имени (без учёта регистра); None, если это не базовый тип."""
+        return self.primitives.get(str(name).strip().lower())
+
+    def array(self, element, dimensions):
+        dimensions = tuple((lower, upper) for lower, upper in dimensions)
+        return self._intern(('array', element, dimensions), ArrayType, element, dimensions)
+
+    def record(self, name, fields):
+        """Запись name с полями fields (пары имя -> тип)."""
+        fields = tuple((str(field_name), field_type) for field_name, field_type in fields)
+        return self._intern(('record', str(name), fields), RecordType, str(name), fields)
+
+    def function(self, kind, parameters, return_type=None):
+        parameters = tuple(parameters)
+        return self._intern(('function', kind, parameters, return_type), FunctionType, kind, parameters, return_type)
+
+    def resolve(self, spec, lookup=None):
+        """
+        Канонический тип для описания типа из AST или таблицы символов: имени,
+        TypeNode, ArrayTypeNode или уже канонического типа. Имя, не являющееся
+        базовым типом, разрешается через lookup(name). None, если тип неизвестен.
+        """
+        if spec is None or isinstance(spec, Type):
+            return spec
+        if isinstance(spec, TypeNode):
+            return self.resolve(spec.identifier_type, lookup)
+        if isinstance(spec, ArrayTypeNode):
+            element = self.resolve(spec.element_type, lookup)
+            return self.array(element, spec.dimensions) if element is not None else None
+        if isinstance(spec, str):
+            primitive = self.primitive(spec)
+            if primitive is None and lookup is not None:
+                return lookup(spec)
+            return primitive
+        return None
+
+    def same(self, first, second, lookup=None):
+        """
+        Совпадение типов — идентичность канонических объектов. Только если оба
+        типа вне реестра (например, real или массив из real), они сравниваются по имени.
+        """
+        first_type, second_type = self.resolve(first, lookup), self.resolve(second, lookup)
+        if first_type is None and second_type is None:
+            return str(first).strip().lower() == str(second).strip().lower()
+        return first_type is second_type
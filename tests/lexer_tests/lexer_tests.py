@@ -1,7 +1,15 @@
+import io
+import os
+import tempfile
+import time
 import unittest
 from lexer.lexer import Lexer
 from lexer.token_type import TokenType
 from lexer.token import Token
+from lexer.line_index import LineIndex
+from lexer.incremental import TokenStream, relex
+from lexer.parallel import tokenize_parallel, split_points
+from custom_exceptions.lexer_error import LexerError
 
 
 class TestLexer(unittest.TestCase):
@@ -113,5 +121,164 @@ class TestLexer(unittest.TestCase):
             lexer.tokenize()
 
 
+    def test_regex_engine_matches_char_engine(self):
+        # Движок на общем регулярном выражении выдаёт тот же поток токенов
+        text = 'x := "a\\"b" + \'c\';\n  arr[1..3] <> y : z'
+        expected = Lexer(text=text).tokenize()
+        tokens = Lexer(text=text, engine="regex").tokenize()
+
+        self.assertEqual(tokens, expected)
+
+    def test_regex_engine_reports_same_error(self):
+        # Ошибки и их позиции совпадают с посимвольным движком
+        with self.assertRaises(LexerError) as char_error:
+            Lexer(text="begin\n  $ end").tokenize()
+        with self.assertRaises(LexerError) as regex_error:
+            Lexer(text="begin\n  $ end", engine="regex").tokenize()
+
+        self.assertEqual((regex_error.exception.line, regex_error.exception.column),
+                         (char_error.exception.line, char_error.exception.column))
+
+
+    def test_iter_tokens_across_chunk_boundaries(self):
+        # Токены, разрезанные границей куска, собираются так же, как при tokenize
+        text = 'begin\n  name := "hello world"; x := 12345 <> y; c := \'z\'\nend.'
+        expected = Lexer(text=text).tokenize()
+
+        for chunk_size in (1, 2, 3, 7, 1024):
+            tokens = list(Lexer(stream=io.StringIO(text)).iter_tokens(chunk_size=chunk_size))
+            self.assertEqual(tokens, expected)
+
+    def test_mmap_matches_text(self):
+        # Разбор отображённого файла совпадает с разбором текста, включая UTF-8 и столбцы
+        text = 'счёт := "строка\nс переводом" + \'ы\'; x² := 12;\n  имя2 <> "\\"" end.'
+        with tempfile.NamedTemporaryFile('w', suffix='.pas', encoding='utf-8', delete=False) as f:
+            f.write(text)
+        try:
+            tokens = Lexer(filename=f.name, use_mmap=True).tokenize()
+        finally:
+            os.unlink(f.name)
+
+        self.assertEqual(tokens, Lexer(text=text).tokenize())
+
+    def test_token_buffer_view_matches_tokens(self):
+        # Представление TokenBuffer индексируется так же, как список Token
+        text = 'x := "a\\"b" + \'c\';\n  arr[1..3] <> "unterminated'
+        expected = Lexer(text=text).tokenize()
+        view = Lexer(text=text).tokenize_buffer().view()
+
+        self.assertEqual(len(view), len(expected))
+        self.assertEqual([view[i] for i in range(len(view))], expected)
+        self.assertEqual(view[-1], expected[-1])
+
+    def test_token_equality(self):
+        # Токены равны по типу, значению и позиции; хеша нет, так как relex меняет позицию на месте
+        token = Token(TokenType.IDENTIFIER, "x", 1, 1)
+
+        self.assertEqual(token, Token(TokenType.IDENTIFIER, "x", 1, 1))
+        self.assertNotEqual(token, Token(TokenType.IDENTIFIER, "x", 1, 2))
+        self.assertNotEqual(token, "x")
+        with self.assertRaises(TypeError):
+            hash(token)
+
+    def test_identifiers_are_interned(self):
+        # Повторы идентификатора — один объект; id не зависит от регистра
+        for engine in ("char", "regex"):
+            tokens = Lexer(text="count := Count + count", engine=engine).tokenize()
+
+            self.assertIs(tokens[0].value, tokens[4].value)
+            self.assertEqual(tokens[0].value.id, tokens[2].value.id)
+            self.assertEqual(tokens[2].value, "Count")
+
+    def test_relex_matches_full_tokenize(self):
+        # Повторный разбор после правки совпадает с полным разбором нового текста
+        text = 'begin\n  x := 1;\n  name := "hi"\nend.'
+        edits = [(9, 0, "yz"), (10, 1, "\n  q := "), (0, 0, '"'), (0, 1, ""), (len(text), 0, " y"),
+                 (0, len(text), ""), (6, 9, "")]
+
+        for offset, removed, inserted in edits:
+            tokens = TokenStream(text)
+            start, old_stop, new_stop = relex(text, tokens, offset, removed, inserted)
+            new_text = text[:offset] + inserted + text[offset + removed:]
+            expected = Lexer(text=new_text).tokenize()
+
+            self.assertEqual(list(tokens), expected)
+            self.assertEqual([tokens.start(index) for index in range(len(tokens))],
+                             [TokenStream(new_text).start(index) for index in range(len(expected))])
+            self.assertEqual(len(expected) - new_stop, len(Lexer(text=text).tokenize()) - old_stop)
+
+    def test_relex_empty_text(self):
+        # Пустой текст разбирается в один EOF — и полным разбором, и правкой в обе стороны
+        expected = [Token(TokenType.EOF, "EOF", 1, 1)]
+        self.assertEqual(Lexer(text="").tokenize(), expected)
+        self.assertEqual(list(TokenStream("")), expected)
+
+        tokens = TokenStream("a b")
+        self.assertEqual(relex("a b", tokens, 0, 3, ""), (0, 2, 0))
+        self.assertEqual(list(tokens), expected)
+        self.assertEqual(relex("", tokens, 0, 0, "\n x"), (0, 0, 1))
+        self.assertEqual(list(tokens), Lexer(text="\n x").tokenize())
+
+    def test_relex_latency(self):
+        # Правка стоит несравнимо меньше полного разбора: номера строк последующих
+        # токенов сдвигаются поблочно и лениво, строка правки берётся от соседнего токена
+        text = "begin\n" + '  x := y + 12; { c } name := "hi";\n' * 20000 + "end."
+        started = time.perf_counter()
+        tokens = TokenStream(text)
+        full = time.perf_counter() - started
+
+        for inserted in ("z", "\n", "z", "\n"):
+            offset = text.index("x", len(text) // 2)
+            started = time.perf_counter()
+            relex(text, tokens, offset, 0, inserted)
+            elapsed = time.perf_counter() - started
+            text = text[:offset] + inserted + text[offset:]
+            self.assertLess(elapsed, full / 100)
+        self.assertEqual(tokens[-1], Lexer(text=text).tokenize()[-1])
+
+    def test_number_tokens_carry_literal(self):
+        # Числовой токен несёт готовое целое значение, длинная строка разбирается целиком
+        text = '12 x² "' + 'a\\"b' * 1000 + '"'
+        for engine in ("char", "regex"):
+            tokens = Lexer(text=text, engine=engine).tokenize()
+
+            self.assertEqual(tokens[0].literal, 12)
+            self.assertIsNone(tokens[1].literal)
+            self.assertEqual(tokens[2].value, 'a"b' * 1000)
+
+    def test_parallel_matches_serial(self):
+        # Куски режутся только по переводам строк вне литералов; результат как у tokenize
+        text = 'x := "a\nb";\n' * 20 + "c := '\n';\n" * 20 + 'end.'
+        expected = Lexer(text=text).tokenize()
+
+        for point in split_points(text, 8):
+            self.assertEqual(text[point - 1], "\n")
+        for workers in (1, 2):
+            self.assertEqual(tokenize_parallel(text, workers=workers), expected)
+
+    def test_line_index_positions(self):
+        # Строка и столбец вычисляются по смещению, в том числе назад по тексту
+        index = LineIndex("ab\ncd\n\nx")
+
+        self.assertEqual(index.position(7), (4, 1))
+        self.assertEqual(index.position(0), (1, 1))
+        self.assertEqual(index.position(2), (1, 3))
+        self.assertEqual(index.position(4), (2, 2))
+        self.assertEqual(index.position(6), (3, 1))
+
+    def test_comments_are_skipped(self):
+        # Все три вида комментариев пропускаются, позиции токенов после них верны
+        text = "a { x\n y } b (* \"q' *) c // d\ne"
+        for engine in ("char", "regex"):
+            tokens = Lexer(text=text, engine=engine).tokenize()
+
+            self.assertEqual([token.value for token in tokens], ["a", "b", "c", "e", "EOF"])
+            self.assertEqual((tokens[1].line, tokens[1].column), (2, 6))
+            self.assertEqual((tokens[3].line, tokens[3].column), (3, 1))
+            with self.assertRaises(LexerError) as context:
+                Lexer(text="a (* b", engine=engine).tokenize()
+            self.assertEqual((context.exception.line, context.exception.column), (1, 3))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,339 @@
+import io
+import pickle
+import unittest
+from lexer.lexer import Lexer
+from lexer.token_type import TokenType
+from parser.parser import Parser, MAX_LOOKAHEAD
+from custom_exceptions.parse_error import ParseError
+from parser.stack_parser import StackParser
+from parser.incremental import reparse
+from lexer.incremental import TokenStream, relex
+from parser.ast_node import *
+from parser.arena import NODE_CLASSES, NODE_FIELDS
+from parser import serializer
+from parser.serializer import AstWriter, AstReader
+from parser.visitor import NodeVisitor
+
+
+def parse_expression(text):
+    return Parser(Lexer(text=text).tokenize()).parse_expression()
+
+
+def dump(node):
+    """Структура дерева в виде вложенных кортежей и списков — для сравнения деревьев."""
+    if isinstance(node, str):
+        # Идентификаторы сравниваются по имени, без id интернирования
+        return str(node)
+    if isinstance(node, (list, tuple)):
+        return [dump(item) for item in node]
+    if isinstance(node, AstNode):
+        return type(node).__name__, {name: dump(getattr(node, name)) for name in node.field_names}
+    return node
+
+
+class TestParser(unittest.TestCase):
+
+    def test_operator_precedence(self):
+        # Умножение связывает сильнее сложения, сравнение — слабее всех
+        expr = parse_expression("a + b * c = d")
+
+        self.assertEqual(expr.relational_operator, "=")
+        self.assertIsInstance(expr.left, SimpleExpressionNode)
+        a, plus, term = expr.left.terms
+        self.assertEqual((a.identifier, plus), ("a", "+"))
+        self.assertIsInstance(term, TermNode)
+        self.assertEqual([item if isinstance(item, str) else item.identifier for item in term.factors],
+                         ["b", "*", "c"])
+
+    def test_operator_chain_is_flat(self):
+        # Цепочка операторов одного уровня — один n-арный узел, а не левая «лесенка»
+        count = 10000
+        expr = parse_expression(" + ".join(["x"] * count) + " - y")
+
+        self.assertIsInstance(expr.left, SimpleExpressionNode)
+        self.assertEqual(len(expr.left.terms), 2 * count + 1)
+        self.assertEqual(expr.left.terms[-2], "-")
+        self.assertTrue(all(isinstance(term, FactorNode) for term in expr.left.terms[::2]))
+
+    def test_const_value_lookahead(self):
+        # Запись или список значений различаются по токенам после '(' без отката
+        record = Parser(Lexer(text='(x: 1; y: "a")').tokenize()).parse_const_value()
+        values = Parser(Lexer(text="(1, (2, 3), 'c')").tokenize()).parse_const_value()
+
+        self.assertIsInstance(record, RecordInitializerNode)
+        self.assertEqual(record.fields, [("x", 1), ("y", "a")])
+        self.assertEqual(values, [1, [2, 3], "c"])
+
+    def test_stack_parser_deep_nesting(self):
+        # Вложенность, на которой рекурсивный разбор упирается в предел рекурсии
+        depth = 50000
+        text = ("program p; begin " + "begin " * depth + "x := " + "(" * depth + "1" + ")" * depth +
+                " end" * depth + " end.")
+        tokens = Lexer(text=text, engine="regex").tokenize()
+
+        with self.assertRaises(RecursionError):
+            Parser(tokens).parse_program()
+        node = StackParser(tokens).parse_program().children[0].compound_statement
+        for _ in range(depth + 1):
+            self.assertIsInstance(node, CompoundStatementNode)
+            node = node.statements[0]
+        self.assertIsInstance(node, AssignStatementNode)
+
+    def test_stack_parser_matches_parser(self):
+        text = """program p;
+        begin
+          for i := 1 to n - 1 do
+            if not (a[i] > b.x) then c := f(i, 2) * (d + 1) else g(i);
+          while x <> 0 do begin x := x div 2; y := y mod 3 end
+        end."""
+        tokens = Lexer(text=text).tokenize()
+
+        self.assertEqual(dump(StackParser(tokens).parse_program()), dump(Parser(tokens).parse_program()))
+
+    def test_parser_reads_token_iterator(self):
+        # Парсер берёт токены из итератора и забегает вперёд не больше чем на MAX_LOOKAHEAD
+        text = """program p;
+        const origin: TPoint = (x: 1; y: 2);
+        begin
+          a[i] := f(b) + 1;
+          g(a)
+        end."""
+        read = []
+
+        def tokens():
+            for token in Lexer(stream=io.StringIO(text)).iter_tokens(chunk_size=8):
+                read.append(token)
+                yield token
+
+        parser = Parser(tokens())
+        while parser.current_token().type_ != TokenType.DOT:
+            self.assertLessEqual(len(read), parser.pos + MAX_LOOKAHEAD + 1)
+            parser.advance()
+        self.assertEqual(dump(Parser(tokens()).parse_program()), dump(Parser(Lexer(text=text).tokenize()).parse_program()))
+
+    def test_iter_declarations_streams_nodes(self):
+        # Каждое объявление отдаётся сразу после разбора, главный оператор — последним
+        text = """program p;
+        type T = record x: integer; end;
+        const c: integer = 1;
+        var a, b: integer;
+        procedure first; begin a := 1 end;
+        procedure second; begin b := 2 end;
+        begin first end."""
+        tokens = Lexer(text=text).tokenize()
+        parser = Parser(tokens)
+
+        items = []
+        positions = []
+        for item in parser.iter_declarations():
+            items.append(item)
+            positions.append(parser.pos)
+        self.assertEqual([type(item).__name__ for item in items], [
+            "TypeDeclarationNode", "ConstDeclarationNode", "VarDeclarationNode", "VarDeclarationNode",
+            "ProcedureOrFunctionDeclarationNode", "ProcedureOrFunctionDeclarationNode", "CompoundStatementNode",
+        ])
+        self.assertEqual(parser.program_name, "p")
+        # Процедура first отдана до того, как разобрана second
+        self.assertEqual(tokens[positions[4]].value, "procedure")
+        self.assertEqual(items[5].identifier, "second")
+
+    def test_reparse_edited_procedure(self):
+        # Правка внутри процедуры разбирает заново только её, соседние узлы остаются прежними
+        text = """program p;
+        var a, b: integer;
+        procedure first; begin a := 1 end;
+        procedure second; begin b := 2 end;
+        begin first; second end."""
+        tokens = TokenStream(text)
+        tree = Parser(tokens).parse_program()
+        block = tree.children[0]
+        first = block.declarations[-2]
+
+        offset = text.index("2 end")
+        start, old_stop, new_stop = relex(text, tokens, offset, 1, "b * (a + 2)")
+        new_text = text[:offset] + "b * (a + 2)" + text[offset + 1:]
+        tree, node = reparse(tree, tokens, start, old_stop, new_stop)
+
+        self.assertIs(block.declarations[-2], first)
+        # Самый глубокий якорь — тело процедуры second
+        self.assertIs(block.declarations[-1].block.compound_statement, node)
+        self.assertEqual(dump(tree), dump(Parser(Lexer(text=new_text).tokenize()).parse_program()))
+
+    def test_reparse_falls_back_to_full_parse(self):
+        # Правка, меняющая границы процедуры, приводит к полному разбору
+        text = "program p; procedure f; begin end; begin f end."
+        tokens = TokenStream(text)
+        tree = Parser(tokens).parse_program()
+
+        offset = text.index("end;")
+        start, old_stop, new_stop = relex(text, tokens, offset, 4, "f; end; procedure g; begin end;")
+        new_text = text[:offset] + "f; end; procedure g; begin end;" + text[offset + 4:]
+        new_tree, node = reparse(tree, tokens, start, old_stop, new_stop)
+
+        self.assertIsNone(node)
+        self.assertIsNot(new_tree, tree)
+        self.assertEqual(dump(new_tree), dump(Parser(Lexer(text=new_text).tokenize()).parse_program()))
+
+    def test_recovery_reports_all_errors(self):
+        # В режиме восстановления все ошибки находятся за один проход, остальное дерево строится
+        text = """program p;
+        var a: integer;
+            b integer;
+        procedure f(; begin a := 1 end;
+        begin
+          a := ;
+          a := 2
+          f;
+          begin a := (1 + end;
+          a := 3
+        end."""
+        tokens = Lexer(text=text).tokenize()
+
+        with self.assertRaises(ParseError):
+            Parser(tokens).parse_program()
+        for parser_class in (Parser, StackParser):
+            parser = parser_class(tokens, recover=True)
+            program = parser.parse_program()
+
+            self.assertEqual([error.line for error in parser.errors], [3, 4, 6, 8, 9])
+            block = program.children[0]
+            self.assertEqual([type(node).__name__ for node in block.declarations],
+                             ["VarDeclarationNode", "ProcedureOrFunctionDeclarationNode"])
+            self.assertEqual(len(block.declarations[1].block.compound_statement.statements), 1)
+            self.assertEqual([type(node).__name__ for node in block.compound_statement.statements],
+                             ["AssignStatementNode", "ProcedureCallNode", "CompoundStatementNode",
+                              "AssignStatementNode"])
+
+    def test_nodes_use_slots_and_walk(self):
+        # Узлы без __dict__, потомки берутся из полей, walk обходит дерево в прямом порядке
+        program = Parser(Lexer(text="program p; var a: integer; begin a := (a + 1) * 2 end.").tokenize()).parse_program()
+        nodes = list(program.walk())
+
+        self.assertFalse(any(hasattr(node, '__dict__') for node in nodes))
+        self.assertEqual(program.children, [program.block])
+        self.assertEqual([type(node).__name__ for node in nodes], [
+            "ProgramNode", "BlockNode", "VarDeclarationNode", "CompoundStatementNode", "AssignStatementNode",
+            "ExpressionNode", "TermNode", "FactorNode", "ExpressionNode", "SimpleExpressionNode",
+            "FactorNode", "FactorNode", "FactorNode",
+        ])
+
+    def test_arena_views_match_tree(self):
+        # Представления арены читаются как узлы, арена переживает pickle
+        text = """program p;
+        type T = record x: integer; end;
+        const origin: T = (x: 1);
+        var a: array [1..3] of integer;
+        procedure f(k: integer); begin a[k] := k * 2 end;
+        begin
+          if not (a[1] > 2) then f(1) else a[2] := (a[1] + 1) div 2
+        end."""
+        tokens = Lexer(text=text).tokenize()
+        tree = Parser(tokens).parse_program()
+        arena = pickle.loads(pickle.dumps(Parser(tokens).parse_arena()))
+        view = arena.tree()
+
+        self.assertEqual(dump(view), dump(tree))
+        self.assertEqual(repr(view), repr(tree))
+        self.assertIsInstance(view.block.compound_statement.statements[0], IfStatementNode)
+        self.assertEqual(view.block, arena.tree().block)
+        # Поле узла — запись first_children + номер поля
+        statement = view.block.compound_statement.statements[0]
+        position = NODE_FIELDS[IfStatementNode].index('else_statement')
+        self.assertEqual(statement.else_statement, arena.value(arena.first_children[statement.index] + position))
+        # Представления только для чтения
+        with self.assertRaises(AttributeError):
+            statement.else_statement = None
+
+    def test_shared_leaves(self):
+        # Равные листья — один неизменяемый узел, структура дерева та же
+        text = "program p; var i, j: integer; begin i := 1; j := i + 1; if i = j then i := j * 1 end."
+        tokens = Lexer(text=text).tokenize()
+        tree = Parser(tokens).parse_program()
+        for parser_class in (Parser, StackParser):
+            shared = parser_class(tokens, share_leaves=True).parse_program()
+            self.assertEqual(str(dump(shared)).replace("SharedFactorNode", "FactorNode"), str(dump(tree)))
+            leaves = [node for node in shared.walk() if isinstance(node, FactorNode)]
+            self.assertEqual(len({id(node) for node in leaves}), 3)
+            self.assertTrue(all(isinstance(node, SharedFactorNode) for node in leaves))
+            with self.assertRaises(AttributeError):
+                leaves[0].value = 2
+
+    def test_binary_serialization_round_trip(self):
+        # Все классы узлов, общие листья и поток из нескольких кадров переживают запись и чтение
+        text = """program p;
+        type T = record x: integer; end;
+        const origin: T = (x: 1);
+        var a: array [1..3] of integer;
+            s: string;
+        function f(var k: integer): integer; begin a[k] := k * 2; f := k end;
+        procedure g(c: char); begin writeln(c) end;
+        var i: integer;
+        begin
+          for i := 1 to 3 do a[i] := f(i);
+          while not (a[1] > 2) do a[1] := a[1] + 1;
+          if origin.x = 1 then g('c') else s := "no"
+        end."""
+        tokens = Lexer(text=text).tokenize()
+        tree = Parser(tokens).parse_program()
+        # Эти два класса парсер не создаёт
+        extra = DeclarationNode([RelationalOperatorNode("<>")])
+        self.assertEqual({type(node) for node in tree.walk()} | {DeclarationNode, RelationalOperatorNode},
+                         set(NODE_CLASSES))
+
+        buffer = io.BytesIO()
+        writer = AstWriter(buffer)
+        writer.write(tree)
+        writer.write(extra)
+        for node in Parser(tokens).iter_declarations():
+            writer.write(node)
+        buffer.seek(0)
+        values = list(AstReader(buffer))
+
+        self.assertEqual(dump(values[0]), dump(tree))
+        self.assertEqual(values[0].program_name.id, tree.program_name.id)
+        self.assertEqual(dump(values[1]), dump(extra))
+        self.assertEqual(dump(values[2:]), dump(tree.block.declarations + [tree.block.compound_statement]))
+
+        # Общий лист остаётся одним объектом на все вхождения
+        shared = Parser(tokens, share_leaves=True).parse_program()
+        leaves = [node for node in shared.walk() if isinstance(node, SharedFactorNode)]
+        loaded = [node for node in serializer.loads(serializer.dumps(shared)).walk()
+                  if isinstance(node, SharedFactorNode)]
+        self.assertEqual(len(loaded), len(leaves))
+        self.assertEqual(len({id(node) for node in loaded}), len({id(node) for node in leaves}))
+
+        with self.assertRaises(ValueError):
+            serializer.loads(b"PNG" + serializer.dumps(tree)[3:])
+
+    def test_binary_serialization_literals(self):
+        # Длинные целые сохраняются байтами, прочие объекты не записываются (pickle при чтении нет)
+        numbers = [2 ** 63 - 1, 2 ** 63, -2 ** 63, -2 ** 63 - 1, 10 ** 40, -10 ** 40, 255, -128]
+        self.assertEqual(serializer.loads(serializer.dumps(numbers)), numbers)
+        for value in ({"a": 1}, object(), b"bytes"):
+            with self.assertRaises(TypeError):
+                serializer.dumps([value])
+
+    def test_visitor_dispatch_is_cached_per_class(self):
+        # Метод ищется по MRO один раз: представления арены и общие листья получают метод базового класса
+        class Counter(NodeVisitor):
+            visit_methods = {FactorNode: 'visit_factor', AstNode: 'visit_node'}
+
+            def visit_factor(self, node, counts):
+                counts['factor'] += 1
+
+            def visit_node(self, node, counts):
+                counts['node'] += 1
+
+        tokens = Lexer(text="program p; var i: integer; begin i := i + 1 end.").tokenize()
+        for tree in (Parser(tokens, share_leaves=True).parse_program(), Parser(tokens).parse_arena().tree()):
+            counts = {'factor': 0, 'node': 0}
+            for node in tree.walk():
+                Counter().visit(node, counts)
+            self.assertEqual(counts, {'factor': 2, 'node': 7})
+        self.assertIn(SharedFactorNode, Counter.dispatch_cache)
+        self.assertNotIn(SharedFactorNode, NodeVisitor.dispatch_cache)
+        self.assertIsNone(Counter().visit("не узел", counts))
+
+
+if __name__ == '__main__':
+    unittest.main()
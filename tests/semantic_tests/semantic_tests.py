@@ -0,0 +1,184 @@
+import pickle
+import unittest
+from lexer.lexer import Lexer
+from parser.parser import Parser
+from parser import serializer
+from semantic.semantic_analyzer import SemanticAnalyzer
+from semantic.symbol_table import SymbolTable
+from semantic.types import ArrayType, RecordType
+from generator.translator import Translator
+from lexer.interner import Interner
+from custom_exceptions.semantic_error import SemanticError
+
+
+def analyze(text):
+    analyzer = SemanticAnalyzer()
+    analyzer.visit_program(Parser(Lexer(text=text).tokenize()).parse_program())
+    return analyzer
+
+
+class TestSemantic(unittest.TestCase):
+
+    def test_semantic_analysis_leaves_tree_unchanged(self):
+        # Значения массива по умолчанию и типы параметров — в таблицах анализатора, а не в узлах
+        tokens = Lexer(text="""program p;
+var a: array [1..3] of integer;
+procedure show(v: array [1..2] of integer; n: integer);
+begin
+  n := n + 1
+end;
+begin
+  a[1] := 2
+end.""").tokenize()
+        tree = Parser(tokens).parse_program()
+        arena = Parser(tokens).parse_arena()
+        expected = serializer.dumps(tree)
+        expected_arena = pickle.dumps(arena)
+        for program in (tree, tree, arena.tree()):
+            analyzer = SemanticAnalyzer()
+            analyzer.visit_program(program)
+            scope = analyzer.symbol_table.parent
+            self.assertEqual(scope.lookup('a')['info']['initial_values'], [0, 0, 0])
+            self.assertEqual([str(param['type']) for param in scope.lookup('show')['parameters']], ['array', 'integer'])
+            self.assertEqual(sorted(map(str, analyzer.parameter_types.values())), ['array', 'integer'])
+        self.assertEqual(serializer.dumps(tree), expected)
+        self.assertEqual(pickle.dumps(arena), expected_arena)
+
+    def test_types_are_canonical(self):
+        # Одинаковые типы — один объект реестра; Translator находит их и по строковому semantic_json
+        analyzer = analyze("""program t;
+type
+  TPoint = record
+    x: integer;
+    y: integer;
+  end;
+var
+  p: TPoint;
+  q: TPoint;
+  a: array [1..3] of integer;
+  b: array [1..3] of integer;
+function f(n: integer): integer;
+begin
+  n := n + 1
+end;
+begin
+  p.x := 1;
+  p := q;
+  a := b
+end.""")
+        scope = analyzer.symbol_table.parent
+        types = analyzer.types
+        integer = types.primitive("Integer")
+
+        record = scope.lookup("p")["type_object"]
+        self.assertIsInstance(record, RecordType)
+        self.assertIs(scope.lookup("q")["type_object"], record)
+        self.assertIs(scope.lookup("TPoint")["type_object"], record)
+        self.assertEqual(record.fields, (("x", integer), ("y", integer)))
+        array = scope.lookup("a")["type_object"]
+        self.assertIsInstance(array, ArrayType)
+        self.assertIs(scope.lookup("b")["type_object"], array)
+        self.assertIs(types.array(integer, [(1, 3)]), array)
+        self.assertEqual(array.size, 3)
+        self.assertIs(scope.lookup("f")["type_object"], types.function("function", [integer], integer))
+        with self.assertRaises(AttributeError):
+            array.size = 4
+
+        semantic_json = {"GLOBAL Symbol_Table": {name: str(info) for name, info in scope.symbols.items()}}
+        translator = Translator(analyzer.symbol_table, semantic_json, analyzer.code_generator['statements'])
+        self.assertIs(translator._type_of("a", translator._parse_info(semantic_json["GLOBAL Symbol_Table"]["a"])), array)
+        code = translator.translate()
+        self.assertIn("(p TPoint)", code)
+        self.assertIn('(a ((3 "-" 1) "+" 1))', code)
+
+    def test_named_types_follow_scopes(self):
+        # Локальный Point процедуры не подменяет глобальный после выхода из неё
+        analyzer = analyze("""program s;
+type
+  Point = record x, y: integer end;
+procedure Foo;
+type
+  Point = record s: string end;
+begin
+end;
+var
+  p: Point;
+begin
+  p.x := p.y
+end.""")
+        scope = analyzer.symbol_table.parent
+        record = scope.lookup("p")["type_object"]
+        self.assertIs(scope.lookup("Point")["type_object"], record)
+        self.assertEqual([name for name, _ in record.fields], ["x", "y"])
+        local_point = scope.lookup("Foo")["local_symbol_table"].symbols["Point"]["type_object"]
+        self.assertIsNot(local_point, record)
+
+        semantic_json = {"GLOBAL Symbol_Table": {name: str(info) for name, info in scope.symbols.items()}}
+        translator = Translator(analyzer.symbol_table, semantic_json, analyzer.code_generator['statements'])
+        self.assertIs(translator._type_of("p", translator._parse_info(semantic_json["GLOBAL Symbol_Table"]["p"])), record)
+
+    def test_call_arguments_match_parameter_types(self):
+        # Аргумент сверяется с каноническим типом параметра, у массивов — вместе с границами
+        analyze("""program s;
+type
+  Point = record x: integer; y: integer; end;
+var
+  p: Point;
+procedure P2(var q: Point);
+begin
+end;
+begin
+  P2(p)
+end.""")
+        program = """program s;
+var
+  a: array [%s] of integer;
+procedure P3(v: array [5..7] of integer);
+begin
+end;
+begin
+  P3(a)
+end."""
+        analyze(program % "5..7")
+        with self.assertRaises(SemanticError):
+            analyze(program % "1..9")
+
+    def test_symbol_table_scopes(self):
+        # Самая внутренняя открытая область ищет по общему индексу, остальные — по цепочке parent
+        root = SymbolTable(interner=Interner())
+        root.declare("X", "global x")
+        root.declare("y", "global y")
+        table = root
+        for level in range(32):
+            table = table.enter_scope()
+        inner = table.enter_scope()
+        inner.declare("x", "local x")
+        self.assertEqual((inner.lookup("X"), inner.lookup("Y"), inner.lookup("z")), ("local x", "global y", None))
+        # Поиск во внешней таблице не закрывает вложенные области
+        self.assertEqual(table.lookup("x"), "global x")
+        self.assertEqual(root.lookup("x"), "global x")
+        self.assertTrue(inner.is_open)
+        self.assertEqual(inner.lookup("x"), "local x")
+        # Объявление во внешней открытой области не перекрывает вложенное
+        table.declare("x", "outer x")
+        self.assertEqual(inner.lookup("x"), "local x")
+        with self.assertRaises(Exception):
+            table.enter_scope()
+        with self.assertRaises(Exception):
+            table.exit_scope()
+
+        self.assertIs(inner.exit_scope(), table)
+        self.assertFalse(inner.is_open)
+        self.assertEqual((table.lookup("x"), inner.lookup("x")), ("outer x", "local x"))
+        while table is not root:
+            table = table.exit_scope()
+        self.assertEqual(root.bindings, {root._key("x"): ["global x"], root._key("y"): ["global y"]})
+        sibling = root.enter_scope()
+        sibling.declare("y", "sibling y")
+        self.assertEqual((sibling.lookup("x"), sibling.lookup("y")), ("global x", "sibling y"))
+        with self.assertRaises(Exception):
+            root.declare("Y", "again")
+
+
+if __name__ == '__main__':
+    unittest.main()